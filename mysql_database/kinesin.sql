@@ -4,8 +4,12 @@ SET SESSION sql_mode='STRICT_TRANS_TABLES';
 -- CREATE DATABASE							kinesin;
 USE kinesin;
 
+DROP TABLE IF EXISTS					row_hash;
+DROP TABLE IF EXISTS					domain_tissue_count;
 DROP TABLE IF EXISTS					tissue;
-DROP TABLE IF EXISTS					impact;
+DROP TABLE IF EXISTS					tissue_site;
+DROP TABLE IF EXISTS					histology;
+DROP TABLE IF EXISTS					impact_score;
 DROP TABLE IF EXISTS					frequency;
 DROP TABLE IF EXISTS					source_info;
 DROP TABLE IF EXISTS					mutation;
@@ -13,6 +17,7 @@ DROP TABLE IF EXISTS					gene;
 DROP TABLE IF EXISTS					kinesin_family;
 
 DROP VIEW IF EXISTS						vKif11_coding_mut;
+DROP VIEW IF EXISTS						impact;
 
 
 CREATE table 									kinesin_family
@@ -46,8 +51,9 @@ CREATE table										gene
 
 
 CREATE table										mutation
-(			protein										VARCHAR(40)				NOT NULL,
-			resnum									VARCHAR(10)				NOT NULL,
+(			mutation_id								INT								NOT NULL AUTO_INCREMENT,
+			protein										VARCHAR(40)				NOT NULL,
+			resnum									INT								DEFAULT NULL,
 			genomic  								VARCHAR(100)				NOT NULL,
             coding										CHAR(1)							NOT NULL,
             cds											VARCHAR(20)				DEFAULT 'N/A'
@@ -60,7 +66,8 @@ CREATE table										mutation
             organism									VARCHAR(100)				NOT NULL,
             domain									VARCHAR(100)				DEFAULT 'UNK'
 																									NOT NULL,
-            PRIMARY KEY (protein),
+            PRIMARY KEY (mutation_id),
+            UNIQUE (protein),
             FOREIGN KEY (gene_name, organism) REFERENCES gene (gene_name, organism) ON DELETE CASCADE
 )ENGINE=InnoDB;
            
@@ -68,9 +75,9 @@ CREATE table										mutation
 CREATE table										source_info
 (			source_id								VARCHAR(100)				NOT NULL,
 			source_db								VARCHAR(25)				NOT NULL,
-            mutation_id								VARCHAR(45)				NOT NULL,
+            mutation_id								INT								NOT NULL,
 			PRIMARY KEY (source_id),
-            FOREIGN KEY (mutation_id) REFERENCES mutation (protein) ON DELETE CASCADE
+            FOREIGN KEY (mutation_id) REFERENCES mutation (mutation_id) ON DELETE CASCADE
 )ENGINE=InnoDB;
 
 -- deleted description table and included in mutation table
@@ -86,72 +93,139 @@ CREATE table										source_info
 --            FOREIGN KEY (mutation_id) REFERENCES mutation (mutation_id) ON DELETE CASCADE
 -- )ENGINE=InnoDB;
 
--- deleted frequency table: not relevant
---CREATE table										frequency
---(			mutation_id								VARCHAR(45)				NOT NULL,
---			gdc_freq								VARCHAR(10)				DEFAULT 'UNK'
---																			NOT NULL,
---			cosmic_freq                             VARCHAR(10)             DEFAULT 'UNK'
---			                                                                NOT NULL,
---			PRIMARY KEY (mutation_id),
---            FOREIGN KEY (mutation_id) REFERENCES mutation (protein) ON DELETE CASCADE
---)ENGINE=InnoDB;
-
-
-CREATE table										impact
-(			mutation_id							VARCHAR(45)				NOT NULL,
-            median_ranked_scores                VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			sift_score							VARCHAR(25)				DEFAULT 'UNK'
-																									NOT NULL,
-			sift_pred							VARCHAR(25)				DEFAULT 'UNK'
-																									NOT NULL,
-			polyphen_score						VARCHAR(25)				DEFAULT 'UNK'
-																									NOT NULL,
-			polyphen_pred       				VARCHAR(25)				DEFAULT 'UNK'
-																									NOT NULL,
-		    condel                              VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-		    cadd_rank                           VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			cadd_score                          VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-		    fathmm_rank                         VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			fathmm_score						VARCHAR(25)				DEFAULT 'UNK'
-																									NOT NULL,
-			fathmm_pred     					VARCHAR(25)				DEFAULT 'UNK'               NOT NULL,
-			metaSVM_rank                        VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			metaSVM_score                       VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			metaSVM_pred                        VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			mutpred_rank                        VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			mutpred_score                       VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			mutassessor_rank                    VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			mutassessor_score                   VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			mutassessor_pred                    VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			muttaster_rank                      VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			muttaster_score                     VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			muttaster_pred                      VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			provean_rank                        VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			provean_score                       VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			provean_pred                        VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			revel_rank                          VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			revel_score                         VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			fathmm_cancer_score                 VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-			fathmm_cancer_pred                  VARCHAR(25)             DEFAULT 'UNK'               NOT NULL,
-            clinvar_prediction					VARCHAR(25)				DEFAULT 'UNK'               NOT NULL,
+-- predictor results in long format, one row per mutation, tool and metric ('score' and 'rank' in value, 'pred' in
+-- label), read in the wide layout through the view impact (impact_store.py)
+CREATE table										impact_score
+(			mutation_id								INT								NOT NULL,
+			tool									VARCHAR(25)				NOT NULL,
+			metric									VARCHAR(10)				NOT NULL,
+			value									FLOAT						DEFAULT NULL,
+			label									VARCHAR(25)				DEFAULT NULL,
+			PRIMARY KEY (mutation_id, tool, metric),
+            FOREIGN KEY (mutation_id) REFERENCES mutation (mutation_id) ON DELETE CASCADE
+)ENGINE=InnoDB;
 
-			PRIMARY KEY (mutation_id),
-            FOREIGN KEY (mutation_id) REFERENCES mutation (protein) ON DELETE CASCADE
+-- lookup tables for the few dozen distinct tissue sites and histologies ('large_intestine', 'carcinoma'),
+-- tissue rows store their small integer codes (tissue_codes.py)
+CREATE table										tissue_site
+(			site_id									SMALLINT						NOT NULL AUTO_INCREMENT,
+			tissue_type								VARCHAR(100)				NOT NULL,
+			PRIMARY KEY (site_id),
+			UNIQUE (tissue_type)
+)ENGINE=InnoDB;
+
+CREATE table										histology
+(			histology_id							SMALLINT						NOT NULL AUTO_INCREMENT,
+			cancer_type							VARCHAR(100)				NOT NULL,
+			PRIMARY KEY (histology_id),
+			UNIQUE (cancer_type)
 )ENGINE=InnoDB;
 
 CREATE table										tissue
-(			mutation_id								VARCHAR(45)				NOT NULL,
+(			mutation_id								INT								NOT NULL,
 			sample_id                               VARCHAR(100)            NOT NULL,
-			tissue_type								VARCHAR(100)				DEFAULT 'UNK'
+			site_id									SMALLINT						NOT NULL,
+			histology_id							SMALLINT						NOT NULL,
+			PRIMARY KEY (mutation_id, sample_id),
+            FOREIGN KEY (mutation_id) REFERENCES mutation (mutation_id) ON DELETE CASCADE,
+            FOREIGN KEY (site_id) REFERENCES tissue_site (site_id),
+            FOREIGN KEY (histology_id) REFERENCES histology (histology_id)
+)ENGINE=InnoDB;
+
+
+-- recurrence of each mutation: samples and tissue sites it was found in (tissue), source databases reporting it
+-- (source_info), kept up to date after loads (summary_tables.py)
+CREATE table										frequency
+(			mutation_id								INT								NOT NULL,
+			sample_count							INT								DEFAULT 0
 																									NOT NULL,
-			cancer_type							VARCHAR(100)				DEFAULT 'UNK'
+			tissue_count							SMALLINT						DEFAULT 0
 																									NOT NULL,
-			PRIMARY KEY (mutation_id, sample_id),
-            FOREIGN KEY (mutation_id) REFERENCES mutation (protein) ON DELETE CASCADE
+			source_count							SMALLINT						DEFAULT 0
+																									NOT NULL,
+			PRIMARY KEY (mutation_id),
+            FOREIGN KEY (mutation_id) REFERENCES mutation (mutation_id) ON DELETE CASCADE
+)ENGINE=InnoDB;
+
+
+-- samples per domain, tissue site and consequence of each gene, kept up to date after loads (summary_tables.py)
+-- for the eDriver and dN/dS analyses
+CREATE table										domain_tissue_count
+(			gene_name								VARCHAR(100)				NOT NULL,
+			domain									VARCHAR(100)				NOT NULL,
+			site_id									SMALLINT						NOT NULL,
+			consequence							VARCHAR(100)				NOT NULL,
+			sample_count							INT								NOT NULL,
+			PRIMARY KEY (gene_name, domain, site_id, consequence)
+)ENGINE=InnoDB;
+
+
+-- content hashes of rows sent by each load (scope 'table:source'), used by delta ingest (delta_ingest.py)
+CREATE table										row_hash
+(			scope									VARCHAR(50)				NOT NULL,
+			row_key									VARCHAR(200)			NOT NULL,
+			content_hash							CHAR(40)						NOT NULL,
+			PRIMARY KEY (scope, row_key)
 )ENGINE=InnoDB;
 
 
+-- secondary indexes recommended by index_advisor.py for the analysis queries (sql_queries, R scripts)
+-- domain x tissue counts: filter on consequence/tissue site, join on mutation_id, group by domain
+CREATE INDEX idx_mutation_consequence_domain_resnum ON mutation (consequence, domain, resnum);
+CREATE INDEX idx_tissue_site_id_mutation_id ON tissue (site_id, mutation_id);
+CREATE INDEX idx_mutation_mutation_type ON mutation (mutation_type);
+-- impact thresholds: one tool's scores or predictions with one range scan, mutation_id read from the index for the join
+CREATE INDEX idx_impact_score_tool_metric_value_mutation_id ON impact_score (tool, metric, value, mutation_id);
+CREATE INDEX idx_impact_score_tool_metric_label_mutation_id ON impact_score (tool, metric, label, mutation_id);
+-- summary counts by consequence and tissue site, top-N recurrent mutations
+CREATE INDEX idx_frequency_sample_count ON frequency (sample_count);
+CREATE INDEX idx_frequency_source_count ON frequency (source_count);
+CREATE INDEX idx_domain_tissue_count_consequence_domain_site_id ON domain_tissue_count (consequence, domain, site_id);
+-- foreign key columns (created implicitly by InnoDB, needed for joins and cascades in SQLite)
+CREATE INDEX idx_gene_kinesin_family ON gene (kinesin_family);
+CREATE INDEX idx_mutation_gene_name_organism ON mutation (gene_name, organism);
+CREATE INDEX idx_source_info_mutation_id ON source_info (mutation_id);
+CREATE INDEX idx_tissue_histology_id ON tissue (histology_id);
+
+
+-- wide layout of impact_score (one row per mutation with scores, one column per tool and metric, 'UNK' for missing
+-- predictions) under the name of the former impact table, for the analysis queries and vKif11_coding_mut
+CREATE VIEW impact AS
+			SELECT	mutation_id,
+				MAX(CASE WHEN tool = 'median' AND metric = 'rank' THEN value END) AS median_ranked_scores,
+				MAX(CASE WHEN tool = 'sift' AND metric = 'score' THEN value END) AS sift_score,
+				COALESCE(MAX(CASE WHEN tool = 'sift' AND metric = 'pred' THEN label END), 'UNK') AS sift_pred,
+				MAX(CASE WHEN tool = 'polyphen' AND metric = 'score' THEN value END) AS polyphen_score,
+				COALESCE(MAX(CASE WHEN tool = 'polyphen' AND metric = 'pred' THEN label END), 'UNK') AS polyphen_pred,
+				MAX(CASE WHEN tool = 'condel' AND metric = 'score' THEN value END) AS condel,
+				MAX(CASE WHEN tool = 'cadd' AND metric = 'rank' THEN value END) AS cadd_rank,
+				MAX(CASE WHEN tool = 'cadd' AND metric = 'score' THEN value END) AS cadd_score,
+				MAX(CASE WHEN tool = 'fathmm' AND metric = 'rank' THEN value END) AS fathmm_rank,
+				MAX(CASE WHEN tool = 'fathmm' AND metric = 'score' THEN value END) AS fathmm_score,
+				COALESCE(MAX(CASE WHEN tool = 'fathmm' AND metric = 'pred' THEN label END), 'UNK') AS fathmm_pred,
+				MAX(CASE WHEN tool = 'metaSVM' AND metric = 'rank' THEN value END) AS metaSVM_rank,
+				MAX(CASE WHEN tool = 'metaSVM' AND metric = 'score' THEN value END) AS metaSVM_score,
+				COALESCE(MAX(CASE WHEN tool = 'metaSVM' AND metric = 'pred' THEN label END), 'UNK') AS metaSVM_pred,
+				MAX(CASE WHEN tool = 'mutpred' AND metric = 'rank' THEN value END) AS mutpred_rank,
+				MAX(CASE WHEN tool = 'mutpred' AND metric = 'score' THEN value END) AS mutpred_score,
+				MAX(CASE WHEN tool = 'mutassessor' AND metric = 'rank' THEN value END) AS mutassessor_rank,
+				MAX(CASE WHEN tool = 'mutassessor' AND metric = 'score' THEN value END) AS mutassessor_score,
+				COALESCE(MAX(CASE WHEN tool = 'mutassessor' AND metric = 'pred' THEN label END), 'UNK') AS mutassessor_pred,
+				MAX(CASE WHEN tool = 'muttaster' AND metric = 'rank' THEN value END) AS muttaster_rank,
+				MAX(CASE WHEN tool = 'muttaster' AND metric = 'score' THEN value END) AS muttaster_score,
+				COALESCE(MAX(CASE WHEN tool = 'muttaster' AND metric = 'pred' THEN label END), 'UNK') AS muttaster_pred,
+				MAX(CASE WHEN tool = 'provean' AND metric = 'rank' THEN value END) AS provean_rank,
+				MAX(CASE WHEN tool = 'provean' AND metric = 'score' THEN value END) AS provean_score,
+				COALESCE(MAX(CASE WHEN tool = 'provean' AND metric = 'pred' THEN label END), 'UNK') AS provean_pred,
+				MAX(CASE WHEN tool = 'revel' AND metric = 'rank' THEN value END) AS revel_rank,
+				MAX(CASE WHEN tool = 'revel' AND metric = 'score' THEN value END) AS revel_score,
+				MAX(CASE WHEN tool = 'fathmm_cancer' AND metric = 'score' THEN value END) AS fathmm_cancer_score,
+				COALESCE(MAX(CASE WHEN tool = 'fathmm_cancer' AND metric = 'pred' THEN label END), 'UNK') AS fathmm_cancer_pred,
+				COALESCE(MAX(CASE WHEN tool = 'clinvar' AND metric = 'pred' THEN label END), 'UNK') AS clinvar_prediction
+			FROM	impact_score
+			GROUP BY mutation_id;
+
+
 -- materialised view created for user interface: includes only coding mutations for given gene (kinesin)
 -- in future can expand to create new views for each gene (kinesin) or for non-coding mutations (CNVs)
 CREATE VIEW vKif11_coding_mut AS 
@@ -160,6 +234,6 @@ CREATE VIEW vKif11_coding_mut AS
             WHERE 	m.coding = 'Y'
             AND		g.gene_name = m.gene_name
 			AND		g.organism = m.organism
- 			AND		protein = i.mutation_id;
+ 			AND		m.mutation_id = i.mutation_id;
             
 
@@ -2,7 +2,7 @@
 SELECT	protein, median_ranked_scores FROM mutation m, tissue t, impact i
 WHERE consequence = 'missense'
 AND domain = 'kinesin motor'
-AND tissue_type in ('Colon', 'large_intestine', 'Rectum')
-AND m.protein = i.mutation_id
+AND site_id IN (SELECT site_id FROM tissue_site WHERE tissue_type in ('Colon', 'large_intestine', 'Rectum'))
+AND m.mutation_id = i.mutation_id
 AND i.mutation_id = t.mutation_id
 GROUP by resnum;
\ No newline at end of file
@@ -1,5 +1,10 @@
 
-SELECT mutation_id, COUNT(*)
-FROM  source_info
-GROUP BY mutation_id
-		HAVING COUNT(*) >1;
+## mutations reported by more than one source database (GDC and COSMIC), frequency.source_count = distinct source_db
+## in source_info. Before the frequency table this counted source_info rows (COUNT(*) > 1), so a mutation with two
+## entries (source_id) in one database also counted; count of source_info rows per mutation:
+## SELECT protein, COUNT(*) FROM source_info s, mutation m WHERE s.mutation_id = m.mutation_id
+## GROUP BY protein HAVING COUNT(*) > 1;
+SELECT protein, source_count
+FROM  frequency f, mutation m
+WHERE f.source_count > 1
+AND f.mutation_id = m.mutation_id;
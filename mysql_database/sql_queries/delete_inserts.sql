@@ -6,5 +6,10 @@ USE kinesin;
  -- DELETE FROM gene;
 DELETE FROM mutation;
 DELETE FROM source_info;
-DELETE FROM impact;
+DELETE FROM impact_score;
 DELETE FROM tissue;
+DELETE FROM tissue_site;
+DELETE FROM histology;
+DELETE FROM row_hash;
+DELETE FROM domain_tissue_count;
+DELETE FROM frequency;
@@ -1,3 +1,4 @@
-SELECT t.mutation_id, m.consequence, m.mutation_type
+SELECT m.protein, m.consequence, m.mutation_type
 FROM mutation m, tissue t
-WHERE t.tissue_type = 'large_intestine';
\ No newline at end of file
+WHERE t.site_id IN (SELECT site_id FROM tissue_site WHERE tissue_type = 'large_intestine')
+AND m.mutation_id = t.mutation_id;
\ No newline at end of file
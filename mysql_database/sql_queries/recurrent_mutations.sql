@@ -0,0 +1,6 @@
+## top 20 recurrent mutations: samples, tissue sites and source databases (frequency table)
+SELECT protein, sample_count, tissue_count, source_count
+FROM frequency f, mutation m
+WHERE f.mutation_id = m.mutation_id
+ORDER BY sample_count DESC
+LIMIT 20;
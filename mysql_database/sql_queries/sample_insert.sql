@@ -6,7 +6,7 @@ DELETE FROM kinesin_family;
 DELETE FROM gene;
 DELETE FROM mutation;
 DELETE FROM source_info;
-DELETE FROM impact;
+DELETE FROM impact_score;
 DELETE FROM tissue;
 
 INSERT INTO	 kinesin_family (family_name)
@@ -1,54 +1,63 @@
-SELECT mutation_id, condel, cadd_rank, metaSVM_rank, revel_rank, fathmm_cancer_pred
-                  FROM kinesin.impact, kinesin.mutation
-                  WHERE condel > 0.8 OR cadd_rank>0.8 OR metaSVM_rank>0.8 OR revel_rank>0.8 OR fathmm_cancer_pred = 'CANCER'
-                  GROUP by mutation_id;
+SELECT protein, condel, cadd_rank, metaSVM_rank, revel_rank, fathmm_cancer_pred
+                  FROM kinesin.impact i, kinesin.mutation m
+                  WHERE (condel > 0.8 OR cadd_rank>0.8 OR metaSVM_rank>0.8 OR revel_rank>0.8 OR fathmm_cancer_pred = 'CANCER')
+                  AND i.mutation_id = m.mutation_id
+                  GROUP by protein;
                   
                   
-SELECT mutation_id FROM impact
-WHERE condel > 0.8
-GROUP by mutation_id;
-
-SELECT mutation_id FROM impact
-WHERE cadd_rank > 0.8
-GROUP BY mutation_id;
-
-SELECT mutation_id FROM impact
-WHERE metaSVM_rank > 0.8
-GROUP BY mutation_id;
-
-SELECT mutation_id FROM impact
-WHERE revel_rank > 0.8
-GROUP BY mutation_id;
-
-SELECT mutation_id FROM impact
-WHERE fathmm_cancer_pred = 'CANCER'
-GROUP BY mutation_id;
-
-SELECT mutation_id FROM impact
+SELECT protein FROM impact_score s, mutation m
+WHERE s.tool = 'condel' AND s.metric = 'score' AND s.value > 0.8
+AND s.mutation_id = m.mutation_id
+GROUP by protein;
+
+SELECT protein FROM impact_score s, mutation m
+WHERE s.tool = 'cadd' AND s.metric = 'rank' AND s.value > 0.8
+AND s.mutation_id = m.mutation_id
+GROUP BY protein;
+
+SELECT protein FROM impact_score s, mutation m
+WHERE s.tool = 'metaSVM' AND s.metric = 'rank' AND s.value > 0.8
+AND s.mutation_id = m.mutation_id
+GROUP BY protein;
+
+SELECT protein FROM impact_score s, mutation m
+WHERE s.tool = 'revel' AND s.metric = 'rank' AND s.value > 0.8
+AND s.mutation_id = m.mutation_id
+GROUP BY protein;
+
+SELECT protein FROM impact_score s, mutation m
+WHERE s.tool = 'fathmm_cancer' AND s.metric = 'pred' AND s.label = 'CANCER'
+AND s.mutation_id = m.mutation_id
+GROUP BY protein;
+
+SELECT protein FROM impact i, mutation m
 WHERE fathmm_cancer_pred = 'CANCER'
-AND clinvar_prediction in ('Pathogenic', 'Likely pathogenic');
+AND clinvar_prediction in ('Pathogenic', 'Likely pathogenic')
+AND i.mutation_id = m.mutation_id;
 
-SELECT mutation_id, condel, cadd_rank, fathmm_cancer_pred
-                  FROM kinesin.impact, kinesin.mutation
+SELECT protein, condel, cadd_rank, fathmm_cancer_pred
+                  FROM kinesin.impact i, kinesin.mutation m
                   WHERE  cadd_rank >0.8   AND fathmm_cancer_pred = 'CANCER'
-                  GROUP by mutation_id;
+                  AND i.mutation_id = m.mutation_id
+                  GROUP by protein;
                   
-SELECT * from tissue
-WHERE mutation_id in ('L991V', 'F1012I', 'L500F', 'P1010Q');
+SELECT t.* from tissue t, mutation m
+WHERE protein in ('L991V', 'F1012I', 'L500F', 'P1010Q')
+AND t.mutation_id = m.mutation_id;
 
-SELECT mutation_id, domain
-                  FROM kinesin.impact, kinesin.mutation
+SELECT protein, domain
+                  FROM kinesin.impact i, kinesin.mutation m
                   WHERE condel > 0.8 AND cadd_rank>0.8 AND metaSVM_rank>0.8 AND revel_rank>0.8
-                  AND mutation_id = protein
-                  GROUP by mutation_id
+                  AND i.mutation_id = m.mutation_id
+                  GROUP by protein
                   ORDER by resnum ASC;
                   
 SELECT * FROM impact
 WHERE median_ranked_scores >=0.8;
 
-SELECT mutation_id, domain
-FROM kinesin.impact, kinesin.mutation
+SELECT protein, domain
+FROM kinesin.impact i, kinesin.mutation m
                   WHERE condel > 0.8 AND cadd_rank>=0.8 AND metaSVM_rank>=0.8 AND revel_rank>=0.8 AND median_ranked_scores>=0.8
-                  AND mutation_id = protein
-                  GROUP by mutation_id
+                  AND i.mutation_id = m.mutation_id
+                  GROUP by protein
                   ORDER by resnum ASC;
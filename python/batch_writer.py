@@ -0,0 +1,176 @@
+#!/usr/bin python3
+
+""" Batched write module """
+
+"""
+Program:    batch_writer
+File:       batch_writer.py
+Version:    1.0
+Date:       18.10.26
+Function:   Multi-row batched inserts for kinesin database loaders
+_____________________________________________________________________________
+Description:
+============
+Loaders used to call cursor.execute once per row, one round trip per row. writeRows sends rows with
+cursor.executemany, which pymysql rewrites into multi-row INSERT ... VALUES (...),(...) statements. Batch size
+comes from the 'batch_size' setting of the config profile (or DEFAULT_BATCH_SIZE) and is reduced if the
+estimated batch would not fit in the server's max_allowed_packet. Each call reports rows per second.
+
+On the embedded SQLite engine all rows go to one executemany call (one prepared statement reused for every row
+in the session transaction), as there is no network round trip or packet limit.
+
+Usage:
+======
+with db_session.session('home') as cnx:
+    batch_writer.writeRows(cnx, sql, rows, label='tissue')
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        upsertSql for delta ingest
+V1.2    18.10.26        mergeSql: upsert with per-column merge policy
+V1.3    18.10.26        Single executemany on SQLite engine
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import sys
+import time
+import db_session
+
+# ******************************************************************************
+
+DEFAULT_BATCH_SIZE  = 1000
+DEFAULT_PACKET      = 4194304       # MySQL default max_allowed_packet (4MB)
+PACKET_FRACTION     = 0.75          # share of max_allowed_packet one statement may use
+SAMPLE_ROWS         = 200           # rows used to estimate size of a row
+REPORT              = True          # print rows/s for each write
+PLACEHOLDERS        = ('', ' ', 'UNK', 'N/A', 'None')     # values meaning 'not known' (can be overwritten)
+
+# ******************************************************************************
+
+def maxPacket(cnx):
+    """Queries server for max_allowed_packet.
+    Input               cnx                     open connection
+    Output              max_packet              bytes allowed in one statement
+    """
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT @@max_allowed_packet;")
+        row = cursor.fetchone()
+    if row and row[0]:
+        return int(row[0])
+    return DEFAULT_PACKET
+
+# ******************************************************************************
+
+def rowBytes(rows):
+    """Estimates escaped size of one row of VALUES from a sample of rows.
+    Input               rows                    list of rows
+    Output              size                    estimated bytes per row
+    """
+    sample = rows[:SAMPLE_ROWS]
+    if not sample:
+        return 1
+    total = 0
+    for row in sample:
+        # quotes, comma and escaping overhead for each value, brackets for row
+        total += sum(len(str(v)) + 4 for v in row) + 3
+    return max(1, total // len(sample))
+
+# ******************************************************************************
+
+def batchSize(rows, max_packet, requested=None):
+    """Number of rows per executemany call, reduced so a batch fits within max_allowed_packet.
+    Input               rows                    list of rows to write
+                        max_packet              server max_allowed_packet
+                        requested               batch size from config (None for default)
+    Output              size                    rows per batch
+    """
+    size = requested or DEFAULT_BATCH_SIZE
+    fit = int(max_packet * PACKET_FRACTION) // rowBytes(rows)
+    return max(1, min(size, fit))
+
+# ******************************************************************************
+
+def report(label, count, elapsed):
+    """Prints rows written and rows per second."""
+    if REPORT:
+        rate = count / elapsed if elapsed > 0 else float(count)
+        print("%s: %d rows in %.2f s (%.0f rows/s)" % (label, count, elapsed, rate), file=sys.stderr)
+
+# ******************************************************************************
+
+def writeRows(cnx, sql, rows, batch_size=None, label='rows'):
+    """Writes rows in batches with executemany (multi-row VALUES).
+    Input               cnx                     open connection (from db_session)
+                        sql                     INSERT/REPLACE statement with single VALUES(%s,...) group
+                        rows                    iterable of rows (lists or tuples)
+                        batch_size              rows per batch (None uses DEFAULT_BATCH_SIZE)
+                        label                   name used in rows/s report
+    Output              count                   number of rows sent
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    start = time.perf_counter()
+    if rows and db_session.engine(cnx) == 'sqlite':
+        with cnx.cursor() as cursor:
+            cursor.executemany(sql, rows)
+    elif rows:
+        max_packet = maxPacket(cnx)
+        size = batchSize(rows, max_packet, batch_size)
+        with cnx.cursor() as cursor:
+            # pymysql splits multi-row statements at max_stmt_length
+            cursor.max_stmt_length = int(max_packet * PACKET_FRACTION)
+            for n in range(0, len(rows), size):
+                cursor.executemany(sql, rows[n:n + size])
+    report(label, len(rows), time.perf_counter() - start)
+    return len(rows)
+
+# ******************************************************************************
+
+def upsertSql(table, columns, key_columns):
+    """Builds INSERT ... ON DUPLICATE KEY UPDATE statement (updates in place, no delete/insert as REPLACE).
+    IGNORE skips rows whose parent row is missing, as the INSERT IGNORE loaders do.
+    Input               table                   table name
+                        columns                 column names in row order
+                        key_columns             primary key columns (not updated)
+    Output              sql                     statement for writeRows
+    """
+    updates = ', '.join('%s = VALUES(%s)' % (c, c) for c in columns if c not in key_columns)
+    return "INSERT IGNORE INTO %s (%s) VALUES(%s) ON DUPLICATE KEY UPDATE %s" % \
+           (table, ', '.join(columns), ','.join(['%s'] * len(columns)), updates)
+
+# ******************************************************************************
+
+def mergeClause(table, source, policy):
+    """Builds ON DUPLICATE KEY UPDATE assignments merging a row from source into an existing row.
+    Policy per column: name of preferred source (its values overwrite those of other sources) or 'fill'
+    (value only written if existing value is a placeholder). Placeholder and NULL values never overwrite real values.
+    Input               table                   table name (target columns are qualified with it)
+                        source                  source of rows being written ('GDC', 'COSMIC')
+                        policy                  dictionary column:preferred source or 'fill'
+    Output              clause                  assignments for ON DUPLICATE KEY UPDATE
+    """
+    missing = ','.join("'%s'" % p for p in PLACEHOLDERS)
+    updates = []
+    for column, prefer in policy.items():
+        target = '%s.%s' % (table, column)
+        new = 'VALUES(%s)' % column
+        if prefer == source:
+            updates.append("%s = IF(%s IS NULL OR %s IN (%s), %s, %s)" % (target, new, new, missing, target, new))
+        else:
+            updates.append("%s = IF(%s IS NULL OR %s IN (%s), %s, %s)" % (target, target, target, missing, new, target))
+    return ', '.join(updates)
+
+# ******************************************************************************
+
+def mergeSql(table, columns, source, policy):
+    """Builds INSERT ... ON DUPLICATE KEY UPDATE statement using merge policy (see mergeClause).
+    Input               table                   table name
+                        columns                 column names in row order
+                        source                  source of rows being written
+                        policy                  dictionary column:preferred source or 'fill'
+    Output              sql                     statement for writeRows
+    """
+    return "INSERT IGNORE INTO %s (%s) VALUES(%s) ON DUPLICATE KEY UPDATE %s" % \
+           (table, ', '.join(columns), ','.join(['%s'] * len(columns)), mergeClause(table, source, policy))
@@ -0,0 +1,171 @@
+#!/usr/bin python3
+
+""" Bulk load module """
+
+"""
+Program:    bulk_load
+File:       bulk_load.py
+Version:    1.0
+Date:       18.10.26
+Function:   LOAD DATA LOCAL INFILE bulk loading for full reloads of kinesin database, bulk upserts
+            through staging tables
+_____________________________________________________________________________
+Description:
+============
+For full reloads (delete_inserts.sql followed by dbinsert_module) parsed rows are streamed into a temporary
+TSV file and loaded with LOAD DATA LOCAL INFILE. 'IGNORE' and 'REPLACE' keep the duplicate handling of the
+INSERT IGNORE / REPLACE INTO statements used by the row-by-row loaders.
+
+Needs 'local_infile': True in the config profile and local_infile enabled on the MySQL server. On the embedded
+SQLite engine rows are streamed straight into one executemany of INSERT IGNORE / REPLACE INTO instead (no TSV
+file), and upserts are applied directly.
+
+mergeRows upserts in bulk: rows are loaded into a temporary staging table (copy of the target) and merged with a
+single INSERT ... SELECT ... ON DUPLICATE KEY UPDATE.
+
+Usage:
+======
+with db_session.session('home') as cnx:
+    bulk_load.loadRows(cnx, 'tissue', columns, rows, 'IGNORE')
+    bulk_load.mergeRows(cnx, 'mutation', columns, rows, batch_writer.mergeClause('mutation', 'GDC', policy))
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Staging table updates (stageUpdate)
+V1.2    18.10.26        Bulk upsert through staging table (mergeRows)
+V1.3    18.10.26        SQLite engine paths
+V1.4    18.10.26        Removed stageUpdate (impact results are written
+                        as impact_score rows, impact_store)
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import os
+import tempfile
+import time
+import batch_writer as batch
+import db_session
+
+# ******************************************************************************
+
+DUPLICATES  = ('IGNORE', 'REPLACE')
+
+# ******************************************************************************
+
+def tsvField(value):
+    """Escapes one value for LOAD DATA (default ESCAPED BY '\\'), None is written as NULL."""
+    if value is None:
+        return '\\N'
+    value = str(value)
+    if '\\' in value or '\t' in value or '\n' in value:
+        value = value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+    return value
+
+# ******************************************************************************
+
+def writeTsv(rows, directory=None):
+    """Streams rows into temporary TSV file.
+    Input               rows                    iterable of rows (lists or tuples)
+                        directory               directory for temporary file (None for system default)
+    Output              path                    path of TSV file
+                        count                   number of rows written
+    """
+    count = 0
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', dir=directory, delete=False,
+                                     encoding='utf-8', newline='\n') as tsv:
+        for row in rows:
+            tsv.write('\t'.join(tsvField(v) for v in row))
+            tsv.write('\n')
+            count += 1
+    return tsv.name, count
+
+# ******************************************************************************
+
+def streamRows(cnx, sql, rows, label):
+    """SQLite bulk path: streams rows into a single executemany (inside the session transaction).
+    Input               cnx                     open sqlite_backend connection
+                        sql                     statement with one VALUES(%s,...) group
+                        rows                    iterable of rows
+                        label                   name used in rows/s report
+    Output              count                   number of rows sent
+    """
+    start = time.perf_counter()
+    sent = [0]
+
+    def counted():
+        for row in rows:
+            sent[0] += 1
+            yield row
+
+    with cnx.cursor() as cursor:
+        cursor.executemany(sql, counted())
+    batch.report(label, sent[0], time.perf_counter() - start)
+    return sent[0]
+
+# ******************************************************************************
+
+def loadRows(cnx, table, columns, rows, duplicates='IGNORE', label=None):
+    """Loads rows into table with LOAD DATA LOCAL INFILE.
+    Input               cnx                     open connection with local_infile enabled
+                        table                   table name
+                        columns                 column names in row order
+                        rows                    iterable of rows
+                        duplicates              'IGNORE' (as INSERT IGNORE) or 'REPLACE' (as REPLACE INTO)
+                        label                   name used in rows/s report
+    Output              count                   number of rows sent
+    """
+    if duplicates not in DUPLICATES:
+        raise ValueError("duplicates must be one of %s" % (DUPLICATES,))
+    if db_session.engine(cnx) == 'sqlite':
+        sql = "%s %s (%s) VALUES(%s)" % ({'IGNORE': 'INSERT IGNORE', 'REPLACE': 'REPLACE INTO'}[duplicates],
+                                          table, ', '.join(columns), ','.join(['%s'] * len(columns)))
+        return streamRows(cnx, sql, rows, label or table)
+
+    start = time.perf_counter()
+    path, count = writeTsv(rows)
+    sql = "LOAD DATA LOCAL INFILE %%s %s INTO TABLE %s CHARACTER SET utf8mb4 " \
+          "FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' (%s);" % (duplicates, table, ', '.join(columns))
+    try:
+        if count:
+            with cnx.cursor() as cursor:
+                cursor.execute(sql, (path,))
+    finally:
+        os.remove(path)
+    batch.report(label or table, count, time.perf_counter() - start)
+    return count
+
+# ******************************************************************************
+
+def mergeRows(cnx, table, columns, rows, update, label=None):
+    """Bulk upsert: LOAD DATA into temporary copy of table, then INSERT ... SELECT ... ON DUPLICATE KEY UPDATE
+    (LOAD DATA itself can only IGNORE or REPLACE duplicates).
+    Input               cnx                     open connection with local_infile enabled
+                        table                   table name
+                        columns                 column names in row order
+                        rows                    iterable of rows
+                        update                  ON DUPLICATE KEY UPDATE assignments (batch_writer.mergeClause)
+                        label                   name used in rows/s report
+    Output              count                   number of rows sent
+    """
+    staging = 'staging_' + table
+    names   = ', '.join(columns)
+    if db_session.engine(cnx) == 'sqlite':
+        # upsert applies directly, no staging table needed
+        sql = "INSERT IGNORE INTO %s (%s) VALUES(%s) ON DUPLICATE KEY UPDATE %s" % \
+              (table, names, ','.join(['%s'] * len(columns)), update)
+        return streamRows(cnx, sql, rows, label or table)
+
+    with cnx.cursor() as cursor:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS %s;" % staging)
+        cursor.execute("CREATE TEMPORARY TABLE %s LIKE %s;" % (staging, table))
+    try:
+        count = loadRows(cnx, staging, columns, rows, 'REPLACE', label)
+        with cnx.cursor() as cursor:
+            cursor.execute("INSERT IGNORE INTO %s (%s) SELECT %s FROM %s ON DUPLICATE KEY UPDATE %s;"
+                           % (table, names, names, staging, update))
+    finally:
+        with cnx.cursor() as cursor:
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS %s;" % staging)
+    return count
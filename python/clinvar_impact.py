@@ -32,6 +32,10 @@ V1.0    10.04.19        Initial                                             By:
 V2.0    17.06.19        Changed mutation identification from genomic            JJS
                         to amino acid substitution (genomic coordinates
                         differ between databases)
+V2.1    18.10.26        Use pooled connections from db_session module
+V2.2    18.10.26        Look up integer mutation_id by protein
+V2.3    18.10.26        Write impact_score rows (impact_store)
+V2.4    18.10.26        Protein change from cached normaliser (protein_change)
 """
 
 #
@@ -39,11 +43,10 @@ V2.0    17.06.19        Changed mutation identification from genomic
 # Import libraries
 
 import csv
-import re
-import config_home
-import pymysql
-import config_kinesin
-import Bio.Data.IUPACData
+import mutation_ids as ids
+import impact_store as store
+import protein_change as pc
+import impact_table as impact
 
 #*****************************************************************************
 
@@ -62,31 +65,12 @@ def parseClinvar(gene, csv_file):
         for row in csv_reader:
             clin_sig = row['Clinical significance (Last reviewed)']
             # remove review date in parentheses
-            r = re.compile(r'\(.*\)$')
-            clin_sig = r.sub('', clin_sig)
+            clin_sig = impact.CLINVAR_REVIEWED.sub('', clin_sig)
             mut_name    = row['Name']
             ##NM_004523.3(KIF11):c.2T>C (p.Met1Thr)
-            p       = re.compile(r'.+(\(KIF11\)).+p.(\w+)')
-            it      = p.finditer(mut_name)
-            for match in it:
-                mut = str(match.group(2))
-                # extract 3-letter amino acid codes and resnum
-                q       = re.compile(r'(\D+)(\d+)(\D{3})')
-                ob      = q.finditer(mut)
-                for x in ob:
-                    old_aa3 = str(x.group(1))
-                    resnum = str(x.group(2))
-                    new_aa3 = str(x.group(3))
-                # reformat protein entry for one letter IUPAC code
-                    try:
-                        old_aa1 = Bio.Data.IUPACData.protein_letters_3to1[old_aa3]
-                    except KeyError:
-                        old_aa1 = '*'
-                    try:
-                        new_aa1 = Bio.Data.IUPACData.protein_letters_3to1[new_aa3]
-                    except KeyError:
-                        new_aa1 = '*'
-                    new_mutation = old_aa1 + resnum + new_aa1
+            for match in impact.CLINVAR_NAME.finditer(mut_name):
+                # 3-letter amino acid codes and resnum in one letter IUPAC code
+                for new_mutation in pc.threeLetterChanges(match.group(2)):
                     cv_entry = [clin_sig, new_mutation]
                     cv_list.append(cv_entry)
     return cv_list
@@ -97,36 +81,15 @@ def clinvarUpdate(clinvar_list, database):
     """ This function uses list of clinvar attributes to update impact table in kinesin database.
     Input               clinvar_list                    list of attributes (genomic location, clinical significance)
                         database                        which database used
-    Output              count                           number of successfully updated rows in impact table
+    Output              count                           number of impact_score rows written for mutations with
+                                                        scores (matched rows)
     """
 
 
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_clinvar = "UPDATE impact SET clinvar_prediction = %s WHERE mutation_id = %s;"
-
-    count = 0
-    for item in clinvar_list:
-        with cnx.cursor() as cursor:
-            rows = cursor.execute(sql_clinvar, item)
-            count += 1
-
-    cnx.commit()
-    cnx.close()
+    # impact is a view of impact_score: entries [clin_sig, mutation] written as clinvar rows of mutations with scores
+    staged = ids.resolve(database, [(item[1], item[0]) for item in clinvar_list])
+    scores = store.scoreRows(staged, ('mutation_id', 'clinvar_prediction'))
+    count = store.writeScores(database, 'clinvar', scores, replace=True, scored_only=True)
 
     return count
 
@@ -0,0 +1,144 @@
+#!/usr/bin python3
+
+""" Load mode comparison """
+
+"""
+Program:    compare_loads
+File:       compare_loads.py
+Version:    1.0
+Date:       18.10.26
+Function:   Check that a delta load of the source files gives the same database as a batch load
+_____________________________________________________________________________
+Description:
+============
+Delta mode writes only rows that changed since the last run, batch mode sends every row; both must converge to
+the same tables. This script loads the source files (dbinsert_module.loadAll) into two new embedded SQLite
+databases ('local' profile), one in batch mode and one in delta mode, and compares the loaded tables row by row.
+Each load runs in its own process, so no mutation_id or tissue code map is shared between the two databases.
+
+mutation_id is a surrogate key numbered by each database, so rows are compared with the protein change of their
+mutation in its place. Rows found in only one of the databases are reported per table; the script exits with
+status 1 if any table differs.
+
+Usage:
+======
+cd data; python3 ../python/compare_loads.py [mode ...]        # modes compared with batch, default delta
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import os
+import sys
+import sqlite3
+import tempfile
+import multiprocessing
+import config_local
+import db_session
+import dbinsert_module
+
+# ******************************************************************************
+
+DATABASE        = 'local'
+REFERENCE_MODE  = 'batch'
+COMPARED_TABLES = ('mutation', 'source_info', 'impact_score', 'tissue', 'frequency', 'domain_tissue_count')
+SHOWN_ROWS      = 5             # rows reported per table and database
+
+# ******************************************************************************
+
+def loadFile(dbfile, mode):
+    """Loads all tables into a new SQLite database file (run in a child process)."""
+    config_local.database_config['dbfile'] = dbfile
+    dbinsert_module.loadAll(DATABASE, mode)
+    db_session.closeAll()
+
+# ******************************************************************************
+
+def loadDatabase(dbfile, mode):
+    """Runs loadFile in a new process.
+    Input               dbfile                  SQLite database file (created by the load)
+                        mode                    'batch', 'bulk' or 'delta'
+    Output                                      loaded database file
+    """
+    process = multiprocessing.get_context('spawn').Process(target=loadFile, args=(dbfile, mode))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError("%s load failed (exit code %s)" % (mode, process.exitcode))
+
+# ******************************************************************************
+
+def tableRows(cnx, table, proteins):
+    """Rows of a table as a set, mutation_id replaced by protein change.
+    Input               cnx                     sqlite3 connection
+                        table                   table name
+                        proteins                dictionary mutation_id:protein
+    Output              rows                    set of row tuples
+    """
+    cursor = cnx.execute("SELECT * FROM %s;" % table)
+    columns = [c[0] for c in cursor.description]
+    position = columns.index('mutation_id') if 'mutation_id' in columns else None
+    rows = set()
+    for row in cursor:
+        if position is not None:
+            row = row[:position] + (proteins.get(row[position], row[position]),) + row[position + 1:]
+        rows.add(row)
+    return rows
+
+# ******************************************************************************
+
+def databaseRows(dbfile):
+    """Rows of every compared table of a database file.
+    Output              tables                  dictionary table:set of rows
+    """
+    with sqlite3.connect(dbfile) as cnx:
+        proteins = dict(cnx.execute("SELECT mutation_id, protein FROM mutation;").fetchall())
+        return {table: tableRows(cnx, table, proteins) for table in COMPARED_TABLES}
+
+# ******************************************************************************
+
+def compareLoads(mode, reference=REFERENCE_MODE):
+    """Loads the source files in two modes and compares the tables.
+    Input               mode                    load mode checked ('delta' or 'bulk')
+                        reference               load mode compared with
+    Output              differences             dictionary table:(rows only in reference, rows only in mode),
+                                                tables that are the same left out
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tables = {}
+        for name in (reference, mode):
+            dbfile = os.path.join(tmp_dir, 'kinesin_%s.sqlite' % name)
+            loadDatabase(dbfile, name)
+            tables[name] = databaseRows(dbfile)
+
+    differences = {}
+    for table in COMPARED_TABLES:
+        expected, found = tables[reference][table], tables[mode][table]
+        if expected != found:
+            differences[table] = (expected - found, found - expected)
+    return differences
+
+# ******************************************************************************
+
+########## main ############
+
+if __name__ == "__main__":
+
+    failed = False
+    for mode in sys.argv[1:] or ['delta']:
+        differences = compareLoads(mode)
+        for table, (missing, extra) in sorted(differences.items()):
+            print("%s: %d rows only in %s load, %d rows only in %s load"
+                  % (table, len(missing), REFERENCE_MODE, len(extra), mode))
+            for row in sorted(missing, key=repr)[:SHOWN_ROWS]:
+                print("    %s  %s" % (REFERENCE_MODE, row))
+            for row in sorted(extra, key=repr)[:SHOWN_ROWS]:
+                print("    %s  %s" % (mode, row))
+        print("%s load %s %s load" % (mode, 'differs from' if differences else 'matches', REFERENCE_MODE))
+        failed = failed or bool(differences)
+
+    sys.exit(1 if failed else 0)
@@ -11,5 +11,9 @@ database_config = {
     'dbhost' :'localhost',
     'dbuser' : 'root',
     'dbpass' : 'password',
-    'port'   : 3306
+    'port'   : 3306,
+    'pool_size'     : 8,        # connections kept by db_session
+    'ping_interval' : 30,       # seconds idle before connection is checked
+    'batch_size'    : 1000,     # rows per multi-row insert (reduced to fit max_allowed_packet)
+    'local_infile'  : True      # allow LOAD DATA LOCAL INFILE (bulk reload mode)
     }
@@ -0,0 +1,17 @@
+#!/usr/bin python3
+
+# config_local.py
+# for embedded SQLite kinesin database (laptop or CI, no MySQL server)
+
+import os
+
+# Set parameters
+database_config = {
+    'engine' : 'sqlite',
+    'dbname' : 'kinesin',
+    'dbfile' : os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', 'kinesin.sqlite'),
+    'pool_size'     : 1,        # SQLite allows one writer at a time, loads run in sequence
+    'ping_interval' : 30,       # seconds idle before connection is checked
+    'batch_size'    : 1000,     # not used by SQLite (one executemany per load)
+    'timeout'       : 60        # seconds to wait for write lock
+    }
@@ -29,6 +29,8 @@ Revision History:
 V 1.0               Initial version                                 By: JJS
 V 1.2               Includes file opening and gene specification        JJS
                     as function arguments.            
+V 1.3   18.10.26    Protein change from cached normaliser
+                    (protein_change)
                       
 """
 
@@ -40,7 +42,7 @@ import sys
 #import pymysql
 #import config_kinesin
 import csv
-import re
+import protein_change as pc
 
 # ******************************************************************************
 
@@ -66,8 +68,8 @@ def cosmicParser(my_gene, csv_file):
                 genomic_id      = row[1]
                 coding          = 'y'
                 protein         = row[18]
-                # eliminate 'p.'
-                protein         = protein.replace('p.', '')
+                # eliminate 'p.' ('=' of synonymous changes as reference residue)
+                protein         = pc.cosmicChange(protein)
                 cds             = row[17]
                 description     = row[19]             # includes type and consequence
                 organism        = 'Homo sapiens'
@@ -0,0 +1,113 @@
+#!/usr/bin python3
+
+""" COSMIC export reader """
+
+"""
+Program:    cosmic_reader
+File:       cosmic_reader.py
+Version:    1.0
+Date:       18.10.26
+Function:   Stream rows of one gene from a COSMIC mutant export, projected to the columns a parser needs
+_____________________________________________________________________________
+Description:
+============
+The genome-wide COSMIC mutant export (CosmicMutantExport) is tens of GB with one row per sample and mutation for
+every gene. The parsers only need rows of one gene and a few of its 35 columns. readCosmic() resolves the
+positions of the wanted columns once from the header (names compared without the spaces of ', ' separated
+headers), then reads the file line by line: a line is only split when its first field is the gene, so rows of
+other genes are rejected with one string comparison. Rows are yielded as tuples of the wanted fields in the order
+asked for, so nothing is kept in memory but the current line.
+
+The delimiter is taken from the header (tab for the .tsv export, comma for the gene download used in data/),
+files ending in .gz are read compressed. Given the gene's regions, an export indexed by region_index is not
+scanned: only the compressed blocks overlapping the regions are read.
+
+Usage:
+======
+for protein, site in readCosmic('CosmicMutantExport.tsv.gz', 'KIF11', ('MUTATION_AA', 'PRIMARY_SITE')):
+    ...
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Read gene regions through region index
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import csv
+import gzip
+import region_index as region
+
+# ******************************************************************************
+
+GENE_COLUMN     = 'GENE_NAME'
+
+# ******************************************************************************
+
+def openExport(export_file):
+    """Opens COSMIC export as text, decompressing .gz files."""
+    if export_file.endswith('.gz'):
+        return gzip.open(export_file, 'rt', newline='')
+    return open(export_file, newline='')
+
+# ******************************************************************************
+
+def columnIndex(header, columns):
+    """Positions of columns in header.
+    Input               header                  list of header fields (spaces around names ignored)
+                        columns                 column names wanted
+    Output              index                   list of positions, in order of columns
+    """
+    names = [name.strip() for name in header]
+    missing = [c for c in columns if c not in names]
+    if missing:
+        raise KeyError("COSMIC export has no column %s" % ', '.join(missing))
+    return [names.index(c) for c in columns]
+
+# ******************************************************************************
+
+def readCosmic(export_file, gene, columns, regions=None):
+    """Yields the wanted fields of each row of gene.
+    Input               export_file             COSMIC mutant export (csv or tsv, may be .gz)
+                        gene                    gene name as in GENE_NAME ('KIF11')
+                        columns                 column names wanted
+                        regions                 (chrom, start, end) of gene: only rows in these regions are read if
+                                                the export has a region index (region_index.indexExport)
+    Output              rows                    generator of tuples of fields, in order of columns
+    """
+    if regions and region.hasIndex(export_file):
+        index = region.readIndex(export_file)
+        delimiter = index['delimiter']
+        lines = region.regionLines(export_file, regions, index)
+        yield from projectRows(index['header'], delimiter, lines, gene, columns)
+        return
+
+    with openExport(export_file) as file:
+        first = file.readline()
+        delimiter = '\t' if '\t' in first else ','
+        yield from projectRows(first, delimiter, file, gene, columns)
+
+# ******************************************************************************
+
+def projectRows(first, delimiter, lines, gene, columns):
+    """Wanted fields of the rows of gene among lines.
+    Input               first                   header line
+                        delimiter               field delimiter
+                        lines                   iterable of rows (lines of text)
+                        gene                    gene name
+                        columns                 column names wanted
+    Output              rows                    generator of tuples of fields, in order of columns
+    """
+    header = next(csv.reader([first], delimiter=delimiter))
+    index = columnIndex(header, columns)
+    gene_index = columnIndex(header, (GENE_COLUMN,))[0]
+    prefix = (gene + delimiter, '"%s"%s' % (gene, delimiter))
+
+    if gene_index == 0:
+        # gene is the first field: other genes rejected before the line is split
+        lines = (line for line in lines if line.startswith(prefix))
+    for row in csv.reader(lines, delimiter=delimiter):
+        if row and row[gene_index] == gene:
+            yield tuple(row[i] for i in index)
@@ -0,0 +1,209 @@
+#!/usr/bin python3
+
+""" Database session module """
+
+"""
+Program:    db_session
+File:       db_session.py
+Version:    1.0
+Date:       18.10.26
+Function:   Pooled, health-checked connections to kinesin database
+_____________________________________________________________________________
+Description:
+============
+This module replaces the connection block repeated in every insert/update/query function. Connections are kept
+in one pool per database profile ('home' uses config_home, 'kenobi' uses config_kinesin) and handed out by the
+session() context manager. Idle connections are pinged before reuse and dropped if the server has gone away,
+so the whole pipeline (and any long-running consumer) reuses warm connections instead of reconnecting per call.
+
+Pool size and ping interval can be set per profile with 'pool_size' and 'ping_interval' in database_config.
+
+Storage engine is chosen per profile with 'engine' in database_config: 'mysql' (default, pymysql) or 'sqlite'
+(embedded database file, sqlite_backend). The 'local' profile (config_local) runs the whole pipeline without a
+server. engine(cnx) tells loaders which engine a connection belongs to, so they can use its bulk-insert path.
+
+Usage:
+======
+with db_session.session('home') as cnx:
+    with cnx.cursor() as cursor:
+        cursor.execute(sql)
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Pluggable engine: MySQL or embedded SQLite
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import threading
+import time
+from contextlib import contextmanager
+import sqlite3
+import config_home
+import config_kinesin
+import config_local
+import sqlite_backend
+try:
+    import pymysql
+except ImportError:         # only the sqlite engine can be used
+    pymysql = None
+
+# ******************************************************************************
+
+PROFILES        = {'home': config_home, 'kenobi': config_kinesin, 'local': config_local}
+ENGINES         = ('mysql', sqlite_backend.ENGINE)
+ERRORS          = (sqlite3.Error,) + ((pymysql.Error,) if pymysql else ())
+POOL_SIZE       = 8         # maximum connections open at once per profile
+PING_INTERVAL   = 30        # seconds a connection may sit idle before it is checked
+
+_pools          = {}
+_pools_lock     = threading.Lock()
+
+# ******************************************************************************
+
+def getConfig(database):
+    """Returns database_config for profile, unknown names use home database (as before).
+    Input               database                kenobi, home or local
+    Output              config                  database_config dictionary from config module
+    """
+    return PROFILES.get(database, config_home).database_config
+
+# ******************************************************************************
+
+class ConnectionPool:
+    """Thread-safe pool of connections for one database profile."""
+
+    def __init__(self, config):
+        self.config         = config
+        self.engine         = config.get('engine', 'mysql')
+        if self.engine not in ENGINES:
+            raise ValueError("engine must be one of %s" % (ENGINES,))
+        self.size           = config.get('pool_size', POOL_SIZE)
+        self.ping_interval  = config.get('ping_interval', PING_INTERVAL)
+        self._idle          = []                    # (connection, time returned to pool)
+        self._lock          = threading.Lock()
+        self._slots         = threading.BoundedSemaphore(self.size)
+
+    def connect(self):
+        """Opens new connection using profile settings."""
+        if self.engine == sqlite_backend.ENGINE:
+            return sqlite_backend.connect(self.config)
+        return pymysql.connect(host=self.config['dbhost'],
+                               port=self.config.get('port', 3306),
+                               user=self.config['dbuser'],
+                               passwd=self.config['dbpass'],
+                               db=self.config['dbname'],
+                               local_infile=self.config.get('local_infile', False))
+
+    def healthy(self, cnx, last_used):
+        """Checks idle connection is still usable, only pings if idle longer than ping_interval."""
+        if not cnx.open:
+            return False
+        if time.monotonic() - last_used < self.ping_interval:
+            return True
+        try:
+            cnx.ping(reconnect=False)
+            return True
+        except ERRORS:
+            return False
+
+    def acquire(self):
+        """Returns warm connection from pool, or a new one. Blocks if pool_size connections are in use."""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    cnx, last_used = self._idle.pop()
+                if self.healthy(cnx, last_used):
+                    return cnx
+                discard(cnx)
+            return self.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, cnx, broken=False):
+        """Returns connection to pool, broken connections are closed instead."""
+        try:
+            if broken or not cnx.open:
+                discard(cnx)
+            else:
+                with self._lock:
+                    self._idle.append((cnx, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for cnx, last_used in idle:
+            discard(cnx)
+
+# ******************************************************************************
+
+def discard(cnx):
+    """Closes connection, ignoring errors from a connection that is already dead."""
+    try:
+        cnx.close()
+    except ERRORS:
+        pass
+
+# ******************************************************************************
+
+def engine(cnx):
+    """Storage engine of connection, 'mysql' or 'sqlite'."""
+    return getattr(cnx, 'engine', 'mysql')
+
+# ******************************************************************************
+
+def getPool(database):
+    """Returns (creating on first use) the connection pool for database profile.
+    Input               database                kenobi, home or local
+    Output              pool                    ConnectionPool for profile
+    """
+    config = getConfig(database)
+    with _pools_lock:
+        pool = _pools.get(id(config))
+        if pool is None:
+            pool = ConnectionPool(config)
+            _pools[id(config)] = pool
+    return pool
+
+# ******************************************************************************
+
+@contextmanager
+def session(database):
+    """Context manager handing out pooled connection. Commits on success, rolls back on error, then returns
+    connection to the pool.
+    Input               database                kenobi, home or local
+    Output              cnx                     open pymysql or sqlite_backend connection
+    """
+    pool = getPool(database)
+    cnx = pool.acquire()
+    try:
+        yield cnx
+        cnx.commit()
+    except BaseException:
+        broken = False
+        try:
+            cnx.rollback()
+        except ERRORS:
+            broken = True
+        pool.release(cnx, broken)
+        raise
+    else:
+        pool.release(cnx)
+
+# ******************************************************************************
+
+def closeAll():
+    """Closes idle connections in every pool (call at end of a pipeline run)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -20,7 +20,10 @@ Description:
 ============
 This program calls on parsing and functions from mutation_parser module and parsing and insertion functions from 
 impact_table module. Running program will insert attributes for all tables in kinesin database. 
-Must to do each table in sep function to avoid foreign key constraints.
+Must to do each table in sep function to avoid foreign key constraints. Loads are run by load_scheduler, which
+runs loads of independent tables (source_info, impact, tissue) at the same time once mutation is loaded.
+Parsers identify mutations by protein change; loaders of source_info, impact and tissue replace it with the integer
+mutation_id of the mutation table (mutation_ids.resolve) before writing.
 
 Usage:
 ======
@@ -35,391 +38,374 @@ V1.3    11.06.19        Update impact table with complete VEP, clinvar, fathmm
 V1.4    15.07.19        Added return number of rows to all functions                JJS
                         Use impact_table module to streamline parsing functions
 V1.5    16.07.19        Added median scores functions to complete insertion         JJS
+V1.6    18.10.26        Use pooled connections from db_session module
+V1.7    18.10.26        Batched multi-row inserts (batch_writer) for all loaders
+V1.8    18.10.26        LOAD DATA bulk mode for mutation, source_info and tissue
+V1.9    18.10.26        Run loads with load_scheduler (concurrent where FKs allow)
+V1.10   18.10.26        Parse source files in parallel (parse_stage)
+V1.11   18.10.26        Delta mode: write only rows changed since last run
+V1.12   18.10.26        Merge GDC/COSMIC mutations with ON DUPLICATE KEY UPDATE
+                        and per-column policy instead of REPLACE INTO
+V1.13   18.10.26        'local' profile: embedded SQLite storage backend
+V1.14   18.10.26        Child rows reference integer mutation_id (mutation_ids map)
+V1.15   18.10.26        Tissue site and histology stored as codes (tissue_codes)
+V1.16   18.10.26        Refresh domain_tissue_count summary after loads
+V1.17   18.10.26        Refresh frequency (recurrence) table after loads
+V1.18   18.10.26        Impact loads write impact_score (impact is a view of it)
+V1.19   18.10.26        COSMIC export parsed once for mutation and tissue loads
+V1.20   18.10.26        COSMIC rows read by gene region when export is indexed
+V1.21   18.10.26        Parsed rows are named records (mutation_records), sent
+                        to the loaders without copying into lists
+V1.22   18.10.26        GDC and combined impact rows written to impact_score
+V1.23   18.10.26        Delta loads keep first row of duplicate keys for tables
+                        loaded with INSERT IGNORE; loads run by loadAll
+V1.24   18.10.26        COSMIC FATHMM score and prediction written to their
+                        own columns, as impact_score rows
 """
 
 # ******************************************************************************
 # Import libraries
 import sys
-import pymysql
-import config_kinesin
-import config_home
+import db_session
+import batch_writer as batch
+import bulk_load as bulk
+import delta_ingest as delta
 import mutation_parser as mutation
 import impact_table as i
 import median_score as med
+import mutation_ids as ids
+import tissue_codes as codes
+import summary_tables as summary
+import load_scheduler as sched
+import parse_stage as parse
+import region_index as region
+import mutation_records as rec
+import impact_store as store
 
 # ******************************************************************************
-def insertCosmicSource(mutation_dict, database):
+# column order of rows built by loaders (used by bulk mode), fields of the parsed records
+
+MUTATION_COLUMNS    = rec.MutationRecord._fields
+SOURCE_COLUMNS      = rec.SourceRecord._fields
+TISSUE_COLUMNS      = ('mutation_id', 'sample_id', 'site_id', 'histology_id')
+TISSUE_CODES        = {2: 'tissue_type', 3: 'cancer_type'}     # names in parsed tissue rows encoded by tissue_codes
+
+MUTATION_KEY        = ('protein',)
+
+# mutation reported by both GDC and COSMIC is updated in place (no REPLACE, so no ON DELETE CASCADE of
+# source_info, impact and tissue rows). Column is kept from preferred source, other source only fills
+# placeholders ('fill': first real value is kept).
+MUTATION_MERGE      = {'resnum':        'COSMIC',
+                       'genomic':       'COSMIC',
+                       'coding':        'fill',
+                       'cds':           'COSMIC',
+                       'mutation_type': 'COSMIC',
+                       'consequence':   'GDC',
+                       'gene_name':     'fill',
+                       'organism':      'fill',
+                       'domain':        'COSMIC'}
+SOURCE_KEY          = ('source_id',)
+TISSUE_KEY          = ('mutation_id', 'sample_id')
+
+# ******************************************************************************
+def writeBatch(database, sql, rows, label):
+    """Sends rows to database in multi-row batches on a pooled connection.
+    Input               database                kenobi or home
+                        sql                     insert statement with one VALUES(%s,...) group
+                        rows                    list of rows to insert
+                        label                   table name for rows/s report
+    Output              i                       number of rows sent
+    """
+    batch_size = db_session.getConfig(database).get('batch_size')
+    with db_session.session(database) as cnx:
+        i = batch.writeRows(cnx, sql, rows, batch_size, label)
+    return i
+
+# ******************************************************************************
+def writeBulk(database, table, columns, rows, duplicates, label, update=None):
+    """Streams rows into temporary TSV file and loads with LOAD DATA LOCAL INFILE (full reload mode).
+    Input               database                kenobi or home
+                        table                   table name
+                        columns                 column names in row order
+                        rows                    iterable of rows
+                        duplicates              'IGNORE' or 'REPLACE', as in the matching insert statement
+                        label                   table name for rows/s report
+                        update                  ON DUPLICATE KEY UPDATE assignments to merge duplicates instead
+    Output              i                       number of rows sent
+    """
+    with db_session.session(database) as cnx:
+        if update:
+            i = bulk.mergeRows(cnx, table, columns, rows, update, label)
+        else:
+            i = bulk.loadRows(cnx, table, columns, rows, duplicates, label)
+    return i
+
+# ******************************************************************************
+def writeDelta(database, table, source, columns, key_columns, rows, sql=None, ignore=False):
+    """Sends only rows that changed since last run (delta mode), deletes rows no longer in source.
+    Input               database                kenobi or home
+                        table                   table name
+                        source                  'GDC' or 'COSMIC'
+                        columns                 column names in row order
+                        key_columns             primary key columns of table
+                        rows                    all parsed rows
+                        sql                     upsert statement (default overwrites all non-key columns)
+                        ignore                  True for tables loaded with INSERT IGNORE in batch mode (first row
+                                                of a duplicate key is kept, as in batch and bulk loads)
+    Output              i                       number of rows inserted, updated or deleted
+    """
+    batch_size = db_session.getConfig(database).get('batch_size')
+    with db_session.session(database) as cnx:
+        counts = delta.syncTable(cnx, table, source, columns, key_columns, rows, batch_size, sql=sql,
+                                 ignore=ignore)
+    return sum(counts)
+
+# ******************************************************************************
+def insertCosmicSource(mutation_dict, database, mode='batch'):
     """Inserts entries from Cosmic mutations into source_info table.
-    Input               mutation_dict           dictionary of attributes from Cosmic csv file
+    Input               mutation_dict           dictionary protein:CosmicRecord from Cosmic csv file
                         database                database: kenobi or home
+                        mode                    'batch' (multi-row insert), 'bulk' (LOAD DATA) or 'delta'
     Output                                      inserted row into db source_info table
     """
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
     sql_source = "INSERT IGNORE INTO source_info (source_id, source_db, mutation_id) VALUES(%s,%s,%s)"
 
-    source_line = []
-    source_list = []
-    # extract values from mutation_dict and put in list
-    for k in mutation_dict:
-        if k != "None":
-            source_line = [mutation_dict[k][9], mutation_dict[k][8], k]
-            source_list.append(source_line)
+    # source_info row of each record
+    source_list = ids.resolve(database, (mutation_dict[k].source(k) for k in mutation_dict if k != "None"), index=2)
 
     # use list to populate source table
-    i = 0
-    for x in source_list:
-            rows = cursor.execute(sql_source, x)
-            i += 1
+    if mode == 'bulk':
+        i = writeBulk(database, 'source_info', SOURCE_COLUMNS, source_list, 'IGNORE', 'source_info (COSMIC)')
+    elif mode == 'delta':
+        i = writeDelta(database, 'source_info', 'COSMIC', SOURCE_COLUMNS, SOURCE_KEY, source_list, ignore=True)
+    else:
+        i = writeBatch(database, sql_source, source_list, 'source_info (COSMIC)')
 
-    cnx.commit()
-    cnx.close()
     return i
 
 # ******************************************************************************
-def insertMutation(mutations, database):
+def insertMutation(mutations, database, mode='batch'):
     """Inserts entry into mutation table.
     Input               mutations           list of attributes from gdc
                         database            kenobi or home
+                        mode                'batch' (multi-row insert), 'bulk' (LOAD DATA) or 'delta'
     Output                                  inserted row into db
     """
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
+    # mutation already inserted from cosmic is merged using MUTATION_MERGE policy
+    sql_mutation = batch.mergeSql('mutation', MUTATION_COLUMNS, 'GDC', MUTATION_MERGE)
+    gdc_mut = [x for x in mutations[0] if x[0] != "None"]   #  and x[4]=="missense_variant"
+    if mode == 'bulk':
+        i = writeBulk(database, 'mutation', MUTATION_COLUMNS, gdc_mut, 'IGNORE', 'mutation (GDC)',
+                      batch.mergeClause('mutation', 'GDC', MUTATION_MERGE))
+    elif mode == 'delta':
+        i = writeDelta(database, 'mutation', 'GDC', MUTATION_COLUMNS, MUTATION_KEY, gdc_mut, sql_mutation)
     else:
-        ## if database is local home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_mutation = "INSERT IGNORE INTO mutation (protein, resnum, genomic, coding, cds, mutation_type, consequence, " \
-                   "gene_name, organism, domain) VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-    gdc_mut = mutations[0]
-    i = 0
-    for x in gdc_mut:
-        if x[0] != "None": #  and x[4]=="missense_variant":
-            rows = cursor.execute(sql_mutation, x)
-            i += 1
-
-    cnx.commit()
-    cnx.close()
+        i = writeBatch(database, sql_mutation, gdc_mut, 'mutation (GDC)')
+    ids.forget(database)
+
     return i
 
 # ******************************************************************************
-def insertSource(mutations, database):
+def insertSource(mutations, database, mode='batch'):
     """Inserts entry into source table.
     Input               mutations           list of mutations from gdc
                         database            database used: kenobi or home
+                        mode                'batch' (multi-row insert), 'bulk' (LOAD DATA) or 'delta'
     Output                                  inserted row into db
     """
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
     sql_source = "INSERT IGNORE INTO source_info (source_id, source_db, mutation_id) VALUES(%s,%s,%s)"
-    gdc_source = mutations[1]
-    i = 0
-    for x in gdc_source:
-        if x[2] != "None": #  and x[4]=="missense_variant":
-            rows = cursor.execute(sql_source, x)
-            i += 1
-    cnx.commit()
-    cnx.close()
+    gdc_source = ids.resolve(database, [x for x in mutations[1] if x[2] != "None"], index=2)
+    if mode == 'bulk':
+        i = writeBulk(database, 'source_info', SOURCE_COLUMNS, gdc_source, 'IGNORE', 'source_info (GDC)')
+    elif mode == 'delta':
+        i = writeDelta(database, 'source_info', 'GDC', SOURCE_COLUMNS, SOURCE_KEY, gdc_source, ignore=True)
+    else:
+        i = writeBatch(database, sql_source, gdc_source, 'source_info (GDC)')
     return i
 
 # ******************************************************************************
-def insertCombinedImpact(impact, database):
-    """Inserts entry into impact table.
-    Input               impact                  list of combined entries for impact table
+def insertCombinedImpact(impact, database, mode='batch'):
+    """Inserts entry into impact table (impact_score rows of the impact view).
+    Input               impact                  list of combined entries for impact table (mutation_id, vep,
+                                                sift_prediction, polyphen_prediction, fathmm_score, fathmm_prediction)
                         database                home or kenobi database
-    Output                                      inserted row into impact table
+                        mode                    'batch', or 'delta' to send only changed rows
+    Output              i                       number of impact_score rows written
     """
-    # Connect to MySQL database
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_impact = "INSERT IGNORE INTO impact (mutation_id, vep, sift_prediction, polyphen_prediction, " \
-                 "fathmm_score, fathmm_prediction) VALUES(%s,%s,%s,%s,%s,%s)"
-    i = 0
-    for x in impact:
-        if x[0] != "None":
-            rows = cursor.execute(sql_impact, x)
-            i += 1
-    cnx.commit()
-    cnx.close()
+    # VEP impact class has no column in the impact view; results of mutations already scored are kept
+    # (first row of a key, as INSERT IGNORE)
+    impact_list = ids.resolve(database, [(x[0], x[2], x[3], x[4], x[5]) for x in impact if x[0] != "None"])
+    scores = store.scoreRows(impact_list, ('mutation_id', 'sift_pred', 'polyphen_pred', 'fathmm_score',
+                                           'fathmm_pred'))
+    i = store.writeScores(database, 'combined', scores, mode)
     return  i
 
 # ******************************************************************************
-def insertGdcImpact(mutations, database):
-    """Inserts entry into impact table.
+def insertGdcImpact(mutations, database, mode='batch'):
+    """Inserts entry into impact table (impact_score rows of the impact view).
     Input               impact                  list of mutation attributes from gdc
                         database                home or kenobi database
-    Output                                      inserted row into impact table
-                        i                       number of inserted rows
+                        mode                    'batch', or 'delta' to send only changed rows
+    Output              i                       number of impact_score rows written
     """
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_impact = "INSERT IGNORE impact (mutation_id, vep, sift_prediction, polyphen_prediction) VALUES(%s,%s,%s,%s)"
-    gdc_impact = mutations[2]
-    i = 0
-    for x in gdc_impact:
-        if x[0] != "None":
-            rows = cursor.execute(sql_impact, x)
-            i += 1
-    cnx.commit()
-    cnx.close()
+    # GdcImpactRecord predictions (VEP impact class has no column in the impact view)
+    gdc_impact = ids.resolve(database, [(x.mutation_id, x.sift_prediction, x.polyphen_prediction)
+                                        for x in mutations[2] if x[0] != "None"])
+    scores = store.scoreRows(gdc_impact, ('mutation_id', 'sift_pred', 'polyphen_pred'))
+    i = store.writeScores(database, 'GDC', scores, mode)
     return  i
 
 # ******************************************************************************
-def insertCosmicTissue(cos_tissue_list, database):
+def insertCosmicTissue(cos_tissue_list, database, mode='batch'):
     """Inserts entry into tissue table.
     Input               mutation_tissue             list of mutation attributes from cosmic
                         database                    home or kenobi database
+                        mode                        'batch' (multi-row insert), 'bulk' (LOAD DATA) or 'delta'
     Output                                          inserted row into tissue table
     """
-    # Connect to MySQL database
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
     ## must be ignore or get duplicate entry exception
-    sql_tissue = "INSERT IGNORE tissue (mutation_id, sample_id, tissue_type, cancer_type) VALUES(%s,%s,%s,%s)"
+    sql_tissue = "INSERT IGNORE tissue (mutation_id, sample_id, site_id, histology_id) VALUES(%s,%s,%s,%s)"
 
-    tissue_line = []
-    tissue_list = []
-    i = 0
     # use list to populate tissue table
-    for x in cos_tissue_list:
-        if x[0] != "None":
-            rows = cursor.execute(sql_tissue, x)
-            i += 1
-    cnx.commit()
-    cnx.close()
+    tissue_list = ids.resolve(database, [x for x in cos_tissue_list if x[0] != "None"])
+    tissue_list = codes.encode(database, tissue_list, TISSUE_CODES)
+    if mode == 'bulk':
+        i = writeBulk(database, 'tissue', TISSUE_COLUMNS, tissue_list, 'IGNORE', 'tissue (COSMIC)')
+    elif mode == 'delta':
+        i = writeDelta(database, 'tissue', 'COSMIC', TISSUE_COLUMNS, TISSUE_KEY, tissue_list, ignore=True)
+    else:
+        i = writeBatch(database, sql_tissue, tissue_list, 'tissue (COSMIC)')
     return i
 
 # ******************************************************************************
-def insertCosmicMutation(mutation_dict, database):
+def insertCosmicMutation(mutation_dict, database, mode='batch'):
     """Inserts entry into mutation table.
-    Input               mutation_dict       dictionary of attributes from Cosmic csv file
+    Input               mutation_dict       dictionary protein:CosmicRecord from Cosmic csv file
                         database            use kenobi or home database
+                        mode                'batch' (multi-row insert), 'bulk' (LOAD DATA) or 'delta'
     Output                                  inserts attributes into mutation table
     """
-    # Connect to MySQL database
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    # insert mutation attributes from cosmic, will replace earlier entry with more complete info from cosmic
-    sql_mutation    = "REPLACE INTO mutation (protein, resnum, genomic, coding, cds, mutation_type, consequence, " \
-                         "gene_name, organism, domain) VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-
-    mutation_entry  = []
-    mutation_list   = []
-
-    for k in mutation_dict:
-        if k != "None":
-            mutation_entry = [k, mutation_dict[k][0], mutation_dict[k][1], mutation_dict[k][2], mutation_dict[k][3],
-                              mutation_dict[k][4], mutation_dict[k][5], mutation_dict[k][12],
-                              mutation_dict[k][6], mutation_dict[k][7]]
-            # insert cosmic impact info for mutations not in gdc
-            mutation_list.append(mutation_entry)
-
-    i = 0
+    # insert mutation attributes from cosmic, updates gdc entry in place with more complete info from cosmic
+    # (MUTATION_MERGE policy, e.g. cds from cosmic, consequence from gdc)
+    sql_mutation    = batch.mergeSql('mutation', MUTATION_COLUMNS, 'COSMIC', MUTATION_MERGE)
+
+    # mutation row of each record
+    mutation_list   = [mutation_dict[k].mutation(k) for k in mutation_dict if k != "None"]
+
     # use list to populate mutation table
-    for x in mutation_list:
-        rows = cursor.execute(sql_mutation, x)
-        i += 1
+    if mode == 'bulk':
+        i = writeBulk(database, 'mutation', MUTATION_COLUMNS, mutation_list, 'REPLACE', 'mutation (COSMIC)',
+                      batch.mergeClause('mutation', 'COSMIC', MUTATION_MERGE))
+    elif mode == 'delta':
+        i = writeDelta(database, 'mutation', 'COSMIC', MUTATION_COLUMNS, MUTATION_KEY, mutation_list, sql_mutation)
+    else:
+        i = writeBatch(database, sql_mutation, mutation_list, 'mutation (COSMIC)')
+    ids.forget(database)
 
-    cnx.commit()
-    cnx.close()
     return i
 
 # ******************************************************************************
-def insertCosmicImpact(mutation_dict, database):
-    """Inserts entry into impact table.
-    Input               mutation_dict       dictionary of attributes from Cosmic csv file
+def insertCosmicImpact(mutation_dict, database, mode='batch'):
+    """Inserts entry into impact table (impact_score rows of the impact view).
+    Input               mutation_dict       dictionary protein:CosmicRecord from Cosmic csv file
                         database            home or kenobi database
-    Output                                  inserts attributes into impact table
+                        mode                'batch', or 'delta' to send only changed rows
+    Output              i                   number of impact_score rows written
     """
-    # Connect to MySQL database
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
     # insert impact attributes for mutations in cosmic but ignore mutations already in db
-    sql_impact      = "INSERT IGNORE impact (mutation_id, fathmm_score, fathmm_prediction) VALUES(%s,%s,%s)"
-
-    impact_entry    = []
-    impact_list     = []
-
-    for k in mutation_dict:
-        if k != "None":
-            impact_entry   = [k, mutation_dict[k][11], mutation_dict[k][10]]
-            impact_list.append(impact_entry)
-    i = 0
-    for y in impact_list:
-        rows = cursor.execute(sql_impact, y)
-        i += 1
-
-    cnx.commit()
-    cnx.close()
+    # (first row of a key kept, as INSERT IGNORE); FATHMM score as a number for the FLOAT value column
+    impact_list = ids.resolve(database, ((k, med.toScore(mutation_dict[k].fathmm_score), mutation_dict[k].fathmm_pred)
+                                         for k in mutation_dict if k != "None"))
+    scores = store.scoreRows(impact_list, ('mutation_id', 'fathmm_score', 'fathmm_pred'))
+    i = store.writeScores(database, 'COSMIC', scores, mode)
+
     return i
 
 # ******************************************************************************
-def insertGdcTissue(tissue_list, database):
-    """Inserts entry into impact table.
+def insertGdcTissue(tissue_list, database, mode='batch'):
+    """Inserts entry into tissue table.
     Input               tissue_list             list of mutation attributes from gdc for tissue
                         database                home or kenobi database
+                        mode                    'batch' (multi-row insert), 'bulk' (LOAD DATA) or 'delta'
     Output                                      inserted row into impact table
                         i                       number of inserted rows
     """
-    # Connect to MySQL database
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
+    sql_tissue = "INSERT IGNORE tissue (mutation_id, sample_id, site_id, histology_id) VALUES(%s,%s,%s,%s)"
+
+    gdc_tissue = ids.resolve(database, [x for x in tissue_list if x[0] != "None"])
+    gdc_tissue = codes.encode(database, gdc_tissue, TISSUE_CODES)
+    if mode == 'bulk':
+        i = writeBulk(database, 'tissue', TISSUE_COLUMNS, gdc_tissue, 'IGNORE', 'tissue (GDC)')
+    elif mode == 'delta':
+        i = writeDelta(database, 'tissue', 'GDC', TISSUE_COLUMNS, TISSUE_KEY, gdc_tissue, ignore=True)
     else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_tissue = "INSERT IGNORE tissue (mutation_id, sample_id, tissue_type, cancer_type) VALUES(%s,%s,%s,%s)"
-
-    i = 0
-    for x in tissue_list:
-        if x[0] != "None":
-            rows = cursor.execute(sql_tissue, x)
-            i += 1
-    cnx.commit()
-    cnx.close()
+        i = writeBatch(database, sql_tissue, gdc_tissue, 'tissue (GDC)')
     return  i
 
 # ******************************************************************************
 
+def loadAll(db, mode='batch'):
+    """Parses all source files and loads every table of kinesin database (run from the data directory).
+    Input               db                      kenobi, home or local
+                        mode                    'batch' (multi-row insert), 'bulk' (LOAD DATA) or 'delta'
+    Output                                      loaded tables
+    """
+    # COSMIC rows of KIF11 read from its region only if the export was indexed (region_index.py)
+    regions = list(region.geneRegions(db, ['KIF11']).values())
+
+    # parsers are independent of each other, run in parallel processes
+    parsed = parse.parseAll({
+        'gdc_att':          (mutation.parseGDC, 'KIF11', 'mutations.2019-07-13.json'),   #uses mutation_parser module
+        'cosmic':           (mutation.parseCosmic, 'KIF11', 'V89_38_MUTANT.csv',           # mutation and tissue, one pass
+                             tuple(mutation.COSMIC_OUTPUTS), regions),
+        'tissueGDC':        (mutation.tissueGDC, 'KIF11', 'results.json'),
+        'impact':           (i.parseVep2, 'KIF11', 'VEP_new_results.txt'),              #uses impact_table module
+        'fathmm_results':   (i.fathmmResultsParser, 'fathmm_results.txt'),
+        'clinvar_results':  (i.parseClinvar, 'KIF11', 'clinvar_result.txt'),
+    })
+    gdc_att         = parsed['gdc_att']
+    cosmic_mutation = parsed['cosmic']['mutation']
+    cos_tissue_list = parsed['cosmic']['tissue']
+    tissueGDC       = parsed['tissueGDC']
+    impact          = parsed['impact']
+    fathmm_results  = parsed['fathmm_results']
+    clinvar_results = parsed['clinvar_results']
+
+
+    # loads of the same table run in this order, other tables wait only for the tables they reference
+    # (mutation loads merge in place, so child rows are no longer wiped by REPLACE)
+    loads = [
+        sched.LoadTask('mutation (GDC)',        'mutation',     insertMutation, gdc_att, db, mode),
+        sched.LoadTask('mutation (COSMIC)',     'mutation',     insertCosmicMutation, cosmic_mutation, db, mode),
+        sched.LoadTask('source_info (GDC)',     'source_info',  insertSource, gdc_att, db, mode),
+        sched.LoadTask('source_info (COSMIC)',  'source_info',  insertCosmicSource, cosmic_mutation, db, mode),
+        sched.LoadTask('impact (VEP)',          'impact_score', i.updateImpact2, impact, db, mode),  # impact_table
+        sched.LoadTask('impact (FATHMM)',       'impact_score', i.fathmmInsert, fathmm_results, db, mode),
+        sched.LoadTask('impact (clinvar)',      'impact_score', i.clinvarUpdate, clinvar_results, db, mode),
+        sched.LoadTask('impact (median)',       'impact_score', med.updateMedians, db, mode),   # median_score
+        sched.LoadTask('tissue (COSMIC)',       'tissue',       insertCosmicTissue, cos_tissue_list, db, mode),
+        sched.LoadTask('tissue (GDC)',          'tissue',       insertGdcTissue, tissueGDC, db, mode),
+        sched.LoadTask('domain_tissue_count',   summary.SUMMARY_TABLE, summary.updateSummaries, db,
+                       summary.SUMMARY_TABLE, ['KIF11']),
+        sched.LoadTask('frequency',             summary.FREQUENCY_TABLE, summary.updateSummaries, db,
+                       summary.FREQUENCY_TABLE, ['KIF11']),
+    ]
+    # summary tables wait for all loads of the tables they count
+    deps = sched.tableDependencies()
+    deps.update(summary.SOURCES)
+    workers = db_session.getConfig(db).get('pool_size', sched.MAX_WORKERS)
+    sched.runTasks(loads, deps, min(workers, sched.MAX_WORKERS))
+
+# ******************************************************************************
+
 ########## main ############
 
 if __name__ == "__main__":
 
-    db = 'home'
-
-    gdc_att         = mutation.parseGDC('KIF11', 'mutations.2019-07-13.json')   #uses mutation_parser module
-    cosmic_mutation = mutation.cosmicParser('KIF11', 'V89_38_MUTANT.csv')
-    cos_tissue_list = mutation.tissueCosmic('KIF11', 'V89_38_MUTANT.csv')
-    tissueGDC       = mutation.tissueGDC('KIF11', 'results.json')
-    impact          = i.parseVep2('KIF11', 'VEP_new_results.txt')      #uses impact_table module
-    fathmm_results  = i.fathmmResultsParser('fathmm_results.txt')
-    clinvar_results = i.parseClinvar('KIF11', 'clinvar_result.txt')
-
-
-    # insert commands must be in this order
-    insertMutation(gdc_att, db)
-    insertCosmicMutation(cosmic_mutation, db)
-    insertSource(gdc_att, db)
-    insertCosmicSource(cosmic_mutation, db)
-    i.updateImpact2(impact, db)                             # uses impact_table module
-    i.fathmmInsert(fathmm_results, db)
-    i.clinvarUpdate(clinvar_results, db)
-    insertCosmicTissue(cos_tissue_list, db)
-    insertGdcTissue(tissueGDC, db)
-
-    dict = med.getScores(db)                                # uses median_score module to query for scores
-    medians = med.calcMedian(dict)                          # calculate median scores
-    med.insertMedians(medians, db)                          # insert calculated medians
\ No newline at end of file
+    db = 'home'             # 'local' uses embedded SQLite file (config_local), no MySQL server needed
+    mode = 'batch'          # 'bulk' loads mutation, source_info and tissue with LOAD DATA (full reloads)
+                            # 'delta' sends only rows changed since the last run (monthly refreshes)
+
+    loadAll(db, mode)
+
+    db_session.closeAll()
\ No newline at end of file
@@ -0,0 +1,223 @@
+#!/usr/bin python3
+
+""" Delta ingest module """
+
+"""
+Program:    delta_ingest
+File:       delta_ingest.py
+Version:    1.0
+Date:       18.10.26
+Function:   Incremental (delta) ingest: write only rows that changed since last run
+_____________________________________________________________________________
+Description:
+============
+Most rows are the same between COSMIC or GDC releases. For every load (scope, e.g. 'tissue:COSMIC') the row_hash
+table keeps a content hash of each row sent, keyed by the row's primary key. syncRows compares the parsed rows
+with the stored hashes. It writes new and changed rows and deletes rows that are no longer in the source. Then
+it saves the new hashes, so a monthly refresh costs O(changes) and not O(database).
+
+A row that disappears from one scope is only deleted if no other scope of the same table still holds its key
+(e.g. a mutation dropped from GDC but still in COSMIC is kept). Loads of impact_score (VEP, FATHMM, clinvar,
+medians) pass delete=False and never delete.
+
+delete_inserts.sql clears row_hash with the other tables, so a full reload starts from empty hashes.
+
+Usage:
+======
+with db_session.session('home') as cnx:
+    counts = syncTable(cnx, 'tissue', 'GDC', columns, ('mutation_id', 'sample_id'), rows)
+    counts = syncTable(cnx, 'impact_score', 'clinvar', columns, ('mutation_id', 'tool', 'metric'), rows,
+                       delete=False)
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Removed syncUpdates (impact loads use syncTable
+                        on impact_score)
+V1.2    18.10.26        First row of a duplicate key kept for tables
+                        loaded with INSERT IGNORE (ignore)
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import hashlib
+import sys
+import batch_writer as batch
+
+# ******************************************************************************
+
+KEY_SEP     = '\t'
+FIELD_SEP   = '\x1f'
+KEY_CHUNK   = 1000          # keys per IN (...) list
+
+# ******************************************************************************
+
+def rowKey(row, key_index):
+    """Primary key of row as one string."""
+    return KEY_SEP.join(str(row[n]) for n in key_index)
+
+# ******************************************************************************
+
+def rowHash(row):
+    """SHA-1 of row contents (None kept distinct from the string 'None')."""
+    text = FIELD_SEP.join('\\N' if v is None else str(v) for v in row)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+# ******************************************************************************
+
+def storedHashes(cnx, scope):
+    """Hashes saved by last run of a load.
+    Input               cnx                     open connection
+                        scope                   load name, 'table:source'
+    Output              stored                  dictionary row_key:content_hash
+    """
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT row_key, content_hash FROM row_hash WHERE scope = %s;", (scope,))
+        return {k: h for k, h in cursor.fetchall()}
+
+# ******************************************************************************
+
+def sharedKeys(cnx, scope, keys):
+    """Keys also held by another scope of the same table (these rows must not be deleted)."""
+    if not keys:
+        return set()
+    table   = scope.split(':')[0]
+    keys    = list(keys)
+    shared  = set()
+    with cnx.cursor() as cursor:
+        for n in range(0, len(keys), KEY_CHUNK):
+            chunk = keys[n:n + KEY_CHUNK]
+            cursor.execute("SELECT DISTINCT row_key FROM row_hash WHERE scope LIKE %%s AND scope != %%s "
+                           "AND row_key IN (%s);" % ','.join(['%s'] * len(chunk)), [table + ':%', scope] + chunk)
+            shared.update(row[0] for row in cursor.fetchall())
+    return shared
+
+# ******************************************************************************
+
+def diffRows(stored, rows, key_index, ignore=False):
+    """Compares rows with stored hashes.
+    Input               stored                  dictionary row_key:content_hash from last run
+                        rows                    iterable of rows parsed this run
+                        key_index               positions of primary key columns in row
+                        ignore                  True to keep the first row of a duplicate key (as INSERT IGNORE),
+                                                False to keep the last (as an upsert)
+    Output              inserts                 rows with new keys
+                        updates                 rows whose contents changed
+                        removed                 keys stored last run but not parsed this run
+                        hashes                  dictionary row_key:content_hash for new and changed rows
+    """
+    current = {}
+    if ignore:
+        for row in rows:
+            current.setdefault(rowKey(row, key_index), row)
+    else:
+        for row in rows:
+            current[rowKey(row, key_index)] = row
+
+    inserts = []
+    updates = []
+    hashes  = {}
+    for key, row in current.items():
+        digest = rowHash(row)
+        old = stored.get(key)
+        if old == digest:
+            continue
+        hashes[key] = digest
+        if old is None:
+            inserts.append(row)
+        else:
+            updates.append(row)
+    removed = [key for key in stored if key not in current]
+    return inserts, updates, removed, hashes
+
+# ******************************************************************************
+
+def saveHashes(cnx, scope, hashes, removed):
+    """Stores hashes for rows written and drops hashes of removed rows."""
+    if hashes:
+        sql = "REPLACE INTO row_hash (scope, row_key, content_hash) VALUES(%s,%s,%s)"
+        batch.writeRows(cnx, sql, [(scope, k, h) for k, h in hashes.items()], label='row_hash (%s)' % scope)
+    if removed:
+        with cnx.cursor() as cursor:
+            cursor.executemany("DELETE FROM row_hash WHERE scope = %s AND row_key = %s;",
+                               [(scope, k) for k in removed])
+
+# ******************************************************************************
+
+def syncRows(cnx, scope, rows, key_index, write, delete=None, ignore=False):
+    """Writes only new and changed rows, deletes rows no longer in source, saves hashes.
+    Input               cnx                     open connection
+                        scope                   load name, 'table:source' (e.g. 'tissue:COSMIC')
+                        rows                    all rows parsed this run
+                        key_index               positions of primary key columns in row
+                        write                   function(cnx, rows) writing new/changed rows
+                        delete                  function(cnx, keys) deleting rows by key values, None to never
+                                                delete (loads that keep rows gone from source)
+                        ignore                  True to keep the first row of a duplicate key (see diffRows)
+    Output              counts                  (inserts, updates, deletes)
+    """
+    stored = storedHashes(cnx, scope)
+    inserts, updates, removed, hashes = diffRows(stored, rows, key_index, ignore)
+
+    if inserts or updates:
+        write(cnx, inserts + updates)
+    deleted = 0
+    if removed and delete is not None:
+        keep = sharedKeys(cnx, scope, removed)
+        gone = [key.split(KEY_SEP) for key in removed if key not in keep]
+        if gone:
+            delete(cnx, gone)
+            deleted = len(gone)
+    saveHashes(cnx, scope, hashes, removed)
+
+    print("%s: %d inserts, %d updates, %d deletes (%d unchanged)"
+          % (scope, len(inserts), len(updates), deleted, len(stored) - len(updates) - len(removed)),
+          file=sys.stderr)
+    return len(inserts), len(updates), deleted
+
+# ******************************************************************************
+
+def deleteKeys(cnx, table, key_columns, keys):
+    """Deletes rows of table by primary key values (used as delete function for syncRows).
+    Input               cnx                     open connection
+                        table                   table name
+                        key_columns             primary key column names
+                        keys                    list of key value lists
+    Output              count                   number of keys deleted
+    """
+    where = ' AND '.join('%s = %%s' % c for c in key_columns)
+    with cnx.cursor() as cursor:
+        cursor.executemany("DELETE FROM %s WHERE %s;" % (table, where), keys)
+    return len(keys)
+
+# ******************************************************************************
+
+def syncTable(cnx, table, source, columns, key_columns, rows, batch_size=None, delete=True, sql=None,
+              ignore=False):
+    """Delta load of rows owned by one source: upserts new/changed rows, deletes rows gone from source.
+    Input               cnx                     open connection
+                        table                   table name
+                        source                  source of rows ('GDC', 'COSMIC', 'VEP'), scope is 'table:source'
+                        columns                 column names in row order
+                        key_columns             primary key columns of table
+                        rows                    all rows parsed this run
+                        batch_size              rows per multi-row statement
+                        delete                  False to keep rows that disappear from the source
+                        sql                     upsert statement (default overwrites all non-key columns)
+                        ignore                  True for tables the batch and bulk modes load with INSERT IGNORE:
+                                                first row of a duplicate key is written, so a delta load gives
+                                                the rows of a batch load
+    Output              counts                  (inserts, updates, deletes)
+    """
+    key_index   = [columns.index(c) for c in key_columns]
+    sql         = sql or batch.upsertSql(table, columns, key_columns)
+    label       = '%s (%s)' % (table, source)
+
+    def write(cnx, changed):
+        return batch.writeRows(cnx, sql, changed, batch_size, label)
+
+    def remove(cnx, keys):
+        return deleteKeys(cnx, table, key_columns, keys)
+
+    return syncRows(cnx, table + ':' + source, rows, key_index, write, remove if delete else None, ignore)
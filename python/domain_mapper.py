@@ -30,35 +30,40 @@ Revision History:
 V1.0    29.01.19        Initial version                             By: JJS
 V1.1    13.07.19        Change domain names                             JJS
 V1.2    17.08.19        Made separate function for IDRs                 JJS
+V1.3    18.10.26        Use pooled connections from db_session
+V1.4    18.10.26        Domain tables built once, residue number from
+                        cached normaliser (protein_change)
 """
 
 # ******************************************************************************
 # Import libraries
 
-import re
 import sys
-import pymysql
-import config_home
+import db_session
+import protein_change as pc
 
 # ******************************************************************************
-
-def getMutations(database):
-
-# Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
+# domain of each residue (as text) of KIF11, without (DOMAINS) and with (DOMAINS_IDR) disordered regions
+
+DOMAINS     = {}
+DOMAINS_IDR = {}
+for x in range(1, 2000):
+    if x in range(24, 359):
+        DOMAINS[str(x)] = DOMAINS_IDR[str(x)] = 'kinesin motor'
+    elif x in range(916, 1053):  # > 915 and x < 1054:
+        DOMAINS[str(x)] = DOMAINS_IDR[str(x)] = 'tail-binding'
     else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
+        DOMAINS[str(x)] = 'coiled-coil/disorder'
+        if x in range(751, 885):
+            DOMAINS_IDR[str(x)] = 'idr1'
+        elif x in range(422, 496):
+            DOMAINS_IDR[str(x)] = 'idr2'
+        else:
+            DOMAINS_IDR[str(x)] = 'coiled-coil/disorder'
+
+# ******************************************************************************
 
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
+def getMutations(database):
 
     mutation_list = []
 
@@ -67,7 +72,7 @@ def getMutations(database):
             #"AND t.tissue_type in ('Rectum', 'Colon', 'large_intestine')"
             #"AND m.protein = t.mutation_id;"
 
-    with cnx.cursor() as cursor:
+    with db_session.session(database) as cnx, cnx.cursor() as cursor:
         cursor.execute(query)
         temp = cursor.fetchall()
 
@@ -100,28 +105,8 @@ def domainMapper(mutation):
     Output              domain_name         name of relevant domain
                                             
     """
-    import re
-
-    domain_dict = {}
-    for x in range(1,2000):
-        if x in range(24,359):
-            domain_dict[str(x)] = 'kinesin motor'
-        elif x in range(916, 1053): #> 915 and x < 1054:
-            domain_dict[str(x)] = 'tail-binding'
-        else:
-            domain_dict[str(x)] = 'coiled-coil/disorder'
-
     #find residue number
-    residue_num = ''
-    r = re.compile(r'[A-Z]+(\d+)[^0-9]')
-    it = r.finditer(mutation)
-    for match in it:
-        residue_num = str(match.group(1))
-
-    if residue_num in domain_dict:
-        return  domain_dict[residue_num]
-    else:
-        return  'UNK'
+    return DOMAINS.get(pc.residue(mutation), 'UNK')
 
 # *************************************************************************************
 
@@ -135,32 +120,8 @@ def domainMapper2(mutation):
     Output              domain_name         name of relevant domain
 
     """
-    import re
-
-    domain_dict = {}
-    for x in range(1, 2000):
-        if x in range(24, 359):
-            domain_dict[str(x)] = 'kinesin motor'
-        elif x in range(916, 1053):  # > 915 and x < 1054:
-            domain_dict[str(x)] = 'tail-binding'
-        elif x in range(751, 885):
-            domain_dict[str(x)] = 'idr1'
-        elif x in range(422, 496):
-            domain_dict[str(x)] = 'idr2'
-        else:
-            domain_dict[str(x)] = 'coiled-coil/disorder'
-
     # find residue number
-    residue_num = ''
-    r = re.compile(r'[A-Z]+(\d+)[^0-9]')
-    it = r.finditer(mutation)
-    for match in it:
-        residue_num = str(match.group(1))
-
-    if residue_num in domain_dict:
-        return domain_dict[residue_num]
-    else:
-        return 'UNK'
+    return DOMAINS_IDR.get(pc.residue(mutation), 'UNK')
 
 
 # *************************************************************************************
@@ -27,6 +27,7 @@ fathmm_format                SELF
 Revision History:
 =================
 V1.0    13.07.19        Initial                                     By: JJS
+V1.1    18.10.26        Use pooled connections from db_session
 
 """
 
@@ -34,9 +35,7 @@ V1.0    13.07.19        Initial                                     By: JJS
 #*****************************************************************************
 # Import libraries
 
-import config_home
-import pymysql
-import config_kinesin
+import db_session
 
 #*****************************************************************************
 
@@ -51,26 +50,10 @@ def fathmm_format(gene, database):
                                                        (e.g. 'P52732   N342V, E101V')
     """
 
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                          user=config_kinesin.database_config['dbuser'],
-                          passwd=config_kinesin.database_config['dbpass'],
-                          db=config_kinesin.database_config['dbname'])
-    else:
-    ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                          port=config_home.database_config['port'],
-                          user=config_home.database_config['dbuser'],
-                          passwd=config_home.database_config['dbpass'],
-                          db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
     fathmm_str = ''
     fathmm_list = []
 
-    with cnx.cursor() as cursor:
+    with db_session.session(database) as cnx, cnx.cursor() as cursor:
         query = "SELECT protein FROM mutation WHERE mutation_type = 'substitution';"
         cursor.execute(query)
         temp = cursor.fetchall()
@@ -31,6 +31,9 @@ Revision History:
 =================
 V1.0    14.05.19        Initial                                     By: JJS
 V1.1    18.05.19        Re-named fathmm_impact.py                       JJS
+V1.2    18.10.26        Use pooled connections from db_session
+V1.3    18.10.26        Look up integer mutation_id by protein
+V1.4    18.10.26        Write impact_score rows (impact_store)
 """
 
 #
@@ -39,9 +42,8 @@ V1.1    18.05.19        Re-named fathmm_impact.py                       JJS
 
 import csv
 import re
-import config_home
-import pymysql
-import config_kinesin
+import mutation_ids as ids
+import impact_store as store
 
 #*****************************************************************************
 
@@ -77,41 +79,14 @@ def fathmmInsert(results_dict, database):
     """ This function uses list of clinvar attributes to update impact table in kinesin database.
         Input               results_dict                    dict of attributes (mutation_id:prediction, score)
                             database                        which database used (home or kenobi)
-        Output              count                           number of successfully updated rows in impact table
+        Output              count                           number of impact_score rows written for mutations with
+                                                            scores (matched rows)
         """
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
     #sql_fathmm1 = "INSERT IGNORE impact (mutation_id, sample_id, tissue_type, cancer_type) VALUES(%s,%s,%s,%s)"
-    sql_fathmm2 = "UPDATE impact SET fathmm_cancer_pred = %s, fathmm_cancer_score = %s WHERE mutation_id = %s;"
-
-    count = 0
-    entry = []
-    f_list = []
-    for k,v in results_dict.items():
-        aa      = k
-        prediction = v[0]
-        score   = v[1]
-        entry   = (prediction, score, aa)
-        with cnx.cursor() as cursor:
-            rows = cursor.execute(sql_fathmm2, entry)
-            count += 1
-
-    cnx.commit()
-    cnx.close()
+    # impact is a view of impact_score: results written as fathmm_cancer rows of mutations with impact scores
+    f_list = ids.resolve(database, [(k, v[0], v[1]) for k,v in results_dict.items()])
+    scores = store.scoreRows(f_list, ('mutation_id', 'fathmm_cancer_pred', 'fathmm_cancer_score'))
+    count = store.writeScores(database, 'FATHMM', scores, replace=True, scored_only=True)
 
     return count
 
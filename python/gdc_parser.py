@@ -33,6 +33,8 @@ V1.4    23.01.19        Added functions for source and impact           JJS
 V1.5    25.01.19        Added file opening and gene specification to    JJS
                         parseMutation function. Removed insert          
                         functions to a new module. Renamed module.
+V1.6    18.10.26        JSON streamed record by record (gdc_reader),
+                        reads json_file argument
 """
 
 # ******************************************************************************
@@ -42,7 +44,7 @@ import re
 import sys
 import pymysql
 import config_kinesin
-import json
+import gdc_reader as gdc
 
 # ******************************************************************************
 def parseMutations(gene, json_file):
@@ -63,45 +65,40 @@ def parseMutations(gene, json_file):
     source_db   = 'GDC'
     my_gene     = 'KIF11'
 
-    with open ('mutations.2018-10-03.json', 'r') as f:
-        mutations = json.load(f)
-        ## first index is the item number, 'x'
-        x = 0
-        for k in mutations:
-            try:
-                gene_name       = str(mutations[x]['consequence'][0]['transcript']['gene']['symbol'])
-                protein         = str(mutations[x]['consequence'][0]['transcript']['aa_change'])
-                consequence     = str(mutations[x]['consequence'][0]['transcript']['consequence_type'])
-                genomic_id      = str(mutations[x]['genomic_dna_change'])
-                ## eliminate 'g' in genomic_id
-                genomic_id      = genomic_id.replace('g.', '')
-                source_id       = str(mutations[x]['ssm_id'])
-                mutation_type   = str(mutations[x]['mutation_subtype'])
-                vep = str(mutations[x]['consequence'][0]['transcript']['annotation']['vep_impact'])
-                if vep == '':
-                    vep = ' '
-                polyphen = str(mutations[x]['consequence'][0]['transcript']['annotation']['polyphen_impact'])
-                if polyphen == '':
-                    polyphen = ' '
-                sift = str(mutations[x]['consequence'][0]['transcript']['annotation']['sift_impact'])
-                if sift == '':
-                    sift = ' '
-                coding          = 'y'
-                cds             = ' '
-                organism        = 'Homo sapiens'
-                domain          = ' '              # determine later
-                x += 1
-            except Error as e:
-                print("Error", e)
-            # put all strings into lists for each table
-            if gene_name == my_gene:            ## check that gene is KIF11
-                mut_entry       = [genomic_id, coding, cds, mutation_type, consequence, protein, gene_name, organism, domain]
-                source_entry    = [source_id, source_db, protein]
-                impact_entry    = [protein, vep, sift, polyphen]
-                impact_list.append(impact_entry)
-                mut_list.append(mut_entry)
-                source_list.append(source_entry)
-    f.close()
+    # records streamed one at a time (gdc_reader), not loaded as one list
+    for ssm in gdc.readRecords(json_file):
+        try:
+            gene_name       = str(ssm['consequence'][0]['transcript']['gene']['symbol'])
+            protein         = str(ssm['consequence'][0]['transcript']['aa_change'])
+            consequence     = str(ssm['consequence'][0]['transcript']['consequence_type'])
+            genomic_id      = str(ssm['genomic_dna_change'])
+            ## eliminate 'g' in genomic_id
+            genomic_id      = genomic_id.replace('g.', '')
+            source_id       = str(ssm['ssm_id'])
+            mutation_type   = str(ssm['mutation_subtype'])
+            vep = str(ssm['consequence'][0]['transcript']['annotation']['vep_impact'])
+            if vep == '':
+                vep = ' '
+            polyphen = str(ssm['consequence'][0]['transcript']['annotation']['polyphen_impact'])
+            if polyphen == '':
+                polyphen = ' '
+            sift = str(ssm['consequence'][0]['transcript']['annotation']['sift_impact'])
+            if sift == '':
+                sift = ' '
+            coding          = 'y'
+            cds             = ' '
+            organism        = 'Homo sapiens'
+            domain          = ' '              # determine later
+        except Error as e:
+            print("Error", e)
+        # put all strings into lists for each table
+        if gene_name == my_gene:            ## check that gene is KIF11
+            mut_entry       = [genomic_id, coding, cds, mutation_type, consequence, protein, gene_name, organism, domain]
+            source_entry    = [source_id, source_db, protein]
+            impact_entry    = [protein, vep, sift, polyphen]
+            impact_list.append(impact_entry)
+            mut_list.append(mut_entry)
+            source_list.append(source_entry)
 
     return mut_list, source_list, impact_list
 
@@ -0,0 +1,99 @@
+#!/usr/bin python3
+
+""" GDC JSON reader """
+
+"""
+Program:    gdc_reader
+File:       gdc_reader.py
+Version:    1.0
+Date:       18.10.26
+Function:   Stream records of GDC JSON downloads (mutations, API results) one at a time
+_____________________________________________________________________________
+Description:
+============
+GDC downloads (https://portal.gdc.cancer.gov) are one JSON array of SSM records (mutations.*.json) or of API
+responses with their occurrences (results.json). json.load reads the whole array before the first record can be
+used and keeps all of it in memory. readRecords() reads the file in chunks and decodes one array element at a time
+with the standard library decoder (JSONDecoder.raw_decode), yielding each record as soon as it is complete; only
+the current record and one chunk are held in memory.
+
+Files whose first character is not '[' are read as JSON Lines (one record per line, as the GDC API returns with
+format=jsonl) or concatenated records. Files ending in .gz are read compressed.
+
+Usage:
+======
+for ssm in readRecords('mutations.2019-07-13.json.gz'):
+    ...
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import gzip
+import json
+
+# ******************************************************************************
+
+CHUNK_SIZE  = 1 << 16       # characters read at a time
+WHITESPACE  = ' \t\n\r'
+
+# ******************************************************************************
+
+def openJson(json_file):
+    """Opens GDC download as text, decompressing .gz files."""
+    if json_file.endswith('.gz'):
+        return gzip.open(json_file, 'rt', encoding='utf-8')
+    return open(json_file, encoding='utf-8')
+
+# ******************************************************************************
+
+def readRecords(json_file, chunk_size=CHUNK_SIZE):
+    """Yields the records of a JSON array, JSON Lines or concatenated JSON file one at a time.
+    Input               json_file               GDC download (may be .gz)
+                        chunk_size              characters read at a time
+    Output              records                 generator of decoded records (dictionaries)
+    """
+    decoder = json.JSONDecoder()
+    with openJson(json_file) as file:
+        buffer = ''
+        pos = 0
+        eof = False
+        in_array = None         # True for a top-level array, False for JSON Lines, None until first character
+
+        while True:
+            # skip separators between records
+            while pos < len(buffer) and (buffer[pos] in WHITESPACE or (in_array and buffer[pos] == ',')):
+                pos += 1
+            if pos < len(buffer) and in_array is None:
+                in_array = buffer[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and pos < len(buffer) and buffer[pos] == ']':
+                return
+
+            if pos < len(buffer):
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    end = None          # record continues in the next chunk
+                # a number at the end of the buffer may continue in the next chunk
+                if end is not None and (end < len(buffer) or eof):
+                    yield record
+                    pos = end
+                    continue
+            elif eof:
+                if in_array:
+                    raise ValueError("%s: JSON array not closed" % json_file)
+                return
+
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
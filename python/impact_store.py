@@ -0,0 +1,162 @@
+#!/usr/bin python3
+
+""" Impact score store """
+
+"""
+Program:    impact_store
+File:       impact_store.py
+Version:    1.0
+Date:       18.10.26
+Function:   Long-format store of predictor results (impact_score) behind the wide impact view
+_____________________________________________________________________________
+Description:
+============
+Every result of a predictor is one row of impact_score: (mutation_id, tool, metric, value, label), with metric
+'score' or 'rank' (number in value) or 'pred' (prediction in label). A new predictor needs new entries in
+IMPACT_METRICS and in the impact view of kinesin.sql, not a new table layout or a longer INSERT.
+
+The primary key (mutation_id, tool, metric) serves the pivot and the foreign key. The index (tool, metric, value,
+mutation_id) reads one tool's scores for all mutations with one range scan (toolScores, thresholds such as
+condel > 0.8). The view impact pivots the rows back to the wide layout with the old column names, so queries
+reading impact (sql_queries, R scripts, vKif11_coding_mut) work unchanged.
+
+Loaders turn wide rows into score rows with scoreRows and write them with writeScores: VEP rows are appended
+(INSERT IGNORE), later loads (FATHMM, clinvar, medians) replace their own tool's rows (upsert). Later loads only
+write rows for mutations that already have scores, as their UPDATEs of the wide table only matched existing rows,
+and report the rows that matched such a mutation (the count the staging table UPDATE ... JOIN reported).
+
+Usage:
+======
+rows = scoreRows(vep_rows, VEP_COLUMNS)
+writeScores('home', 'VEP', rows)
+condel = toolScores(cnx, 'condel', 'score')
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import db_session
+import batch_writer as batch
+import delta_ingest as delta
+
+# ******************************************************************************
+
+SCORE_TABLE     = 'impact_score'
+SCORE_COLUMNS   = ('mutation_id', 'tool', 'metric', 'value', 'label')
+SCORE_KEY       = ('mutation_id', 'tool', 'metric')
+
+# column of impact view:(tool, metric), in order of the view
+IMPACT_METRICS  = {'median_ranked_scores':  ('median', 'rank'),
+                   'sift_score':            ('sift', 'score'),
+                   'sift_pred':             ('sift', 'pred'),
+                   'polyphen_score':        ('polyphen', 'score'),
+                   'polyphen_pred':         ('polyphen', 'pred'),
+                   'condel':                ('condel', 'score'),
+                   'cadd_rank':             ('cadd', 'rank'),
+                   'cadd_score':            ('cadd', 'score'),
+                   'fathmm_rank':           ('fathmm', 'rank'),
+                   'fathmm_score':          ('fathmm', 'score'),
+                   'fathmm_pred':           ('fathmm', 'pred'),
+                   'metaSVM_rank':          ('metaSVM', 'rank'),
+                   'metaSVM_score':         ('metaSVM', 'score'),
+                   'metaSVM_pred':          ('metaSVM', 'pred'),
+                   'mutpred_rank':          ('mutpred', 'rank'),
+                   'mutpred_score':         ('mutpred', 'score'),
+                   'mutassessor_rank':      ('mutassessor', 'rank'),
+                   'mutassessor_score':     ('mutassessor', 'score'),
+                   'mutassessor_pred':      ('mutassessor', 'pred'),
+                   'muttaster_rank':        ('muttaster', 'rank'),
+                   'muttaster_score':       ('muttaster', 'score'),
+                   'muttaster_pred':        ('muttaster', 'pred'),
+                   'provean_rank':          ('provean', 'rank'),
+                   'provean_score':         ('provean', 'score'),
+                   'provean_pred':          ('provean', 'pred'),
+                   'revel_rank':            ('revel', 'rank'),
+                   'revel_score':           ('revel', 'score'),
+                   'fathmm_cancer_score':   ('fathmm_cancer', 'score'),
+                   'fathmm_cancer_pred':    ('fathmm_cancer', 'pred'),
+                   'clinvar_prediction':    ('clinvar', 'pred')}
+
+# ******************************************************************************
+
+def scoreRows(rows, columns, keep_missing=False):
+    """Turns wide rows (mutation_id first) into impact_score rows.
+    Input               rows                    iterable of rows (mutation_id, value of columns[1], ...)
+                        columns                 impact column names in row order (first is mutation_id)
+                        keep_missing            True to write a row (value NULL) for missing scores too
+    Output              scores                  list of (mutation_id, tool, metric, value, label)
+    """
+    metrics = [(n, IMPACT_METRICS[c]) for n, c in enumerate(columns) if n > 0]
+    scores = []
+    for row in rows:
+        for n, (tool, metric) in metrics:
+            v = row[n]
+            if v is None and not keep_missing:
+                continue
+            if metric == 'pred':
+                scores.append((row[0], tool, metric, None, v))
+            else:
+                scores.append((row[0], tool, metric, v, None))
+    return scores
+
+# ******************************************************************************
+
+def scoredMutations(cnx):
+    """mutation_id of every mutation with at least one score (rows of the impact view)."""
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT mutation_id FROM impact_score;")
+        return {row[0] for row in cursor.fetchall()}
+
+# ******************************************************************************
+
+def toolScores(cnx, tool, metric):
+    """Values of one tool's metric for all mutations (one range scan of index (tool, metric, value, mutation_id)).
+    Input               cnx                     open connection
+                        tool                    tool name, e.g. 'cadd'
+                        metric                  'score' or 'rank'
+    Output              values                  dictionary mutation_id:value
+    """
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT mutation_id, value FROM impact_score WHERE tool = %s AND metric = %s;", (tool, metric))
+        return {k: v for k, v in cursor.fetchall()}
+
+# ******************************************************************************
+
+def writeScores(database, source, scores, mode='batch', replace=False, scored_only=False):
+    """Writes impact_score rows of one load.
+    Input               database                kenobi, home or local
+                        source                  name of load ('VEP', 'FATHMM', 'clinvar', 'median')
+                        scores                  rows from scoreRows
+                        mode                    'batch', or 'delta' to send only rows changed since last run
+                        replace                 True to overwrite existing rows of the same key (upsert)
+                        scored_only             True to leave out mutations without any score yet
+    Output              i                       number of rows written (batch), with scored_only the rows matching a
+                                                mutation with scores; number of rows changed (delta)
+    """
+    batch_size = db_session.getConfig(database).get('batch_size')
+    if replace:
+        sql = batch.upsertSql(SCORE_TABLE, SCORE_COLUMNS, SCORE_KEY)
+    else:
+        sql = "INSERT IGNORE INTO %s (%s) VALUES(%s)" % (SCORE_TABLE, ', '.join(SCORE_COLUMNS),
+                                                          ','.join(['%s'] * len(SCORE_COLUMNS)))
+    with db_session.session(database) as cnx:
+        if scored_only:
+            scored = scoredMutations(cnx)
+            scores = [row for row in scores if row[0] in scored]
+        if not replace:
+            # first row of a key is kept, as INSERT IGNORE keeps it (delta mode upserts)
+            first = {}
+            for row in scores:
+                first.setdefault(tuple(row[:3]), row)
+            scores = list(first.values())
+        if mode == 'delta':
+            # score rows are kept when a result disappears from a source (as in the wide impact table)
+            i = sum(delta.syncTable(cnx, SCORE_TABLE, source, SCORE_COLUMNS, SCORE_KEY, scores, batch_size,
+                                    delete=False, sql=batch.upsertSql(SCORE_TABLE, SCORE_COLUMNS, SCORE_KEY)))
+        else:
+            i = batch.writeRows(cnx, sql, scores, batch_size, '%s (%s)' % (SCORE_TABLE, source))
+    return i
@@ -31,6 +31,18 @@ Revision History:
 =================
 V1.0    09.04.19        Initial: combined three scripts (vep_parse.py, fathmm_impact.py and     By: JJS
                         clinvar_impact.py) to make one module for impact table.        
+V1.1    18.10.26        Use pooled connections from db_session module
+V1.2    18.10.26        Batched multi-row insert of VEP results
+V1.3    18.10.26        FATHMM and clinvar updates through staging table, return matched rows
+V1.4    18.10.26        Delta mode (send only rows changed since last run)
+V1.5    18.10.26        Scores parsed as numbers (None for 'NA') for FLOAT columns
+V1.6    18.10.26        Rows keyed by integer mutation_id (mutation_ids map)
+V1.7    18.10.26        Results written as impact_score rows (impact_store)
+V1.8    18.10.26        VEP rows as VepRecord (mutation_records)
+V1.9    18.10.26        Predictions share one copy per value (mutation_records.category)
+V1.10   18.10.26        VEP results read by vep_reader (needed columns only, VCF/JSON too)
+V1.11   18.10.26        Protein changes from the cached normaliser (protein_change)
+V1.12   18.10.26        VepRecord built by field name (SIFT and PolyPhen were swapped)
 
 """
 
@@ -39,11 +51,29 @@ V1.0    09.04.19        Initial: combined three scripts (vep_parse.py, fathmm_im
 
 import csv
 import re
-import pymysql
-import config_home
-import config_kinesin
-import Bio.Data.IUPACData
 import median_score as med
+import mutation_ids as ids
+import impact_store as store
+import mutation_records as rec
+import vep_reader as vep
+import protein_change as pc
+
+#*****************************************************************************
+# columns of impact rows from parseVep2 (impact view names, see impact_store.IMPACT_METRICS)
+
+VEP_COLUMNS = rec.VepRecord._fields
+
+# columns of VEP results read by parseVep2 (names of VEP tab output)
+VEP_INPUT_COLUMNS = ('SYMBOL', 'Protein_position', 'Amino_acids', '#Uploaded_variation', 'SIFT', 'PolyPhen', 'Condel',
+                     'CADD_raw', 'CADD_raw_rankscore', 'FATHMM_converted_rankscore', 'FATHMM_score', 'FATHMM_pred',
+                     'MetaSVM_pred', 'MetaSVM_rankscore', 'MetaSVM_score', 'MutPred_rankscore', 'MutPred_score',
+                     'MutationAssessor_pred', 'MutationAssessor_score', 'MutationAssessor_score_rankscore',
+                     'MutationTaster_converted_rankscore', 'MutationTaster_pred', 'MutationTaster_score',
+                     'PROVEAN_converted_rankscore', 'PROVEAN_score', 'PROVEAN_pred', 'REVEL_rankscore', 'REVEL_score')
+
+# review date after clinical significance, protein change of KIF11 in ClinVar Name
+CLINVAR_REVIEWED  = re.compile(r'\(.*\)$')
+CLINVAR_NAME      = re.compile(r'.+(\(KIF11\)).+p.(\w+)')
 
 #*****************************************************************************
 def parseVep2(my_gene, vep_file):
@@ -53,128 +83,70 @@ def parseVep2(my_gene, vep_file):
 
     Input               my_gene                 Gene of interest (KIF11)
                         vep_file                flat file (results) downloaded from VEP website
-                                                ('vep_complete_results.txt')
-    Output              impact_list             list of attributes for impact table update
+                                                ('vep_complete_results.txt'), or VEP VCF or JSON output
+    Output              impact_list             list of VepRecord for impact table update
     """
 
     vep2_impact_list = []
-    # open csv file
-    with open(vep_file, newline='') as file:
-        vep_reader = csv.DictReader(file, delimiter='\t')
-        for row in vep_reader:
-            for k in row:
-                if row[k] == '-':
-                    row[k] = 'NA'
-            try:
-                gene_name       = row['SYMBOL']        #'KIF11'
-                resnum          = row['Protein_position']
-                aa_sub          = row['Amino_acids']
-                if len(aa_sub)==1:
-                    mutation = str(aa_sub + resnum + aa_sub)
-                else:
-                    q = re.compile(r'^(.*)/(.*)')
-                    it = q.finditer(aa_sub)
-                    for match in it:
-                        aa1 = match.group(1)
-                        aa2 = match.group(2)
-                        mutation        = str(aa1+resnum+aa2)
-                genomic         = row['#Uploaded_variation']
-                sift            = row['SIFT']
-                if sift != 'NA':
-                    s = re.compile(r'^(.*)\((.*)\)')
-                    it = s.finditer(sift)
-                    for match in it:
-                        sift_pred = match.group(1)
-                        sift_score = match.group(2)
-                polyphen        = row['PolyPhen']
-                if polyphen != 'NA':
-                    it = s.finditer(polyphen)
-                    for match in it:
-                        polyphen_pred = match.group(1)
-                        polyphen_score = match.group(2)
-                condel          = row['Condel']
-                if condel != 'NA':
-                    it = s.finditer(condel)
-                    for match in it:
-                        condel = match.group(2)    # only interested in score
-                cadd_raw        = row['CADD_raw']
-                cadd_rank       = row['CADD_raw_rankscore']
-                fathmm_rank     = row['FATHMM_converted_rankscore']
-                fathmm_score    = row['FATHMM_score']
-                fathmm_pred     = row['FATHMM_pred']
-                metaSVM_pred    = row['MetaSVM_pred']
-                metaSVM_rank    = row['MetaSVM_rankscore']
-                metaSVM_score   = row['MetaSVM_score']
-                mutpred_rank    = row['MutPred_rankscore']
-                mutpred_score   = row['MutPred_score']
-                mutassess_pred  = row['MutationAssessor_pred']
-                mutassess_score = row['MutationAssessor_score']
-                mutassess_rank  = row['MutationAssessor_score_rankscore']
-                mutaster_rank   = row['MutationTaster_converted_rankscore']
-                mutaster_pred   = row['MutationTaster_pred']
-                mutaster_score  = row['MutationTaster_score']
-                provean_rank    = row['PROVEAN_converted_rankscore']
-                provean_score   = row['PROVEAN_score']
-                provean_pred    = row['PROVEAN_pred']
-                revel_rank      = row['REVEL_rankscore']
-                revel_score     = row['REVEL_score']
-            except NameError as e:
-                print("Error", e)
-
-            if gene_name == my_gene:  ## check that gene is KIF11
-                vep2_entry = [mutation, sift_pred, sift_score, polyphen_pred, polyphen_score, condel,\
-                              cadd_raw, cadd_rank,\
-                              fathmm_score, fathmm_rank, fathmm_pred,\
-                              metaSVM_score, metaSVM_rank, metaSVM_pred,\
-                              mutpred_score, mutpred_rank,\
-                              mutassess_score, mutassess_rank, mutassess_pred,\
-                              mutaster_score, mutaster_rank, mutaster_pred,\
-                              provean_score, provean_rank, provean_pred,\
-                              revel_score, revel_rank]
-
-                vep2_impact_list.append(vep2_entry)
+    mutation = None
+    # only the needed columns are read, '-' given as 'NA' (tab, VCF or JSON output, see vep_reader)
+    for row in vep.readVep(vep_file, VEP_INPUT_COLUMNS, missing='NA'):
+        (gene_name, resnum, aa_sub, genomic, sift, polyphen, condel, cadd_raw, cadd_rank,
+         fathmm_rank, fathmm_score, fathmm_pred, metaSVM_pred, metaSVM_rank, metaSVM_score,
+         mutpred_rank, mutpred_score, mutassess_pred, mutassess_score, mutassess_rank,
+         mutaster_rank, mutaster_pred, mutaster_score, provean_rank, provean_score, provean_pred,
+         revel_rank, revel_score) = row
+        # mutation and predictions keep their last value when a row has none
+        mutation = pc.vepChange(aa_sub, resnum) or mutation
+        if sift != 'NA' and vep.predictionScore(sift):
+            sift_pred, sift_score = vep.predictionScore(sift)
+        if polyphen != 'NA' and vep.predictionScore(polyphen):
+            polyphen_pred, polyphen_score = vep.predictionScore(polyphen)
+        if condel != 'NA' and vep.predictionScore(condel):
+            condel = vep.predictionScore(condel)[1]    # only interested in score
+
+        if gene_name == my_gene:  ## check that gene is KIF11
+            # scores are numbers for FLOAT columns, 'NA' scores become None (NULL)
+            # predictions are shared copies (few distinct values)
+            score = med.toScore
+            cat = rec.category
+            # by field name: VepRecord has polyphen before sift, VEP output sift before polyphen
+            vep2_entry = rec.VepRecord(mutation_id=mutation, sift_pred=cat(sift_pred), sift_score=score(sift_score),
+                          polyphen_pred=cat(polyphen_pred), polyphen_score=score(polyphen_score),
+                          condel=score(condel), cadd_score=score(cadd_raw), cadd_rank=score(cadd_rank),
+                          fathmm_score=score(fathmm_score), fathmm_rank=score(fathmm_rank),
+                          fathmm_pred=cat(fathmm_pred),
+                          metaSVM_score=score(metaSVM_score), metaSVM_rank=score(metaSVM_rank),
+                          metaSVM_pred=cat(metaSVM_pred),
+                          mutpred_score=score(mutpred_score), mutpred_rank=score(mutpred_rank),
+                          mutassessor_score=score(mutassess_score), mutassessor_rank=score(mutassess_rank),
+                          mutassessor_pred=cat(mutassess_pred),
+                          muttaster_score=score(mutaster_score), muttaster_rank=score(mutaster_rank),
+                          muttaster_pred=cat(mutaster_pred),
+                          provean_score=score(provean_score), provean_rank=score(provean_rank),
+                          provean_pred=cat(provean_pred),
+                          revel_score=score(revel_score), revel_rank=score(revel_rank))
+
+            vep2_impact_list.append(vep2_entry)
 
     return vep2_impact_list
 
 # *****************************************************************************
 
-def updateImpact2(impact_list, database):
+def updateImpact2(impact_list, database, mode='batch'):
     """ Connects to kinesin database. Updates relevant entries in impact table with all metrics from VEP.
     First must find mutation_id for each entry based on cds attribute from impact_list. Use this to update impact table.
     Input                   impact_list                     List of attributes for update of impact table
                             database                        home or kenobi
+                            mode                            'batch', or 'delta' to send only changed rows
     Output                  i                               number of updated rows
     """
 
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-    ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                          port=config_home.database_config['port'],
-                          user=config_home.database_config['dbuser'],
-                          passwd=config_home.database_config['dbpass'],
-                          db=config_home.database_config['dbname'])
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_impact = "INSERT IGNORE impact (mutation_id, polyphen_pred, polyphen_score, sift_pred, sift_score,"\
-                    "condel, cadd_score, cadd_rank, fathmm_score, fathmm_rank, fathmm_pred,"\
-                    "metaSVM_score, metaSVM_rank, metaSVM_pred, mutpred_score, mutpred_rank,"\
-                    "mutassessor_score, mutassessor_rank, mutassessor_pred, muttaster_score, muttaster_rank, muttaster_pred,"\
-                    "provean_score, provean_rank, provean_pred, revel_score, revel_rank)\
-                     VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-
-    i = 0
-    for x in impact_list:
-        with cnx.cursor() as cursor:
-            rows = cursor.execute(sql_impact, x)
-            i += 1
-    cnx.commit()
-    cnx.close()
+    # protein change of each row replaced by mutation_id, rows for mutations not in db left out,
+    # then one impact_score row per tool and metric (appended, rows of other loads are never deleted here)
+    impact_list = ids.resolve(database, impact_list)
+    scores = store.scoreRows(impact_list, VEP_COLUMNS)
+    i = store.writeScores(database, 'VEP', scores, mode)
 
     return i
 
@@ -198,9 +170,9 @@ def fathmmResultsParser(csv_file):
         for row in csv_reader:
             if row_one == False:
                 try:
-                    mutation     = row[3]
-                    prediction   = row[4]
-                    score        = row[5]
+                    mutation     = pc.shortChange(row[3])
+                    prediction   = rec.category(row[4])
+                    score        = med.toScore(row[5])
                     fathmm_dict[mutation] = prediction, score
                 except NameError as e:
                     print("Error", e)
@@ -212,43 +184,19 @@ def fathmmResultsParser(csv_file):
 
 #*****************************************************************************
 
-def fathmmInsert(results_dict, database):
+def fathmmInsert(results_dict, database, mode='batch'):
     """ This function uses dictionary of FATHMM scores and predictions to update impact table in kinesin database.
         Input               results_dict                    dict of attributes (mutation_id:prediction, score)
                             database                        which database used (home or kenobi)
-        Output              count                           number of successfully updated rows in impact table
+                            mode                            'batch', or 'delta' to send only changed rows
+        Output              count                           number of impact_score rows written for mutations with
+                                                            scores (matched rows; changed rows in delta mode)
         """
 
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_fathmm2 = "UPDATE impact SET fathmm_cancer_pred = %s, fathmm_cancer_score = %s WHERE mutation_id = %s;"
-
-    count = 0
-    for k,v in results_dict.items():
-        aa      = k
-        prediction = v[0]
-        score   = v[1]
-        entry   = (prediction, score, aa)
-        with cnx.cursor() as cursor:
-            cursor.execute(sql_fathmm2, entry)
-            count += 1
-
-    cnx.commit()
-    cnx.close()
+    # (mutation_id, prediction, score) written as fathmm_cancer rows of mutations with VEP results
+    fathmm_list = ids.resolve(database, [(k, v[0], v[1]) for k,v in results_dict.items()])
+    scores = store.scoreRows(fathmm_list, ('mutation_id', 'fathmm_cancer_pred', 'fathmm_cancer_score'))
+    count = store.writeScores(database, 'FATHMM', scores, mode, replace=True, scored_only=True)
 
     return count
 
@@ -272,73 +220,32 @@ def parseClinvar(gene, csv_file):
 
             clin_sig = row['Clinical significance (Last reviewed)']
             # remove review date in parentheses
-            r = re.compile(r'\(.*\)$')
-            clin_sig = r.sub('', clin_sig)
+            clin_sig = CLINVAR_REVIEWED.sub('', clin_sig)
 
             mut_name    = row['Name']       ##NM_004523.3(KIF11):c.2T>C (p.Met1Thr)
-            p       = re.compile(r'.+(\(KIF11\)).+p.(\w+)')
-            it      = p.finditer(mut_name)
-            for match in it:
-                mut = str(match.group(2))
-                # extract 3-letter amino acid codes and resnum
-                q       = re.compile(r'(\D+)(\d+)(\D{3})')
-                ob      = q.finditer(mut)
-                for x in ob:
-                    old_aa3 = str(x.group(1))
-                    resnum = str(x.group(2))
-                    new_aa3 = str(x.group(3))
-                # reformat protein entry for one letter IUPAC code
-                    try:
-                        old_aa1 = Bio.Data.IUPACData.protein_letters_3to1[old_aa3]
-                    except KeyError:
-                        old_aa1 = '*'
-                    try:
-                        new_aa1 = Bio.Data.IUPACData.protein_letters_3to1[new_aa3]
-                    except KeyError:
-                        new_aa1 = '*'
-                    new_mutation = old_aa1 + resnum + new_aa1
-
-                    cv_entry = [clin_sig, new_mutation]
+            for match in CLINVAR_NAME.finditer(mut_name):
+                # 3-letter amino acid codes and resnum in one letter IUPAC code
+                for new_mutation in pc.threeLetterChanges(match.group(2)):
+                    cv_entry = [rec.category(clin_sig), new_mutation]
                     cv_list.append(cv_entry)
 
     return cv_list
 
 # ******************************************************************************
 
-def clinvarUpdate(clinvar_list, database):
+def clinvarUpdate(clinvar_list, database, mode='batch'):
     """ This function uses list of clinvar attributes to update impact table in kinesin database.
     Input               clinvar_list                    list of attributes (genomic location, clinical significance)
                         database                        which database used
-    Output              count                           number of successfully updated rows in impact table
+                        mode                            'batch', or 'delta' to send only changed rows
+    Output              count                           number of impact_score rows written for mutations with
+                                                        scores (matched rows; changed rows in delta mode)
     """
 
-
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_clinvar = "UPDATE impact SET clinvar_prediction = %s WHERE mutation_id = %s;"
-
-    count = 0
-    for item in clinvar_list:
-        with cnx.cursor() as cursor:
-            rows = cursor.execute(sql_clinvar, item)
-            count += 1
-
-    cnx.commit()
-    cnx.close()
+    # clinvar_list entries are [clin_sig, mutation], written as (mutation_id, clinvar, pred) rows
+    staged = ids.resolve(database, [(item[1], item[0]) for item in clinvar_list])
+    scores = store.scoreRows(staged, ('mutation_id', 'clinvar_prediction'))
+    count = store.writeScores(database, 'clinvar', scores, mode, replace=True, scored_only=True)
 
     return count
 
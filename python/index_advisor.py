@@ -0,0 +1,346 @@
+#!/usr/bin python3
+
+""" Index advisor """
+
+"""
+Program:    index_advisor
+File:       index_advisor.py
+Version:    1.0
+Date:       18.10.26
+Function:   EXPLAIN the analysis queries of the project and propose composite indexes for kinesin database
+_____________________________________________________________________________
+Description:
+============
+The query corpus is every SELECT in mysql_database/sql_queries, the dbSendQuery strings of the R scripts and the
+single-string SELECT queries of the python modules. Each query is run through EXPLAIN (MySQL) or EXPLAIN QUERY PLAN
+(SQLite) to list the tables read by a full scan.
+
+Indexes are proposed from the text of each query, per table: columns compared with a constant (=, IN, LIKE without
+leading wildcard) first, then the first range column (<, >, BETWEEN) or, if there is none, the GROUP BY / ORDER BY
+columns (other than the primary key), so the filter is one index range scan and grouping is read in index order.
+Join columns (unless the column is the table's primary key) come last: a column between them would end the part of
+the index that can be searched or is in order, after them it makes the index cover the join. OR branches are treated
+as separate queries. A proposal is dropped if it is a left prefix of an existing index, of the primary key or of
+another proposal. Foreign key columns without an index are also proposed (InnoDB creates these itself, SQLite does
+not).
+
+The indexes it recommends ship in kinesin.sql. Run with --apply to add missing ones to an existing database, update
+optimizer statistics (ANALYZE) and EXPLAIN the corpus again.
+
+Usage:
+======
+python3 index_advisor.py [home|kenobi|local] [--apply]
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        SQLite INTEGER PRIMARY KEY (rowid) read from table_info
+V1.2    18.10.26        MySQL columns of base tables only (no views)
+V1.3    18.10.26        Range and ordering columns before join columns
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import glob
+import os
+import re
+import sys
+import db_session
+import sqlite_backend
+
+# ******************************************************************************
+
+ROOT        = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+SQL_FILES   = os.path.join(ROOT, 'mysql_database', 'sql_queries', '*.sql')
+R_FILES     = os.path.join(ROOT, 'R', '*.R')
+PY_FILES    = os.path.join(ROOT, 'python', '*.py')
+
+CLAUSE      = re.compile(r'\b(SELECT|FROM|WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT)\b', re.I)
+COLUMN      = r'(?:(\w+)\.)?([A-Za-z_]\w*)'
+JOIN_PRED   = re.compile(r'^%s\s*=\s*%s$' % (COLUMN, COLUMN))
+EQ_PRED     = re.compile(r'^%s\s*(=|\bIN\b|\bLIKE\b)\s*(.+)$' % COLUMN, re.I | re.S)
+RANGE_PRED  = re.compile(r'^%s\s*(<=|>=|<|>|\bBETWEEN\b)' % COLUMN, re.I)
+
+# ******************************************************************************
+
+def queryCorpus():
+    """Analysis queries of the project.
+    Output              corpus                  list of (source, sql)
+    """
+    corpus = []
+    for path in sorted(glob.glob(SQL_FILES)):
+        for n, sql in enumerate(sqlite_backend.statements(path), 1):
+            if sql.upper().startswith('SELECT'):
+                corpus.append(('%s:%d' % (os.path.basename(path), n), sql))
+    for path in sorted(glob.glob(R_FILES)):
+        with open(path) as file:
+            text = file.read()
+        for n, sql in enumerate(re.findall(r'dbSendQuery\(\s*\w+\s*,\s*"(.*?)"\s*\)', text, re.S), 1):
+            corpus.append(('%s:%d' % (os.path.basename(path), n), sql))
+    for path in sorted(glob.glob(PY_FILES)):
+        with open(path) as file:
+            text = file.read()
+        for n, sql in enumerate(re.findall(r'"(SELECT\b[^"]*\bFROM\b[^"]*)"', text), 1):
+            # leave out parameterised queries and catalog queries of the storage tools
+            if '%' not in sql and not re.search(r'information_schema|sqlite_', sql, re.I):
+                corpus.append(('%s:%d' % (os.path.basename(path), n), sql))
+    return [(source, re.sub(r'\s+', ' ', sql).strip().rstrip(';')) for source, sql in corpus]
+
+# ******************************************************************************
+
+def tableColumns(cnx):
+    """Columns of each table.
+    Output              columns                 dictionary table:list of column names
+    """
+    columns = {}
+    with cnx.cursor() as cursor:
+        if db_session.engine(cnx) == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite%';")
+            for (table,) in cursor.fetchall():
+                cursor.execute("PRAGMA table_info(%s);" % table)
+                columns[table] = [row[1] for row in cursor.fetchall()]
+        else:
+            # base tables only, views (impact) cannot be indexed
+            cursor.execute("SELECT c.TABLE_NAME, c.COLUMN_NAME FROM information_schema.COLUMNS c, "
+                           "information_schema.TABLES t WHERE c.TABLE_SCHEMA = DATABASE() "
+                           "AND t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME "
+                           "AND t.TABLE_TYPE = 'BASE TABLE' ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION;")
+            for table, column in cursor.fetchall():
+                columns.setdefault(table, []).append(column)
+    return columns
+
+# ******************************************************************************
+
+def existingIndexes(cnx):
+    """Indexes of each table (primary key first).
+    Output              indexes                 dictionary table:list of column tuples
+    """
+    indexes = {}
+    with cnx.cursor() as cursor:
+        if db_session.engine(cnx) == 'sqlite':
+            for table in tableColumns(cnx):
+                # primary key from table_info: an INTEGER PRIMARY KEY is the rowid and has no entry in index_list
+                cursor.execute("PRAGMA table_info(%s);" % table)
+                primary = tuple(r[1] for r in sorted((r for r in cursor.fetchall() if r[5]), key=lambda r: r[5]))
+                if primary:
+                    indexes.setdefault(table, []).append(primary)
+                cursor.execute("PRAGMA index_list(%s);" % table)
+                for row in cursor.fetchall():
+                    if row[3] == 'pk':
+                        continue            # same columns as primary key
+                    cursor.execute("PRAGMA index_info(%s);" % row[1])
+                    indexes.setdefault(table, []).append(tuple(r[2] for r in sorted(cursor.fetchall())))
+        else:
+            cursor.execute("SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+                           "WHERE TABLE_SCHEMA = DATABASE() "
+                           "ORDER BY TABLE_NAME, INDEX_NAME != 'PRIMARY', INDEX_NAME, SEQ_IN_INDEX;")
+            found = {}
+            for table, name, column in cursor.fetchall():
+                found.setdefault((table, name), []).append(column)
+            for (table, name), cols in found.items():
+                indexes.setdefault(table, []).append(tuple(cols))
+    return indexes
+
+# ******************************************************************************
+
+def explain(cnx, sql):
+    """Tables read by a full scan in the plan of query.
+    Input               cnx                     open connection
+                        sql                     SELECT statement
+    Output              scans                   list of table names (or aliases) scanned
+    """
+    with cnx.cursor() as cursor:
+        if db_session.engine(cnx) == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + re.sub(r'\bkinesin\.', '', sql))
+            return [row[3].split()[1] for row in cursor.fetchall() if row[3].startswith('SCAN ')]
+        cursor.execute("EXPLAIN " + sql)
+        names = [d[0].lower() for d in cursor.description]
+        return [row[names.index('table')] for row in cursor.fetchall() if row[names.index('type')] in ('ALL', 'index')]
+
+# ******************************************************************************
+
+def clauses(sql):
+    """Splits SELECT into clauses (no subqueries).
+    Output              parts                   dictionary SELECT/FROM/WHERE/GROUP BY/ORDER BY/...:text
+    """
+    parts = {}
+    found = list(CLAUSE.finditer(sql))
+    for n, match in enumerate(found):
+        end = found[n + 1].start() if n + 1 < len(found) else len(sql)
+        parts[re.sub(r'\s+', ' ', match.group(1).upper())] = sql[match.end():end].strip()
+    return parts
+
+# ******************************************************************************
+
+def resolve(qualifier, name, aliases, columns):
+    """Table and schema spelling of a column reference, (None, None) if it is not a column of a table in FROM."""
+    tables = [aliases[qualifier.lower()]] if qualifier and qualifier.lower() in aliases else list(aliases.values())
+    hits = [(t, c) for t in set(tables) for c in columns.get(t, ()) if c.lower() == name.lower()]
+    return hits[0] if len(hits) == 1 else (None, None)
+
+# ******************************************************************************
+
+def candidates(sql, columns, primary):
+    """Composite indexes that would turn the scans of query into index lookups.
+    Input               sql                     SELECT statement
+                        columns                 dictionary from tableColumns
+                        primary                 dictionary table:primary key columns
+    Output              proposals               list of (table, column tuple)
+    """
+    parts = clauses(sql)
+    if 'FROM' not in parts:
+        return []
+    aliases = {}
+    for item in re.split(r',|\bJOIN\b', re.split(r'\bON\b', parts['FROM'], flags=re.I)[0], flags=re.I):
+        words = re.sub(r'\bAS\b', ' ', item, flags=re.I).split()
+        if words:
+            table = words[0].split('.')[-1]
+            if table in columns:
+                aliases[(words[-1] if len(words) > 1 else table).lower()] = table
+
+    def refs(text):
+        found = []
+        for item in text.split(','):
+            item = re.sub(r'\b(ASC|DESC)\b', '', item, flags=re.I).strip()
+            match = re.match(r'^%s$' % COLUMN, item)
+            if match:
+                found.append(resolve(match.group(1), match.group(2), aliases, columns))
+        return found
+
+    ordering = refs(parts.get('GROUP BY', '')) + refs(parts.get('ORDER BY', ''))
+    proposals = []
+    for branch in re.split(r'\bOR\b', parts.get('WHERE', ''), flags=re.I):
+        eq, joins, ranges = {}, {}, {}
+        for predicate in re.split(r'\bAND\b', branch, flags=re.I):
+            predicate = predicate.strip().strip('()').strip()
+            join = JOIN_PRED.match(predicate)
+            if join:
+                for qualifier, name in (join.group(1, 2), join.group(3, 4)):
+                    table, column = resolve(qualifier, name, aliases, columns)
+                    if table and (column,) != tuple(primary.get(table, ())):
+                        joins.setdefault(table, []).append(column)
+                continue
+            match = EQ_PRED.match(predicate)
+            if match and not (match.group(3).upper() == 'LIKE' and match.group(4).lstrip().startswith("'%")):
+                table, column = resolve(match.group(1), match.group(2), aliases, columns)
+                if table:
+                    eq.setdefault(table, []).append(column)
+                continue
+            match = RANGE_PRED.match(predicate)
+            if match:
+                table, column = resolve(match.group(1), match.group(2), aliases, columns)
+                if table:
+                    ranges.setdefault(table, []).append(column)
+        for table in set(eq) | set(ranges):
+            cols = eq.get(table, []) + ranges.get(table, [])[:1]
+            if table not in ranges:
+                cols += [c for t, c in ordering if t == table and (c,) != tuple(primary.get(table, ()))]
+            cols += joins.get(table, [])
+            proposals.append((table, tuple(dict.fromkeys(cols))))
+    return proposals
+
+# ******************************************************************************
+
+def covered(cols, indexes):
+    """True if cols is a left prefix of one of indexes."""
+    return any(tuple(index[:len(cols)]) == tuple(cols) for index in indexes)
+
+# ******************************************************************************
+
+def recommend(corpus, columns, indexes):
+    """Indexes proposed by corpus, without those already covered.
+    Input               corpus                  list of (source, sql)
+                        columns                 dictionary from tableColumns
+                        indexes                 dictionary from existingIndexes
+    Output              recommended             dictionary (table, column tuple):list of sources served
+    """
+    primary = {t: i[0] for t, i in indexes.items() if i}
+    proposed = {}
+    for source, sql in corpus:
+        for proposal in candidates(sql, columns, primary):
+            proposed.setdefault(proposal, []).append(source)
+    for table, keys in sqlite_backend.foreignKeys().items():
+        for cols, parent, parent_cols in keys:
+            if table in columns:
+                proposed.setdefault((table, cols), []).append('foreign key -> %s' % parent)
+
+    recommended = {}
+    for (table, cols), sources in proposed.items():
+        longer = [c for t, c in proposed if t == table and c != cols]
+        if not covered(cols, indexes.get(table, [])) and not covered(cols, longer):
+            recommended[(table, cols)] = sources
+    # proposals that are prefixes of a recommended index are served by it
+    for (table, cols), sources in proposed.items():
+        for (t, c), served in recommended.items():
+            if t == table and c != cols and c[:len(cols)] == cols:
+                served.extend(s for s in sources if s not in served)
+    return recommended
+
+# ******************************************************************************
+
+def indexSql(table, cols):
+    """CREATE INDEX statement for recommended index."""
+    return "CREATE INDEX idx_%s_%s ON %s (%s);" % (table, '_'.join(cols), table, ', '.join(cols))
+
+# ******************************************************************************
+
+def analyze(cursor, engine, tables):
+    """Updates optimizer statistics so new indexes are considered."""
+    if engine == 'sqlite':
+        cursor.execute("ANALYZE;")
+    else:
+        cursor.execute("ANALYZE TABLE %s;" % ', '.join(tables))
+        cursor.fetchall()
+
+# ******************************************************************************
+
+def scanReport(cnx, corpus):
+    """Full scans of each query, counts queries scanning at least one table."""
+    scanning = 0
+    for source, sql in corpus:
+        try:
+            scans = explain(cnx, sql)
+        except db_session.ERRORS as e:
+            print("%-24s EXPLAIN failed: %s" % (source, e))
+            continue
+        if scans:
+            scanning += 1
+            print("%-24s full scan: %s" % (source, ', '.join(scans)))
+    return scanning
+
+# ******************************************************************************
+
+def advise(database, apply=False):
+    """EXPLAINs corpus, prints recommended indexes, optionally creates them and EXPLAINs again.
+    Input               database                kenobi, home or local
+                        apply                   True to create recommended indexes
+    Output              statements              list of CREATE INDEX statements
+    """
+    corpus = queryCorpus()
+    with db_session.session(database) as cnx:
+        print("== %d queries" % len(corpus))
+        before = scanReport(cnx, corpus)
+        recommended = recommend(corpus, tableColumns(cnx), existingIndexes(cnx))
+        statements = []
+        print("\n== recommended indexes")
+        for (table, cols), sources in sorted(recommended.items()):
+            statements.append(indexSql(table, cols))
+            print("%s\t-- %d: %s" % (statements[-1], len(sources), ', '.join(sources)))
+        if apply and statements:
+            with cnx.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+                analyze(cursor, db_session.engine(cnx), sorted({t for t, c in recommended}))
+            print("\n== after creating %d indexes" % len(statements))
+            after = scanReport(cnx, corpus)
+            print("queries with full scans: %d before, %d after" % (before, after))
+    return statements
+
+# ******************************************************************************
+
+if __name__ == "__main__":
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    advise(args[0] if args else 'home', '--apply' in sys.argv)
+    db_session.closeAll()
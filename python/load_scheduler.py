@@ -0,0 +1,139 @@
+#!/usr/bin python3
+
+""" Load scheduler module """
+
+"""
+Program:    load_scheduler
+File:       load_scheduler.py
+Version:    1.0
+Date:       18.10.26
+Function:   Run table loads concurrently in an order that respects foreign keys in kinesin.sql
+_____________________________________________________________________________
+Description:
+============
+dbinsert_module used to run every load in sequence. Only the parent tables have to be loaded first: source_info,
+impact and tissue all reference mutation, but not each other. tableDependencies reads the FOREIGN KEY ...
+REFERENCES clauses from kinesin.sql; runTasks then starts each load as soon as every earlier load of the same
+table, or of a table it references, has finished. Independent loads run at the same time in worker threads,
+each on its own pooled connection (db_session), so ingest time is the critical path instead of the sum of loads.
+
+Loads of the same table keep the order they are listed in (e.g. VEP insert, then FATHMM, clinvar and medians
+for impact).
+
+Usage:
+======
+tasks = [LoadTask('mutation (GDC)', 'mutation', insertMutation, gdc_att, db), ...]
+results = runTasks(tasks, tableDependencies())
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ******************************************************************************
+
+SCHEMA_FILE     = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'mysql_database', 'kinesin.sql')
+MAX_WORKERS     = 4
+
+# ******************************************************************************
+
+class LoadTask:
+    """One load (function and arguments) writing to a table."""
+
+    def __init__(self, name, table, func, *args):
+        self.name   = name
+        self.table  = table
+        self.func   = func
+        self.args   = args
+
+    def run(self):
+        start = time.perf_counter()
+        result = self.func(*self.args)
+        print("%s finished in %.2f s" % (self.name, time.perf_counter() - start), file=sys.stderr)
+        return result
+
+# ******************************************************************************
+
+def tableDependencies(schema_file=SCHEMA_FILE):
+    """Reads foreign keys from schema file.
+    Input               schema_file             sql file with CREATE table statements (kinesin.sql)
+    Output              deps                    dictionary table:set of referenced tables
+    """
+    with open(schema_file) as file:
+        # drop comment lines, old tables are kept in comments
+        schema = ''.join(line for line in file if not line.lstrip().startswith('--'))
+
+    deps = {}
+    create = re.compile(r'CREATE\s+table\s+(\w+)\s*\((.*?)\)\s*ENGINE', re.I | re.S)
+    for match in create.finditer(schema):
+        table = match.group(1)
+        deps[table] = set(re.findall(r'REFERENCES\s+(\w+)', match.group(2), re.I)) - {table}
+    return deps
+
+# ******************************************************************************
+
+def ancestors(table, deps):
+    """All tables that table references directly or indirectly."""
+    found = set()
+    todo = list(deps.get(table, ()))
+    while todo:
+        parent = todo.pop()
+        if parent not in found:
+            found.add(parent)
+            todo.extend(deps.get(parent, ()))
+    return found
+
+# ******************************************************************************
+
+def buildGraph(tasks, deps):
+    """Each task waits for earlier tasks loading the same table or a table it references.
+    Input               tasks                   list of LoadTask in required order
+                        deps                    dictionary from tableDependencies
+    Output              graph                   dictionary task index:set of task indices it waits for
+    """
+    graph = {}
+    for n, task in enumerate(tasks):
+        parents = ancestors(task.table, deps) | {task.table}
+        graph[n] = {m for m in range(n) if tasks[m].table in parents}
+    return graph
+
+# ******************************************************************************
+
+def runTasks(tasks, deps, workers=MAX_WORKERS):
+    """Runs tasks concurrently, starting each once the loads it depends on are done.
+    Input               tasks                   list of LoadTask in required order
+                        deps                    dictionary from tableDependencies
+                        workers                 number of worker threads (connections in use at once)
+    Output              results                 dictionary task name:return value
+    """
+    graph   = buildGraph(tasks, deps)
+    done    = set()
+    running = {}
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while len(done) < len(tasks):
+            for n in range(len(tasks)):
+                if n not in done and n not in running.values() and graph[n] <= done:
+                    running[executor.submit(tasks[n].run)] = n
+            finished, pending = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                n = running.pop(future)
+                try:
+                    results[tasks[n].name] = future.result()
+                except BaseException:
+                    # let running loads finish, start nothing new
+                    for other in running:
+                        other.cancel()
+                    raise
+                done.add(n)
+    return results
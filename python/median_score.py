@@ -30,6 +30,13 @@ median_score                SELF
 Revision History:
 =================
 V1.0    14.06.19        Initial                                     By: JJS
+V1.1    18.10.26        Use pooled connections from db_session
+V1.2    18.10.26        Insert medians through staging table
+V1.3    18.10.26        updateMedians runs whole median step
+V1.4    18.10.26        Delta mode for medians
+V1.5    18.10.26        Query impact without schema name (SQLite)
+V1.6    18.10.26        Numeric scores (toScore), NULL for missing
+V1.7    18.10.26        Scores read and medians written in impact_score
 
 """
 
@@ -38,53 +45,58 @@ V1.0    14.06.19        Initial                                     By: JJS
 # Import libraries
 
 import re
-import config_home
-import pymysql
-import config_kinesin
+import db_session
+import impact_store as store
 import math
 
 
 #*****************************************************************************
 
+MISSING = ('', 'NA', 'UNK', '-', 'N/A', 'None')      # placeholders used for missing scores
+
+# (tool, metric) of the 9 scores in the median, in impact_score
+MEDIAN_METRICS = (('condel', 'score'), ('cadd', 'rank'), ('fathmm', 'rank'), ('metaSVM', 'rank'), ('mutpred', 'rank'),
+                  ('mutassessor', 'rank'), ('muttaster', 'rank'), ('provean', 'rank'), ('revel', 'rank'))
+
+#*****************************************************************************
+
+def toScore(value, kind=float):
+    """Numeric value of a score as stored in typed columns of impact (FLOAT) and mutation (resnum INT).
+    INPUT           value                           score from parser or database ('0.745', 0.745, 'NA', None)
+                    kind                            float or int
+    OUTPUT          score                           number, None (NULL) for missing or non-numeric values
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return kind(value)
+    value = str(value).strip()
+    if value in MISSING:
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        return None
+
+
+#*****************************************************************************
 
 def getScores(database):
-    """Query kinesin database and get relevant ranked scores for each mutation in
-    the impact table.
+    """Query kinesin database and get relevant ranked scores for each mutation with scores in
+    impact_score.
    INPUT            database                        home or kinesin
    OUTPUT           score_dict                      dictionary of mutation:scores
     """
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    mutation_list = []
-
-    query = "SELECT mutation_id, condel, cadd_rank, fathmm_rank, metaSVM_rank, mutpred_rank, mutassessor_rank,"\
-            "muttaster_rank, provean_rank, revel_rank FROM kinesin.impact;"
-
-    with cnx.cursor() as cursor:
-        cursor.execute(query)
-        temp = cursor.fetchall()
-
-    # create dictionary with scores
-    mut_scores = ''
+    # one range scan of impact_score (tool, metric, value, mutation_id) per tool, instead of reading every impact column
+    with db_session.session(database) as cnx:
+        mutations   = store.scoredMutations(cnx)
+        tool_scores = [store.toolScores(cnx, tool, metric) for tool, metric in MEDIAN_METRICS]
+
+    # create dictionary with scores (None where a tool has no score for the mutation)
     score_dict = {}
 
-    for x in temp:
-        mut_scores = x[1:10]
-        score_dict[x[0]]= mut_scores
+    for x in mutations:
+        score_dict[x] = tuple(scores.get(x) for scores in tool_scores)
 
     return score_dict
 
@@ -99,16 +111,11 @@ def calcMedian(score_dict):
     median_dict  = {}
 
     for k,v in score_dict.items():
-            scores          = v[0:9]
-            score_list      = []
-            median_score    = ''
-            for x in scores:
-                if x != 'NA':
-                    score_list.append(x)
-                    score_list.sort()
-                    median_score = score_list[math.floor(len(score_list) / 2)]
-                else:
-                    median_score = 'NA'
+            # missing scores (NULL, or 'NA'/'UNK' in tables not yet migrated) are left out
+            score_list      = sorted(s for s in (toScore(x) for x in v[0:9]) if s is not None)
+            median_score    = None
+            if score_list:
+                median_score = score_list[math.floor(len(score_list) / 2)]
             median_dict[k] = median_score
 
 
@@ -118,43 +125,34 @@ def calcMedian(score_dict):
 
 #*****************************************************************************
 
-def insertMedians(median_dict, database):
-    """Insert median values into impact database (column name: median_ranked_scores)
+def insertMedians(median_dict, database, mode='batch'):
+    """Insert median values into impact_score (tool 'median', metric 'rank'; view column median_ranked_scores)
     INPUT           median_dict                     dictionary of mutation:median
-    OUTPUT          number                          number of rows inserted
+                    database                        home or kenobi
+                    mode                            'batch', or 'delta' to send only changed medians
+    OUTPUT          number                          number of median rows written (changed in delta mode)
     """
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-        ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                              port=config_home.database_config['port'],
-                              user=config_home.database_config['dbuser'],
-                              passwd=config_home.database_config['dbpass'],
-                              db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_median = "UPDATE impact SET median_ranked_scores = %s WHERE mutation_id = %s;"
-
-    median_list = []
-    count = 0
-    for k,v in median_dict.items():
-        median_list   = (v,k)
-        with cnx.cursor() as cursor:
-            rows = cursor.execute(sql_median, median_list)
-            count += 1
-
-    cnx.commit()
-    cnx.close()
+    # (mutation_id, median) written as median rank rows, NULL medians too so a changed median replaces the old one
+    median_list = list(median_dict.items())
+    scores = store.scoreRows(median_list, ('mutation_id', 'median_ranked_scores'), keep_missing=True)
+    count = store.writeScores(database, 'median', scores, mode, replace=True)
 
     return count
 
 
+#*****************************************************************************
+
+def updateMedians(database, mode='batch'):
+    """Query scores, calculate medians and insert them (last step of impact table population).
+    INPUT           database                        home or kenobi
+                    mode                            'batch', or 'delta' to send only changed medians
+    OUTPUT          number                          number of median rows written (changed in delta mode)
+    """
+    score_dict  = getScores(database)
+    medians     = calcMedian(score_dict)
+    return insertMedians(medians, database, mode)
+
+
 # ******************************************************************************
 
 
@@ -0,0 +1,198 @@
+#!/usr/bin python3
+
+""" Numeric column migration """
+
+"""
+Program:    migrate_numeric
+File:       migrate_numeric.py
+Version:    1.0
+Date:       18.10.26
+Function:   Convert score columns of impact to FLOAT and mutation.resnum to INT in an existing kinesin database
+_____________________________________________________________________________
+Description:
+============
+Scores in impact and resnum in mutation used to be VARCHAR with 'UNK'/'NA' for missing values, so thresholds
+(condel > 0.8) and ORDER BY resnum compared strings and could not use a range index. kinesin.sql now declares them
+FLOAT / INT with NULL for missing values. This script brings a database created from the old schema up to date
+without reloading it:
+
+MySQL:  1. MODIFY columns to nullable VARCHAR
+        2. one UPDATE per table setting every non-numeric value ('UNK', 'NA', '') to NULL
+        3. one ALTER TABLE per table MODIFYing the columns to their numeric type
+SQLite: column types cannot be altered, so the table is rebuilt from kinesin.sql (with its indexes) and rows are
+        copied with values converted by median_score.toScore (foreign key checks off while the table is swapped)
+
+Columns that already have a numeric type are skipped, so the script can be run more than once. In an SQLite
+database created before impact_score, impact is still a wide table that kinesin.sql no longer creates (it is now a
+view), so it cannot be rebuilt here: it is skipped with a message, and the database must be rebuilt from kinesin.sql
+and reloaded (dbinsert_module).
+
+Usage:
+======
+python3 migrate_numeric.py [home|kenobi|local]
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Recreate indexes of rebuilt SQLite tables
+V1.2    18.10.26        Skip impact when it is a view (impact_score)
+V1.3    18.10.26        Skip SQLite tables kinesin.sql no longer creates
+                        (wide impact table), database must be rebuilt
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import re
+import sys
+import db_session
+import median_score as med
+import sqlite_backend
+
+# ******************************************************************************
+
+IMPACT_SCORES   = ('median_ranked_scores', 'sift_score', 'polyphen_score', 'condel', 'cadd_rank', 'cadd_score',
+                   'fathmm_rank', 'fathmm_score', 'metaSVM_rank', 'metaSVM_score', 'mutpred_rank', 'mutpred_score',
+                   'mutassessor_rank', 'mutassessor_score', 'muttaster_rank', 'muttaster_score', 'provean_rank',
+                   'provean_score', 'revel_rank', 'revel_score', 'fathmm_cancer_score')
+
+# table:{column:type}, types as in kinesin.sql
+NUMERIC_COLUMNS = {'impact':    {c: 'FLOAT' for c in IMPACT_SCORES},
+                   'mutation':  {'resnum': 'INT'}}
+
+NUMERIC_TYPES   = ('int', 'integer', 'float', 'double', 'decimal', 'real')
+NUMBER_PATTERN  = '^ *[-+]?[0-9]*\\\\.?[0-9]+([eE][-+]?[0-9]+)? *$'
+
+# ******************************************************************************
+
+def columnTypes(cnx, table):
+    """Declared type of each column of table.
+    Input               cnx                     open connection
+                        table                   table name
+    Output              types                   dictionary column:lower case type name
+    """
+    with cnx.cursor() as cursor:
+        if db_session.engine(cnx) == 'sqlite':
+            cursor.execute("PRAGMA table_info(%s);" % table)
+            return {row[1]: row[2].split('(')[0].lower() for row in cursor.fetchall()}
+        cursor.execute("SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s;", (table,))
+        return {row[0]: row[1].lower() for row in cursor.fetchall()}
+
+# ******************************************************************************
+
+def isBaseTable(cnx, table):
+    """True if table exists and is a table (not a view)."""
+    with cnx.cursor() as cursor:
+        if db_session.engine(cnx) == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s;", (table,))
+        else:
+            cursor.execute("SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() "
+                           "AND TABLE_NAME = %s AND TABLE_TYPE = 'BASE TABLE';", (table,))
+        return cursor.fetchone() is not None
+
+# ******************************************************************************
+
+def pendingColumns(cnx, table):
+    """Columns of table still stored as text.
+    Output              columns                 dictionary column:numeric type
+    """
+    if not isBaseTable(cnx, table):
+        return {}           # impact is a view of impact_score (FLOAT value) in databases created since
+    types = columnTypes(cnx, table)
+    return {c: t for c, t in NUMERIC_COLUMNS[table].items() if c in types and types[c] not in NUMERIC_TYPES}
+
+# ******************************************************************************
+
+def migrateMysql(cnx, table, columns):
+    """Converts columns of table in place (MySQL).
+    Input               cnx                     open pymysql connection
+                        table                   table name
+                        columns                 dictionary column:numeric type
+    """
+    with cnx.cursor() as cursor:
+        cursor.execute("ALTER TABLE %s %s;" % (table, ', '.join('MODIFY %s VARCHAR(25) NULL DEFAULT NULL' % c
+                                                                for c in columns)))
+        cursor.execute("UPDATE %s SET %s;" % (table, ', '.join("%s = IF(%s REGEXP '%s', %s, NULL)"
+                                                               % (c, c, NUMBER_PATTERN, c) for c in columns)))
+        cursor.execute("ALTER TABLE %s %s;" % (table, ', '.join('MODIFY %s %s NULL DEFAULT NULL' % (c, t)
+                                                                for c, t in columns.items())))
+
+# ******************************************************************************
+
+def createStatement(schema, table):
+    """CREATE table statement of table in kinesin.sql statements, None if kinesin.sql does not create it."""
+    return next((s for s in schema if s.split()[:3] == ['CREATE', 'table', table]), None)
+
+# ******************************************************************************
+
+def migrateSqlite(cnx, table, columns):
+    """Rebuilds table with the column types of kinesin.sql and copies converted rows (SQLite).
+    Input               cnx                     open sqlite_backend connection
+                        table                   table name
+                        columns                 dictionary column:numeric type
+    """
+    schema = list(sqlite_backend.statements(sqlite_backend.SCHEMA_FILE))
+    create = createStatement(schema, table)
+    indexes = [s for s in schema if re.match(r'CREATE\s+INDEX\s+\w+\s+ON\s+%s\b' % table, s, re.I)]
+    rebuilt = table + '_migrated'
+    names = list(columnTypes(cnx, table))
+    kinds = {c: (int if t == 'INT' else float) for c, t in columns.items()}
+
+    cnx.commit()
+    with cnx.cursor() as cursor:
+        # foreign keys off so dropping the old table does not cascade to child rows
+        cursor.execute("PRAGMA foreign_keys = OFF;")
+        cursor.execute("PRAGMA legacy_alter_table = ON;")
+        try:
+            cursor.execute(create.replace(table, rebuilt, 1))
+            cursor.execute("SELECT %s FROM %s;" % (', '.join(names), table))
+            rows = [[med.toScore(v, kinds[c]) if c in kinds else v for c, v in zip(names, row)]
+                    for row in cursor.fetchall()]
+            cursor.executemany("INSERT INTO %s (%s) VALUES(%s)" % (rebuilt, ', '.join(names),
+                                                                  ','.join(['%s'] * len(names))), rows)
+            cursor.execute("DROP TABLE %s;" % table)
+            cursor.execute("ALTER TABLE %s RENAME TO %s;" % (rebuilt, table))
+            for statement in indexes:
+                cursor.execute(statement)
+            cnx.commit()
+        except BaseException:
+            cnx.rollback()
+            raise
+        finally:
+            cursor.execute("PRAGMA legacy_alter_table = OFF;")
+            cursor.execute("PRAGMA foreign_keys = ON;")
+
+# ******************************************************************************
+
+def migrate(database):
+    """Converts all text score columns of database to numeric types.
+    Input               database                kenobi, home or local
+    Output              migrated                dictionary table:list of converted columns
+    """
+    migrated = {}
+    with db_session.session(database) as cnx:
+        for table in NUMERIC_COLUMNS:
+            columns = pendingColumns(cnx, table)
+            if not columns:
+                continue
+            if db_session.engine(cnx) == 'sqlite':
+                if createStatement(sqlite_backend.statements(sqlite_backend.SCHEMA_FILE), table) is None:
+                    print("%s: not a table in kinesin.sql any more (impact is a view of impact_score), skipped; "
+                          "rebuild the database from kinesin.sql and reload it with dbinsert_module" % table,
+                          file=sys.stderr)
+                    continue
+                migrateSqlite(cnx, table, columns)
+            else:
+                migrateMysql(cnx, table, columns)
+            migrated[table] = sorted(columns)
+            print("%s: %d columns converted" % (table, len(columns)), file=sys.stderr)
+    return migrated
+
+# ******************************************************************************
+
+if __name__ == "__main__":
+
+    db = sys.argv[1] if len(sys.argv) > 1 else 'home'
+    print(migrate(db))
+    db_session.closeAll()
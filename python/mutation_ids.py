@@ -0,0 +1,93 @@
+#!/usr/bin python3
+
+""" Mutation identifier map """
+
+"""
+Program:    mutation_ids
+File:       mutation_ids.py
+Version:    1.0
+Date:       18.10.26
+Function:   In-memory map from protein change to integer mutation_id for loaders of child tables
+_____________________________________________________________________________
+Description:
+============
+mutation is keyed by an integer surrogate mutation_id (AUTO_INCREMENT) and protein ('L374F') is a unique lookup
+column. source_info, impact and tissue reference mutation_id, so joins and their indexes compare 4-byte integers
+instead of VARCHAR(45) strings.
+
+Parsers still identify mutations by protein. Loaders of child tables call resolve(), which replaces the protein in
+each row by its mutation_id from a map read once with one SELECT (not one lookup per row). Rows whose protein is
+not in mutation are left out, as INSERT IGNORE left out rows whose parent row was missing. Parsed records
+(mutation_records) come back as records of the same type with mutation_id in place of the protein. The map is kept
+per database profile and dropped by forget() after mutation rows are written; load_scheduler runs child loads only
+after all mutation loads have finished, so they read the complete map.
+
+Usage:
+======
+rows = mutation_ids.resolve('home', tissue_rows)            # protein in column 0
+rows = mutation_ids.resolve('home', source_rows, index=2)
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Records keep their type (no copy into lists)
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import threading
+import db_session
+
+# ******************************************************************************
+
+_maps = {}                  # database profile:{protein:mutation_id}
+_lock = threading.Lock()
+
+# ******************************************************************************
+
+def idMap(database):
+    """Map of protein to mutation_id, read from mutation on first use.
+    Input               database                kenobi, home or local
+    Output              ids                     dictionary protein:mutation_id
+    """
+    with _lock:
+        ids = _maps.get(database)
+    if ids is None:
+        with db_session.session(database) as cnx, cnx.cursor() as cursor:
+            cursor.execute("SELECT protein, mutation_id FROM mutation;")
+            ids = {protein: mutation_id for protein, mutation_id in cursor.fetchall()}
+        with _lock:
+            _maps[database] = ids
+    return ids
+
+# ******************************************************************************
+
+def forget(database):
+    """Drops map of database (called after rows of mutation are inserted or deleted)."""
+    with _lock:
+        _maps.pop(database, None)
+
+# ******************************************************************************
+
+def resolve(database, rows, index=0):
+    """Replaces protein in each row by its mutation_id.
+    Input               database                kenobi, home or local
+                        rows                    iterable of rows (records, lists or tuples)
+                        index                   position of protein in row
+    Output              resolved                list of rows (records of the same type, other rows as lists), rows
+                                                with unknown protein left out
+    """
+    ids = idMap(database)
+    resolved = []
+    for row in rows:
+        mutation_id = ids.get(row[index])
+        if mutation_id is None:
+            continue
+        if hasattr(row, '_replace'):
+            row = row._replace(**{row._fields[index]: mutation_id})
+        else:
+            row = list(row)
+            row[index] = mutation_id
+        resolved.append(row)
+    return resolved
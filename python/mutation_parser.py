@@ -38,6 +38,25 @@ V1.6    21.03.19        Changed tissue table to reflect multiple        JJS
                         samples for one mutation.
 V1.7    15.06.19        Debugged GDCTissue parser for residues >999     JJS
 V1.8    17.09.19        Changed COSMIC csv parsing for new release      JJS
+V1.9    18.10.26        resnum as integer, FATHMM score as number
+                        (None for missing) for typed columns
+V1.10   18.10.26        COSMIC export streamed by cosmic_reader:
+                        rows of other genes skipped unparsed, only
+                        needed columns read
+V1.11   18.10.26        parseCosmic: mutation and tissue records from
+                        one pass over the COSMIC export
+V1.12   18.10.26        GDC JSON streamed record by record (gdc_reader)
+V1.13   18.10.26        parseCosmic reads gene regions of indexed
+                        exports (region_index)
+V1.14   18.10.26        Parsed rows as named records
+                        (mutation_records) instead of positional lists
+V1.15   18.10.26        Categorical fields share one copy per value
+                        (mutation_records.category)
+V1.16   18.10.26        Protein changes and residue numbers from the
+                        cached normaliser (protein_change)
+V1.17   18.10.26        tissueGDC: gene and change from
+                        protein_change.geneChange, rows without one
+                        skipped
 """
 
 # ******************************************************************************
@@ -48,8 +67,19 @@ import sys
 import pymysql
 import config_kinesin
 import domain_mapper as d
-import json
-import csv
+import median_score as med
+import gdc_reader as gdc
+import cosmic_reader as cosmic
+import mutation_records as rec
+import protein_change as pc
+
+# ******************************************************************************
+# columns of the COSMIC mutant export read by cosmicParser and tissueCosmic
+
+COSMIC_MUTATION_COLUMNS = ('GENE_NAME', 'ACCESSION_NUMBER', 'MUTATION_GENOME_POSITION', 'MUTATION_AA', 'MUTATION_CDS',
+                           'MUTATION_DESCRIPTION', 'MUTATION_ID', 'FATHMM_PREDICTION', 'FATHMM_SCORE')
+COSMIC_TISSUE_COLUMNS   = ('ID_SAMPLE', 'MUTATION_ID', 'MUTATION_AA', 'PRIMARY_SITE', 'HISTOLOGY_SUBTYPE_1',
+                           'PRIMARY_HISTOLOGY')
 
 
 # ******************************************************************************
@@ -57,159 +87,180 @@ def parseGDC(gene, json_file):
     """ Function to parse gdc files (https://portal.gdc.cancer.gov) for kinesin
     database population.
     Input                   file                file of JSON mutations
-    Output                  mut_list  [0]       list of strings for mutation table
-                            source_list  [1]    list of strings for source table
-                            impact_list  [2]    list of strings for impact table
+    Output                  mut_list  [0]       list of MutationRecord for mutation table
+                            source_list  [1]    list of SourceRecord for source table
+                            impact_list  [2]    list of GdcImpactRecord for impact table
     """
 
     mut_list    = []
-    mut_entry   = []
-    source_entry= []
     source_list = []
-    impact_entry = []
     impact_list = []
 
     source_db   = 'GDC'
     my_gene     = 'KIF11'
 
-    with open (json_file) as f:
-        mutations = json.load(f)
-        ## first index is the item number, 'x'
-        x = 0
-        for k in mutations:
-            try:
-                gene_name       = str(mutations[x]['consequence'][0]['transcript']['gene']['symbol'])
-                protein         = str(mutations[x]['consequence'][0]['transcript']['aa_change'])
-                res_num         = ''
-                consequence     = str(mutations[x]['consequence'][0]['transcript']['consequence_type'])
-                genomic_id      = str(mutations[x]['genomic_dna_change'])
-                source_id       = str(mutations[x]['ssm_id'])
-                mutation_type   = str(mutations[x]['mutation_subtype'])
-                vep = str(mutations[x]['consequence'][0]['transcript']['annotation']['vep_impact'])
-                if vep == '':
-                    vep = ' '
-                polyphen = str(mutations[x]['consequence'][0]['transcript']['annotation']['polyphen_impact'])
-                if polyphen == '':
-                    polyphen = ' '
-                sift = str(mutations[x]['consequence'][0]['transcript']['annotation']['sift_impact'])
-                if sift == '':
-                    sift = ' '
-                coding          = 'y'
-                cds             = ' '
-                organism        = 'Homo sapiens'
-                domain          = d.domainMapper(protein)           #calls domain mapping function
-                x += 1
-            except Error as e:
-                print("Error", e)
-
-            # parse out genomic_id
-            t = re.compile(r'^chr(10:)g.(\d{8})(.+)')
-            it = t.finditer(genomic_id)
-            for match in it:
-                genomic_id  = str(match.group(1) + match.group(2))
-                cds         = str(match.group(3))
-            # parse out amino acid residue number
-            u = re.compile(r'[A-Z]+(\d+)[^0-9]')
-            it = u.finditer(protein)
-            for match in it:
-                res_num = str(match.group(1))
-            # make terminology more consistent between databases
-            p = re.compile(r'_variant$')
-            consequence = p.sub('', consequence)
-            s = re.compile(r'stop_gained')
-            consequence = s.sub('nonsense', consequence)
-            q = re.compile(r'^Single base ')
-            mutation_type = q.sub('', mutation_type)
-            r = re.compile(r'^Small ')
-            mutation_type = r.sub('', mutation_type)
-
-
-            # put all strings into lists for each table
-            if gene_name == my_gene:            ## check that gene is KIF11
-                mut_entry       = [protein, res_num, genomic_id, coding, cds, mutation_type, consequence, gene_name, organism, domain]
-                source_entry    = [source_id, source_db, protein]
-                impact_entry    = [protein, vep, sift, polyphen]
-                impact_list.append(impact_entry)
-                mut_list.append(mut_entry)
-                source_list.append(source_entry)
-    f.close()
+    # records streamed one at a time (gdc_reader), not loaded as one list
+    for ssm in gdc.readRecords(json_file):
+        try:
+            gene_name       = str(ssm['consequence'][0]['transcript']['gene']['symbol'])
+            protein         = str(ssm['consequence'][0]['transcript']['aa_change'])
+            res_num         = None
+            consequence     = str(ssm['consequence'][0]['transcript']['consequence_type'])
+            genomic_id      = str(ssm['genomic_dna_change'])
+            source_id       = str(ssm['ssm_id'])
+            mutation_type   = str(ssm['mutation_subtype'])
+            vep = str(ssm['consequence'][0]['transcript']['annotation']['vep_impact'])
+            if vep == '':
+                vep = ' '
+            polyphen = str(ssm['consequence'][0]['transcript']['annotation']['polyphen_impact'])
+            if polyphen == '':
+                polyphen = ' '
+            sift = str(ssm['consequence'][0]['transcript']['annotation']['sift_impact'])
+            if sift == '':
+                sift = ' '
+            coding          = 'y'
+            cds             = ' '
+            organism        = 'Homo sapiens'
+            domain          = d.domainMapper(protein)           #calls domain mapping function
+        except Error as e:
+            print("Error", e)
+
+        # parse out genomic_id
+        t = re.compile(r'^chr(10:)g.(\d{8})(.+)')
+        it = t.finditer(genomic_id)
+        for match in it:
+            genomic_id  = str(match.group(1) + match.group(2))
+            cds         = str(match.group(3))
+        # amino acid residue number
+        res_num = pc.residueNumber(protein)
+        # make terminology more consistent between databases
+        p = re.compile(r'_variant$')
+        consequence = p.sub('', consequence)
+        s = re.compile(r'stop_gained')
+        consequence = s.sub('nonsense', consequence)
+        q = re.compile(r'^Single base ')
+        mutation_type = q.sub('', mutation_type)
+        r = re.compile(r'^Small ')
+        mutation_type = r.sub('', mutation_type)
+
+
+        # one record for each table, categorical fields as shared copies
+        if gene_name == my_gene:            ## check that gene is KIF11
+            cat = rec.category
+            mut_list.append(rec.MutationRecord(protein, res_num, genomic_id, coding, cds, cat(mutation_type),
+                                               cat(consequence), cat(gene_name), organism, domain))
+            source_list.append(rec.SourceRecord(source_id, source_db, protein))
+            impact_list.append(rec.GdcImpactRecord(protein, cat(vep), cat(sift), cat(polyphen)))
 
     return mut_list, source_list, impact_list
 
+# ******************************************************************************
+def cosmicMutation(mutation_dict, row):
+    """Adds one row of COSMIC mutant export to dictionary of mutation attributes (cosmicParser output).
+    Input               mutation_dict           dictionary protein:CosmicRecord (mutation, source_info and impact)
+                        row                     fields of row, in order of COSMIC_MUTATION_COLUMNS
+    """
+    gene_name, gene_number, genomic_id, protein, cds, description, source_id, fathmm_pred, fathmm_score = row
+    # eliminate 'p.', new release uses '=' for synonymous changes
+    protein         = pc.cosmicChange(protein)
+    if protein == '?':              ## don't include ? for aa_change
+        return
+    coding          = 'y'
+    description     = description.lower()          # parse out type and consequence below
+    mutation_type   = 'UNK'
+    consequence     = 'UNK'
+    organism        = 'Homo sapiens'
+    domain          = d.domainMapper(protein)   # calls domain mapping function
+
+    # source_info table
+    source_db       = 'COSMIC'
+
+    # impact table
+    fathmm_score    = med.toScore(fathmm_score)
+
+    # only use initial genomic position coordinate
+    q  = re.compile(r'^(10:\w+)-\w?')
+    it = q.finditer(genomic_id)
+    for match in it:
+        genomic_id = match.group(1)
+    # amino acid residue number
+    res_num         = pc.residueNumber(protein)
+    # use regex to parse mutation type and consequence from overall mutation description
+    p  = re.compile(r'(^\w+)\s-\s(.+$)')
+    it = p.finditer(description)
+    for match in it:
+        mutation_type = str(match.group(1))  # need all before hyphen
+        consequence   = str(match.group(2))  # after the hyphen
+        # makes more consistent terminology between databases
+        consequence = consequence.replace('coding silent', 'synonymous')
+
+    # make dictionary to fill in missing attribute fields in mutation table before insertion
+    cat = rec.category
+    mutation_dict[protein] = rec.CosmicRecord(res_num, genomic_id, coding, cds, cat(mutation_type), cat(consequence),
+                                              organism, domain, source_db, source_id, fathmm_score, cat(fathmm_pred),
+                                              cat(gene_name), cat(gene_number))
+
+# ******************************************************************************
+def cosmicTissue(cos_tissue_list, row):
+    """Adds one row of COSMIC mutant export to list of tissue entries (tissueCosmic output).
+    Input               cos_tissue_list         list of TissueRecord (mutation, sample, tissue_type, cancer_type)
+                        row                     fields of row, in order of COSMIC_TISSUE_COLUMNS
+    """
+    sample_id, source_id, mutation_id, tissue_type, cancer_type, primary_histology = row
+    # eliminate 'p.', new release uses '=' for synonymous changes
+    mutation_id = pc.cosmicChange(mutation_id)
+    if mutation_id == '?':              ## don't include ? for aa_change
+        return
+    # tissue table
+    if cancer_type == 'NS':
+        cancer_type = primary_histology
+    cos_tissue_list.append(rec.TissueRecord(mutation_id, source_id, rec.category(tissue_type),
+                                            rec.category(cancer_type)))
+
+# ******************************************************************************
+# outputs of one COSMIC scan: name:(columns, empty result, function adding a row to result)
+
+COSMIC_OUTPUTS = {'mutation':   (COSMIC_MUTATION_COLUMNS, dict, cosmicMutation),
+                  'tissue':     (COSMIC_TISSUE_COLUMNS, list, cosmicTissue)}
+
+# ******************************************************************************
+def parseCosmic(gene, csv_file, outputs=tuple(COSMIC_OUTPUTS), regions=None):
+    """Parses COSMIC mutant export in one pass for all outputs asked for (the file is read once, each row of gene
+    is handed to every output).
+    Input               gene                    gene name
+                        csv_file                COSMIC mutant export (csv or tsv, may be .gz)
+                        outputs                 names in COSMIC_OUTPUTS: 'mutation' (attributes of mutation,
+                                                source_info and impact, as cosmicParser), 'tissue' (as tissueCosmic)
+                        regions                 (chrom, start, end) of gene, to read only these regions of an
+                                                export indexed by region_index
+    Output              results                 dictionary output name:result
+    """
+    columns = []
+    for name in outputs:
+        columns += [c for c in COSMIC_OUTPUTS[name][0] if c not in columns]
+
+    results  = {}
+    handlers = []
+    for name in outputs:
+        wanted, empty, add = COSMIC_OUTPUTS[name]
+        results[name] = empty()
+        handlers.append((results[name], [columns.index(c) for c in wanted], add))
+
+    for row in cosmic.readCosmic(csv_file, gene, columns, regions):
+        for result, index, add in handlers:
+            add(result, [row[i] for i in index])
+
+    return results
+
 # ******************************************************************************
 def cosmicParser(my_gene, csv_file):
     """Function to parse mutation files from csv files from COSMIC database
     (https://cancer.sanger.ac.uk/cosmic)
     Input               file                    csv file download
-    Output              id_list                 list of mutation_id's
-                        mutation_dict           dictionary of attributes of mutation and impact
+    Output              mutation_dict           dictionary protein:CosmicRecord of attributes of mutation and impact
 
     """
-
-    mut_entry       = []
-    mutation_dict   = {}
-
-    # open csv file
-    with open(csv_file) as file:
-        csv_reader = csv.DictReader(file, delimiter=',') #changed from original to make more useful for future updates
-
-        # parse out info into attribute names
-        for row in csv_reader:
-            try:
-                gene_name       = row['GENE_NAME']
-                gene_number     = row[' ACCESSION_NUMBER']
-                genomic_id      = row[' MUTATION_GENOME_POSITION']
-                coding          = 'y'
-                protein         = row[' MUTATION_AA']
-                # eliminate 'p.'
-                protein         = protein.replace('p.', '')
-                protein         = protein.replace('=', protein[0]) #new release uses '=' for synonymous changes
-                res_num          = ''
-                cds             = row[' MUTATION_CDS']
-                #cds             = cds.replace('c.', '')
-                description     = row[' MUTATION_DESCRIPTION'].lower()          # parse out type and consequence below
-                organism        = 'Homo sapiens'
-                domain          = d.domainMapper(protein)   # calls domain mapping function
-
-                # source_info table
-                source_db       = 'COSMIC'
-                source_id       = row[' MUTATION_ID']
-
-                # impact table
-                fathmm_score    = row[' FATHMM_SCORE']
-                fathmm_pred     = row[' FATHMM_PREDICTION']
-
-            except NameError as e:
-                print("Error", e)
-
-            # only use initial genomic position coordinate
-            q  = re.compile(r'^(10:\w+)-\w?')
-            it = q.finditer(genomic_id)
-            for match in it:
-                genomic_id = match.group(1)
-            # parse out amino acid residue number
-            u = re.compile(r'[A-Z]+(\d+)[^0-9]')
-            it = u.finditer(protein)
-            for match in it:
-                res_num = str(match.group(1))
-            # use regex to parse mutation type and consequence from overall mutation description
-            p  = re.compile(r'(^\w+)\s-\s(.+$)')
-            it = p.finditer(description)
-            for match in it:
-                mutation_type = str(match.group(1))  # need all before hyphen
-                consequence   = str(match.group(2))  # after the hyphen
-                # makes more consistent terminology between databases
-                consequence = consequence.replace('coding silent', 'synonymous')
-
-            # make dictionary to fill in missing attribute fields in mutation table before insertion
-
-            if protein != '?' and gene_name == my_gene:  ## check that gene is KIF11, don't include ? for aa_change
-                mutation_dict[protein] = (res_num, genomic_id, coding, cds, mutation_type, consequence, organism, domain,
-                                          source_db, source_id, fathmm_score, fathmm_pred, gene_name, gene_number)
-
-
-    file.close()
-    return mutation_dict
+    return parseCosmic(my_gene, csv_file, ('mutation',))['mutation']
 
 # *************************************************************************************
 def combineImpact(gene, json_file, csv_file):
@@ -228,7 +279,7 @@ def combineImpact(gene, json_file, csv_file):
     for x in gdc_impact:
         if x[0] in cosmic_mutation:
             k = x[0]
-            y = [x[0], x[1], x[2], x[3], cosmic_mutation[k][11], cosmic_mutation[k][10]]
+            y = [x[0], x[1], x[2], x[3], cosmic_mutation[k].fathmm_pred, cosmic_mutation[k].fathmm_score]
             total_impact.append(y)
     # will only insert impact attributes for mutations found in cosmic AND gdc
     # will need to insert gdc separately
@@ -239,45 +290,36 @@ def tissueGDC(gene, json_file):
     """ Function to parse json files from Genomic Data Commons.
     Input                   gene                gene name
                             file                file of JSON mutations
-    Output                  tissue_list         list of strings for tissue table
+    Output                  tissue_list         list of TissueRecord for tissue table
 
     """
 
-    tissue_entry    = []
     tissue_list     = []
     source_db = 'GDC'
     my_gene = 'KIF11'
 
-    with open (json_file, 'r') as f:
-        tissue = json.load(f)
-        ## first index is the item number, 'x'
-        x = 0
-        for k in tissue:
-            try:
-                mutation_name   = str(tissue[x]['data']['gene_aa_change'])
-                tissue_type     = str(tissue[x]['data']['occurrence'][0]['case']['primary_site'])
-                cancer_type     = str(tissue[x]['data']['occurrence'][0]['case']['disease_type'])
-                sample_name     = str(tissue[x]['data']['ssm_id'])
-                cosmic_id       = str(tissue[x]['data']['cosmic_id'])
-                x += 1
-            except NameError as e:
-                print("Error", e)
-
-            # parse out amino acid mutation
-            p   = re.compile(r'(\w+)\s(\w+)')
-            it  = p.finditer(mutation_name)
-            for match in it:
-                gene_name = str(match.group(1))
-                mutation_id = str(match.group(2))
-
-            if my_gene == gene_name:  ## check that gene is KIF11
-                if cosmic_id == 'None':         ## skip entries also recorded in cosmic
-                    tissue_entry    = [mutation_id, sample_name, tissue_type, cancer_type]
-                    tissue_list.append(tissue_entry)
-            else:
-                pass
-
-    f.close()
+    # records streamed one at a time (gdc_reader), not loaded as one list
+    for result in gdc.readRecords(json_file):
+        try:
+            mutation_name   = str(result['data']['gene_aa_change'])
+            tissue_type     = str(result['data']['occurrence'][0]['case']['primary_site'])
+            cancer_type     = str(result['data']['occurrence'][0]['case']['disease_type'])
+            sample_name     = str(result['data']['ssm_id'])
+            cosmic_id       = str(result['data']['cosmic_id'])
+        except NameError as e:
+            print("Error", e)
+
+        # parse out gene and amino acid mutation; rows without them are skipped
+        gene_change = pc.geneChange(mutation_name)
+        if gene_change is None:
+            continue
+        gene_name, mutation_id = gene_change
+
+        if my_gene == gene_name:  ## check that gene is KIF11
+            if cosmic_id == 'None':         ## skip entries also recorded in cosmic
+                tissue_list.append(rec.TissueRecord(mutation_id, sample_name, rec.category(tissue_type),
+                                                    rec.category(cancer_type)))
+
 
     return tissue_list
 
@@ -286,44 +328,10 @@ def tissueCosmic(gene, csv_file):
     """ Function to parse csv files from Cosmic for tissue information.
     Input                   gene                    gene name
                             file                    file of COSMIC mutations
-    Output                  cos_tissue_list         list of strings for tissue table
+    Output                  cos_tissue_list         list of TissueRecord for tissue table
 
     """
-
-    tissue_entry    = []
-    cos_tissue_list     = []
-
-    source_db = 'COSMIC'
-    my_gene = 'KIF11'
-
-    # open csv file
-    with open(csv_file) as file:
-        csv_reader = csv.DictReader(file, delimiter=',')
-        # parse out info into attribute names
-        for row in csv_reader:
-            try:
-                gene_name   = row['GENE_NAME']
-                sample_id = row[' ID_SAMPLE']
-                source_id = row[' MUTATION_ID']
-                mutation_id = row[' MUTATION_AA']
-                # eliminate 'p.'
-                mutation_id = mutation_id.replace('p.', '')
-                mutation_id = mutation_id.replace('=', mutation_id[0])  # new release uses '=' for synonymous changes
-                # tissue table
-                tissue_type = row[' PRIMARY_SITE']
-                cancer_type = row[' HISTOLOGY_SUBTYPE_1']
-                if cancer_type == 'NS':
-                    cancer_type = row[' PRIMARY_HISTOLOGY']
-            except Error as e:
-                print("Error", e)
-
-            if mutation_id != '?' and gene_name == my_gene:  ## check that gene is KIF11, don't include ? for aa_change
-                tissue_entry = [mutation_id, source_id, tissue_type, cancer_type]
-                cos_tissue_list.append(tissue_entry)
-
-    file.close()
-
-    return(cos_tissue_list)
+    return parseCosmic(gene, csv_file, ('tissue',))['tissue']
 
 # ******************************************************************************
 
@@ -338,7 +346,9 @@ if __name__ == "__main__":
     #gdc_impact = gdc_att[2]
     # #print(gdc_att[0])
 
-    cosmic_dict = cosmicParser('KIF11', 'V90_38_MUTANT.csv')
+    # mutations and tissues of each release from one read of its file
+    cosmic90 = parseCosmic('KIF11', 'V90_38_MUTANT.csv')
+    cosmic_dict = cosmic90['mutation']
     cosmic_dict2 = cosmicParser('KIF11', 'V89_38_MUTANT.csv')
     total_cosmic = []
 
@@ -354,26 +364,11 @@ if __name__ == "__main__":
 
     # from collections import Counter
 
-    cosmic_tissue = tissueCosmic('KIF11', 'V90_38_MUTANT.csv')
+    cosmic_tissue = cosmic90['tissue']
     print(cosmic_tissue)
     #
-    # ## checks for duplicates in an attribute
-    # dup_list = []
-    # dup_list_source = []
-    # mutation_source = ()
-    # for x in cosmic_tissue:
-    #     dup_list.append(x[0])
-    #
-    #
-    #
-    # print(list(set([i for i in dup_list if dup_list.count(i) > 1])))
-    # #print(list(set([i for i in dup_list_source if dup_list_source.count(i) > 1])))
-    # print(len(list(set([i for i in dup_list if dup_list.count(i) > 1]))))
-    #
-    #
-    # mutation_source = tuple(zip(dup_list, dup_list_source))
-    # print(list(set ([i for i in mutation_source if mutation_source.count(i) >1])))
-    # print(len(list(set ([i for i in mutation_source if mutation_source.count(i) >1]))))
+    # ## recurrent mutations (samples, tissue sites, sources per mutation) are kept in frequency table
+    # ## (summary_tables.py), e.g. SELECT mutation_id, sample_count FROM frequency ORDER BY sample_count DESC
     #
 
 
@@ -394,13 +389,6 @@ if __name__ == "__main__":
 
     # tissueGDC = tissueGDC('KIF11', 'results.json')
     #
-    # dup_list = []
-    # for x in tissueGDC:
-    #     dup_list.append(x[0])
-    # print(list(set([i for i in dup_list if dup_list.count(i) > 1])))
-    # #
-    # print(len(list(set([i for i in dup_list if dup_list.count(i) > 1]))))
-    #
     # print(tissueGDC)
     # print(len(tissueGDC))
 
@@ -0,0 +1,85 @@
+#!/usr/bin python3
+
+""" Parsed record types """
+
+"""
+Program:    mutation_records
+File:       mutation_records.py
+Version:    1.1
+Date:       18.10.26
+Function:   Record types of parsed mutation, source_info, impact and tissue rows shared by parsers and loaders
+_____________________________________________________________________________
+Description:
+============
+Parsers return one record per row instead of lists read by position (mutation_dict[k][12] for gene_name). The
+records are named tuples: fields are read by name, a record has no per-row attribute dictionary (it is a tuple,
+smaller than the list it replaces), and it is still a row in column order, so loaders hand it to batch_writer,
+bulk_load and delta_ingest as it is, without copying it into a new list first. mutation_ids.resolve and
+tissue_codes.encode give back a record of the same type with the replaced fields (_replace).
+
+Field order of MutationRecord, SourceRecord and TissueRecord is the column order of the insert statements in
+dbinsert_module (mutation_id holds the protein change until mutation_ids.resolve replaces it). VepRecord fields
+are the impact view columns of impact_table.VEP_COLUMNS. CosmicRecord is the value of cosmicParser's dictionary
+protein:record, and mutation() and source() give its rows for the mutation and source_info tables.
+
+Categorical fields (mutation type, consequence, gene, predictions, tissue site and histology) take a handful of
+distinct values over millions of rows. Parsers pass them through category(), which returns the one shared copy of
+each value kept in a process-wide codebook, so rows hold references to the same string instead of a new copy
+each. Dictionary lookups on them (tissue_codes.encode) find the string's hash already computed.
+
+Usage:
+======
+row = MutationRecord(protein, res_num, genomic_id, 'y', cds, category(mutation_type), category(consequence),
+                     category(gene_name), organism, domain)
+row.gene_name
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Shared copies of categorical values (category)
+"""
+
+# ******************************************************************************
+# Import libraries
+
+from collections import namedtuple
+
+# ******************************************************************************
+
+MutationRecord  = namedtuple('MutationRecord', ('protein', 'resnum', 'genomic', 'coding', 'cds', 'mutation_type',
+                                                'consequence', 'gene_name', 'organism', 'domain'))
+SourceRecord    = namedtuple('SourceRecord', ('source_id', 'source_db', 'mutation_id'))
+TissueRecord    = namedtuple('TissueRecord', ('mutation_id', 'sample_id', 'tissue_type', 'cancer_type'))
+GdcImpactRecord = namedtuple('GdcImpactRecord', ('mutation_id', 'vep', 'sift_prediction', 'polyphen_prediction'))
+VepRecord       = namedtuple('VepRecord', ('mutation_id', 'polyphen_pred', 'polyphen_score', 'sift_pred',
+                                           'sift_score', 'condel', 'cadd_score', 'cadd_rank', 'fathmm_score',
+                                           'fathmm_rank', 'fathmm_pred', 'metaSVM_score', 'metaSVM_rank',
+                                           'metaSVM_pred', 'mutpred_score', 'mutpred_rank', 'mutassessor_score',
+                                           'mutassessor_rank', 'mutassessor_pred', 'muttaster_score',
+                                           'muttaster_rank', 'muttaster_pred', 'provean_score', 'provean_rank',
+                                           'provean_pred', 'revel_score', 'revel_rank'))
+
+_categories     = {}            # value:shared copy of every categorical value parsed in this process
+
+# ******************************************************************************
+
+def category(value):
+    """Shared copy of a categorical value (the first copy seen is kept for all rows)."""
+    return _categories.setdefault(value, value)
+
+# ******************************************************************************
+
+class CosmicRecord(namedtuple('CosmicRecord', ('resnum', 'genomic', 'coding', 'cds', 'mutation_type',
+                                               'consequence', 'organism', 'domain', 'source_db', 'source_id',
+                                               'fathmm_score', 'fathmm_pred', 'gene_name', 'gene_number'))):
+    """Attributes of one COSMIC mutation (value of cosmicParser dictionary, keyed by protein change)."""
+    __slots__ = ()
+
+    def mutation(self, protein):
+        """Row of mutation table."""
+        return MutationRecord(protein, self.resnum, self.genomic, self.coding, self.cds, self.mutation_type,
+                              self.consequence, self.gene_name, self.organism, self.domain)
+
+    def source(self, protein):
+        """Row of source_info table (protein in place of mutation_id)."""
+        return SourceRecord(self.source_id, self.source_db, protein)
@@ -0,0 +1,380 @@
+#!/usr/bin python3
+
+""" Parse cache module """
+
+"""
+Program:    parse_cache
+File:       parse_cache.py
+Version:    1.2
+Date:       18.10.26
+Function:   Cache parser output on disk keyed by input file content and parser version
+_____________________________________________________________________________
+Description:
+============
+dbinsert_module parses all source files on every run, also when only the schema or a loader changed. parse_stage
+looks up each parser's output here first. The key is a SHA-1 of the parser (module and name), the source of its
+module and of every project module it uses directly or indirectly (protein_change, the readers, mutation_records,
+median_score, ...), the arguments, and the content of every argument that is a file, so editing a parser or
+anything it depends on invalidates its entries. File hashes are remembered per file by path, size and
+modification time, so unchanged files are not read again.
+
+Output is stored columnar: rows of a table (list of equal-length lists or tuples, as the parsers return) are
+split into columns, integer and float columns are written as raw 8-byte arrays with a null mask, text columns as
+a dictionary of distinct values (UTF-8) and an array of codes into it; anything else is pickled. A JSON header
+describes the structure (tuples, lists, dictionaries of outputs, dictionaries keyed by protein). Entries are read
+with mmap and memoryview.cast, so the arrays are not copied before the rows are rebuilt. Rows that are named
+records (mutation_records) are rebuilt as the same record type.
+
+Entries not used for MAX_AGE days are removed, then the least recently used ones until the cache is smaller
+than MAX_BYTES (evict(), run by parse_stage after parsing).
+
+Usage:
+======
+key = parseKey(mutation.parseGDC, ('KIF11', 'mutations.2019-07-13.json'))
+result = load(key)
+if result is MISSING:
+    result = mutation.parseGDC('KIF11', 'mutations.2019-07-13.json')
+    store(key, result)
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Tables of named records (mutation_records)
+V1.2    18.10.26        Key covers project modules the parser uses; file hash memo per file
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import os
+import sys
+import json
+import mmap
+import time
+import pickle
+import struct
+import hashlib
+import inspect
+import threading
+import importlib
+from array import array
+
+# ******************************************************************************
+
+CACHE_DIR       = os.environ.get('KINESIN_PARSE_CACHE',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data',
+                                              '.parse_cache'))
+CACHE_VERSION   = 2                         # format of entries, part of every key
+SUFFIX          = '.pcol'
+MAGIC           = b'KPC1'
+MAX_BYTES       = 1 << 30                   # cache size kept after evict()
+MAX_AGE         = 30 * 24 * 3600            # seconds an unused entry is kept
+HASH_DIR        = 'file_hashes'             # one [path, size, mtime_ns, sha1] memo per hashed input file
+PROJECT_DIR     = os.path.dirname(os.path.abspath(__file__))
+SCALARS         = (type(None), str, int, float)
+
+MISSING         = object()                  # load() result for a key not in cache
+
+# ******************************************************************************
+
+def fileHash(path, cache_dir=CACHE_DIR):
+    """SHA-1 of file content, reused while size and modification time are unchanged.
+    Each file has its own memo (HASH_DIR/<SHA-1 of path>.json, replaced atomically), so parse_stage workers
+    hashing different files in parallel do not overwrite each other's entries.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    memo_file = os.path.join(cache_dir, HASH_DIR, hashlib.sha1(path.encode()).hexdigest() + '.json')
+    try:
+        with open(memo_file) as file:
+            memo = json.load(file)
+        if memo[:3] == [path, stat.st_size, stat.st_mtime_ns]:
+            return memo[3]
+    except (OSError, ValueError, TypeError):
+        pass
+
+    sha = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    os.makedirs(os.path.dirname(memo_file), exist_ok=True)
+    tmp = '%s.%d.%d.tmp' % (memo_file, os.getpid(), threading.get_ident())
+    with open(tmp, 'w') as file:
+        json.dump([path, stat.st_size, stat.st_mtime_ns, digest], file)
+    os.replace(tmp, memo_file)
+    return digest
+
+# ******************************************************************************
+
+def isProjectModule(module):
+    """True if module is one of this project's modules (a file in the python directory)."""
+    file = getattr(module, '__file__', None)
+    return bool(file) and os.path.dirname(os.path.abspath(file)) == PROJECT_DIR
+
+# ******************************************************************************
+
+def projectModules(name):
+    """Project modules a module uses, directly or through other project modules.
+    Modules are found through the module globals: imported modules and the modules of imported functions and
+    classes (from ... import ...).
+    Input               name                    module name
+    Output              names                   sorted module names, the module itself included
+    """
+    found, pending = set(), [name]
+    while pending:
+        name = pending.pop()
+        module = sys.modules.get(name)
+        if name in found or not isProjectModule(module):
+            continue
+        found.add(name)
+        for value in vars(module).values():
+            if inspect.ismodule(value):
+                pending.append(value.__name__)
+            elif isinstance(getattr(value, '__module__', None), str):
+                pending.append(value.__module__)
+    return sorted(found)
+
+# ******************************************************************************
+
+# ******************************************************************************
+
+def parseKey(func, args, cache_dir=CACHE_DIR):
+    """Cache key of a parser call.
+    Input               func                    parser function
+                        args                    arguments (strings naming existing files are hashed by content)
+    Output              key                     hex SHA-1
+    """
+    sha = hashlib.sha1(('%d %s.%s %r' % (CACHE_VERSION, func.__module__, func.__qualname__, args)).encode())
+    for name in projectModules(func.__module__):
+        try:
+            sha.update(('%s\n%s' % (name, inspect.getsource(sys.modules[name]))).encode())
+        except (OSError, TypeError):
+            pass
+    for arg in args:
+        if isinstance(arg, str) and os.path.isfile(arg):
+            sha.update(fileHash(arg, cache_dir).encode())
+    return sha.hexdigest()
+
+# ******************************************************************************
+# encoding of parser output: JSON node describing structure, column data appended to buffers
+
+def isTable(value):
+    """True for a non-empty list of equal-length lists (or tuples) of scalars."""
+    if not isinstance(value, list) or not value:
+        return False
+    kind, width = type(value[0]), len(value[0]) if isinstance(value[0], (list, tuple)) else None
+    return width is not None and all(type(row) is kind and len(row) == width and
+                                     all(type(v) in SCALARS for v in row) for row in value)
+
+# ******************************************************************************
+
+def encodeColumn(values, buffers):
+    """Column spec for a list of scalars, data appended to buffers."""
+    kinds = {type(v) for v in values} - {type(None)}
+    nulls = [v is None for v in values]
+    spec = {}
+    if any(nulls):
+        spec['nulls'] = addBuffer(buffers, bytes(nulls))
+    if kinds == {int} and all(-(1 << 63) <= v < (1 << 63) for v in values if v is not None):
+        spec['type'] = 'int'
+        spec['data'] = addBuffer(buffers, array('q', (0 if v is None else v for v in values)).tobytes())
+    elif kinds == {float}:
+        spec['type'] = 'float'
+        spec['data'] = addBuffer(buffers, array('d', (0.0 if v is None else v for v in values)).tobytes())
+    elif kinds <= {str}:
+        # dictionary encoding: distinct values once, one 4-byte code per row (0 for None)
+        codes, words = {}, []
+        for v in values:
+            if v is not None and v not in codes:
+                codes[v] = len(words) + 1
+                words.append(v)
+        text = [w.encode('utf-8') for w in words]
+        ends, end = array('q'), 0
+        for t in text:
+            end += len(t)
+            ends.append(end)
+        spec['type'] = 'str'
+        spec['words'] = addBuffer(buffers, b''.join(text))
+        spec['ends'] = addBuffer(buffers, ends.tobytes())
+        spec['data'] = addBuffer(buffers, array('I', (0 if v is None else codes[v] for v in values)).tobytes())
+    else:
+        spec = {'type': 'pickle', 'data': addBuffer(buffers, pickle.dumps(values, pickle.HIGHEST_PROTOCOL))}
+    return spec
+
+# ******************************************************************************
+
+def addBuffer(buffers, data):
+    """Appends data to buffers, returns its (offset, length) relative to the first buffer."""
+    offset = buffers[-1][0] + len(buffers[-1][1]) if buffers else 0
+    buffers.append((offset, data))
+    return [offset, len(data)]
+
+# ******************************************************************************
+
+def encode(value, buffers):
+    """Structure node of a parser output."""
+    if isTable(value):
+        columns = list(zip(*value))
+        return {'table': len(value), 'row': rowType(value[0]),
+                'columns': [encodeColumn(list(c), buffers) for c in columns]}
+    if isinstance(value, dict) and value and all(type(k) is str for k in value):
+        values = list(value.values())
+        if isTable(values):
+            # dictionary of rows (e.g. protein:attributes)
+            return {'dict': encodeColumn(list(value), buffers), 'values': encode(values, buffers)}
+        return {'map': {k: encode(v, buffers) for k, v in value.items()}}
+    if type(value) in (list, tuple) and not all(type(v) in SCALARS for v in value):
+        return {'seq': [encode(v, buffers) for v in value], 'type': type(value).__name__}
+    return {'pickle': addBuffer(buffers, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))}
+
+# ******************************************************************************
+
+def rowType(row):
+    """Row type of a table: 'list', 'tuple' or [module, name, fields] of a named record."""
+    kind = type(row)
+    if hasattr(kind, '_fields'):
+        return [kind.__module__, kind.__qualname__, list(kind._fields)]
+    return 'list' if kind is list else 'tuple'
+
+# ******************************************************************************
+
+def rowMaker(row):
+    """Function building a row of row type from a tuple of values."""
+    if row == 'list':
+        return list
+    if row == 'tuple':
+        return None
+    module, name, fields = row
+    kind = getattr(importlib.import_module(module), name)
+    if list(kind._fields) != fields:
+        # record type changed since entry was written
+        raise ValueError("fields of %s changed" % name)
+    return kind._make
+
+# ******************************************************************************
+
+def decodeColumn(spec, view):
+    """List of values of a column spec, read from memoryview of entry."""
+    if spec['type'] == 'pickle':
+        return pickle.loads(slot(view, spec['data']))
+    data = slot(view, spec['data'])
+    if spec['type'] == 'int':
+        values = data.cast('q').tolist()
+    elif spec['type'] == 'float':
+        values = data.cast('d').tolist()
+    else:
+        # each distinct value decoded once, rows share the string objects
+        words = slot(view, spec['words'])
+        lookup, start = [None], 0
+        for end in slot(view, spec['ends']).cast('q'):
+            lookup.append(str(words[start:end], 'utf-8'))
+            start = end
+        values = [lookup[c] for c in data.cast('I')]
+    if 'nulls' in spec:
+        nulls = slot(view, spec['nulls'])
+        values = [None if n else v for v, n in zip(values, nulls)]
+    return values
+
+# ******************************************************************************
+
+def slot(view, location):
+    """Part of memoryview at (offset, length)."""
+    offset, length = location
+    return view[offset:offset + length]
+
+# ******************************************************************************
+
+def decode(node, view):
+    """Parser output from structure node."""
+    if 'table' in node:
+        make = rowMaker(node['row'])
+        columns = [decodeColumn(c, view) for c in node['columns']]
+        rows = zip(*columns) if columns else [()] * node['table']
+        return list(rows) if make is None else list(map(make, rows))
+    if 'dict' in node:
+        return dict(zip(decodeColumn(node['dict'], view), decode(node['values'], view)))
+    if 'map' in node:
+        return {k: decode(v, view) for k, v in node['map'].items()}
+    if 'seq' in node:
+        items = [decode(v, view) for v in node['seq']]
+        return tuple(items) if node['type'] == 'tuple' else items
+    return pickle.loads(slot(view, node['pickle']))
+
+# ******************************************************************************
+
+def entryFile(key, cache_dir=CACHE_DIR):
+    """File of cache entry."""
+    return os.path.join(cache_dir, key + SUFFIX)
+
+# ******************************************************************************
+
+def store(key, value, cache_dir=CACHE_DIR):
+    """Writes parser output to cache (atomically, readers never see a partial entry).
+    Input               key                     from parseKey
+                        value                   parser output
+    Output              size                    bytes written
+    """
+    buffers = []
+    header = json.dumps(encode(value, buffers)).encode()
+    os.makedirs(cache_dir, exist_ok=True)
+    name = entryFile(key, cache_dir)
+    tmp = '%s.%d.tmp' % (name, os.getpid())
+    with open(tmp, 'wb') as file:
+        file.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for offset, data in buffers:
+            file.write(data)
+    os.replace(tmp, name)
+    return os.path.getsize(name)
+
+# ******************************************************************************
+
+def load(key, cache_dir=CACHE_DIR):
+    """Parser output from cache.
+    Input               key                     from parseKey
+    Output              value                   parser output, MISSING if not cached
+    """
+    name = entryFile(key, cache_dir)
+    try:
+        file = open(name, 'rb')
+    except OSError:
+        return MISSING
+    with file:
+        size = os.fstat(file.fileno()).st_size
+        if size < len(MAGIC) + 8:
+            return MISSING
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                if bytes(view[:len(MAGIC)]) != MAGIC:
+                    return MISSING
+                length = struct.unpack('<Q', view[len(MAGIC):len(MAGIC) + 8])[0]
+                start = len(MAGIC) + 8
+                node = json.loads(bytes(view[start:start + length]))
+                value = decode(node, view[start + length:])
+            except (ValueError, ImportError, AttributeError):
+                return MISSING
+            finally:
+                view.release()
+    os.utime(name)              # last use, for evict()
+    return value
+
+# ******************************************************************************
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+    """Removes entries unused for max_age seconds, then least recently used ones above max_bytes.
+    Output              removed                 number of entries removed
+    """
+    try:
+        names = [os.path.join(cache_dir, n) for n in os.listdir(cache_dir) if n.endswith(SUFFIX)]
+    except OSError:
+        return 0
+    entries = sorted(((os.path.getmtime(n), os.path.getsize(n), n) for n in names), reverse=True)
+    now, total, removed = time.time(), 0, 0
+    for used, size, name in entries:
+        total += size
+        if now - used > max_age or total > max_bytes:
+            os.remove(name)
+            removed += 1
+    return removed
@@ -0,0 +1,77 @@
+#!/usr/bin python3
+
+""" Parse stage module """
+
+"""
+Program:    parse_stage
+File:       parse_stage.py
+Version:    1.1
+Date:       18.10.26
+Function:   Run independent source file parsers in parallel processes
+_____________________________________________________________________________
+Description:
+============
+The parsers used by dbinsert_module (parseGDC, parseCosmic, tissueGDC, parseVep2,
+fathmmResultsParser, parseClinvar) each read their own file and do not use each other's output. parseAll runs
+them in a process pool, so parsing takes as long as the slowest parser instead of the sum of all of them.
+Parsers must be module-level functions (they are sent to worker processes by name).
+
+With cache=True the output of each parser is kept in parse_cache, keyed by the content of its input files and the
+source of the parser's module: a re-run with unchanged files and parsers reads the outputs instead of parsing.
+
+Usage:
+======
+results = parseAll({'gdc_att': (mutation.parseGDC, 'KIF11', 'mutations.2019-07-13.json'), ...})
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        Parser output cache
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import parse_cache
+
+# ******************************************************************************
+
+def runParser(name, func, args, cache=False):
+    """Runs one parser in worker process (or reads its cached output) and reports time taken."""
+    start = time.perf_counter()
+    if cache:
+        key = parse_cache.parseKey(func, args)
+        result = parse_cache.load(key)
+        if result is not parse_cache.MISSING:
+            print("cached %s in %.2f s" % (name, time.perf_counter() - start), file=sys.stderr)
+            return result
+    result = func(*args)
+    print("parsed %s in %.2f s" % (name, time.perf_counter() - start), file=sys.stderr)
+    if cache:
+        parse_cache.store(key, result)
+    return result
+
+# ******************************************************************************
+
+def parseAll(jobs, workers=None, cache=True):
+    """Runs parsers in parallel processes.
+    Input               jobs                    dictionary name:(parser function, arg1, arg2, ...)
+                        workers                 number of processes (default one per job, up to cpu count)
+                        cache                   True to reuse output of unchanged files and parsers (parse_cache)
+    Output              results                 dictionary name:parser output
+    """
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        results = {name: runParser(name, job[0], job[1:], cache) for name, job in jobs.items()}
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(runParser, name, job[0], job[1:], cache) for name, job in jobs.items()}
+            results = {name: future.result() for name, future in futures.items()}
+    if cache:
+        parse_cache.evict()
+    return results
@@ -0,0 +1,145 @@
+#!/usr/bin python3
+
+""" Protein change normaliser """
+
+"""
+Program:    protein_change
+File:       protein_change.py
+Version:    1.0
+Date:       18.10.26
+Function:   Parse and normalise protein changes (HGVS p. notation) of all sources, with cached results
+_____________________________________________________________________________
+Description:
+============
+Every source writes the protein change of a mutation its own way: GDC 'R189H', COSMIC 'p.R189H' or 'p.A496='
+for synonymous changes, ClinVar 'p.Arg189His', VEP amino acids 'R/H' and a protein position. The short one-letter
+form ('R189H', 'A496A', 'I426Lfs*8') is the mutation key of the database (mutation.protein), which parsers of
+all sources produce with the functions here:
+    cosmicChange        COSMIC MUTATION_AA ('p.' removed, '=' as the reference residue)
+    threeLetterChanges  ClinVar p. change in three-letter code (one change for each residue pair found)
+    vepChange           VEP Amino_acids and Protein_position
+    shortChange         any of these notations
+    geneChange          GDC gene_aa_change ('KIF11 R189H'), with its gene
+residueNumber() gives the residue number of a change, as parsers and domainMapper took it (last number that
+follows an upper case letter). Sources are matched on the short form itself: two changes are the same mutation
+when their short forms are equal.
+
+The patterns are compiled once, and every function keeps its results in an LRU cache: a cohort repeats the same
+few hundred changes of a gene in many rows (samples), so most calls are a dictionary lookup.
+
+Usage:
+======
+cosmicChange('p.A496=')                 # 'A496A'
+threeLetterChanges('Met1Thr')           # ('M1T',)
+shortChange('p.Arg189Ter')              # 'R189*'
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        geneChange for GDC gene_aa_change
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import re
+import functools
+import Bio.Data.IUPACData
+
+# ******************************************************************************
+
+CACHE_SIZE      = 1 << 16           # changes kept by each cached function
+STOP            = '*'               # one-letter code of stop (and of three-letter codes not in IUPAC table)
+
+RESIDUE         = re.compile(r'[A-Z]+(\d+)[^0-9]')
+THREE_LETTER    = re.compile(r'(\D+)(\d+)(\D{3})')
+AMINO_ACID3     = re.compile('|'.join(sorted(Bio.Data.IUPACData.protein_letters_3to1) + ['Ter']))
+SHORT           = re.compile(r'^([A-Z*])(\d+)(.*)$')
+GENE_CHANGE     = re.compile(r'(\w+)\s(\w+)')
+
+# ******************************************************************************
+
+def oneLetter(amino_acid3):
+    """One-letter code of a three-letter amino acid code ('*' if not an amino acid)."""
+    return Bio.Data.IUPACData.protein_letters_3to1.get(amino_acid3, STOP)
+
+# ******************************************************************************
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def residue(change):
+    """Residue number of a change as text (last number following an upper case letter), None if there is none."""
+    numbers = RESIDUE.findall(change)
+    return numbers[-1] if numbers else None
+
+# ******************************************************************************
+
+def residueNumber(change):
+    """Residue number of a change ('R189H': 189), None if there is none."""
+    number = residue(change)
+    return None if number is None else int(number)
+
+# ******************************************************************************
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def cosmicChange(change):
+    """Short form of a COSMIC MUTATION_AA: 'p.' removed, '=' (synonymous) replaced by the reference residue."""
+    change = change.replace('p.', '')
+    return change.replace('=', change[0]) if change else change
+
+# ******************************************************************************
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def threeLetterChanges(change):
+    """Short forms of a change in three-letter code ('Met1Thr', p. removed).
+    Input               change                  ClinVar protein change
+    Output              changes                 tuple of one-letter changes, one for each residue, number and
+                                                following three characters found ('' gives ())
+    """
+    return tuple(oneLetter(old) + number + oneLetter(new) for old, number, new in THREE_LETTER.findall(change))
+
+# ******************************************************************************
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def vepChange(amino_acids, position):
+    """Short form of a VEP change.
+    Input               amino_acids             VEP Amino_acids ('R/H', or 'A' for synonymous changes)
+                        position                VEP Protein_position
+    Output              change                  'R189H', None if amino_acids has neither form
+    """
+    if len(amino_acids) == 1:
+        return amino_acids + position + amino_acids
+    if '/' in amino_acids:
+        ref, sep, alt = amino_acids.rpartition('/')
+        return ref + position + alt
+    return None
+
+# ******************************************************************************
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def shortChange(change):
+    """Short one-letter form of a change in any notation ('p.Arg189His', 'p.R189H', 'p.A496=', 'R189H')."""
+    change = change.strip()
+    if change.startswith('p.'):
+        change = change[2:].strip('()')
+    if AMINO_ACID3.match(change):
+        # three-letter code ('Arg189Ter', 'Lys1058_Glu1059delinsAsn')
+        change = AMINO_ACID3.sub(lambda match: oneLetter(match.group(0)), change)
+    match = SHORT.match(change)
+    if match and '=' in change:
+        change = change.replace('=', match.group(1))
+    return change
+
+# ******************************************************************************
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def geneChange(gene_aa_change):
+    """Gene and change of a GDC gene_aa_change ('KIF11 R189H').
+    Input               gene_aa_change          text of the field (the last gene and change is taken if it
+                                                lists several)
+    Output              (gene, change)          change in short form, None if the text has no gene and change
+    """
+    pairs = GENE_CHANGE.findall(gene_aa_change)
+    if not pairs:
+        return None
+    gene, change = pairs[-1]
+    return gene, shortChange(change)
@@ -0,0 +1,269 @@
+#!/usr/bin python3
+
+""" Genomic region index """
+
+"""
+Program:    region_index
+File:       region_index.py
+Version:    1.0
+Date:       18.10.26
+Function:   Sort and block-compress a COSMIC mutant export by genome position and index it by region (as tabix)
+_____________________________________________________________________________
+Description:
+============
+Extracting the rows of one gene from a genome-wide COSMIC release means reading the whole file. indexExport()
+rewrites the export once, sorted by MUTATION_GENOME_POSITION (external merge sort in runs of RUN_LINES rows, so
+memory does not grow with the file), in blocks of about BLOCK_SIZE characters each compressed as its own gzip
+member. The result (<export>.sorted.gz) is still an ordinary gzip file with the header as first line.
+
+The index (<export>.sorted.gz.idx, JSON) lists the blocks of each chromosome with their first and last position and
+file offset, and a linear index as tabix keeps: for each 16 kb window the first block that can hold rows
+overlapping it. regionLines() reads the few blocks overlapping the regions asked for (seek + decompress), so one
+gene (KIF11 on 10:92,593,286-92,655,395, chrom_location in gene table) or the whole kinesin family is extracted
+without reading the rest of the file. Rows without a genome position are kept at the end of the file, outside
+the index.
+
+cosmic_reader.readCosmic uses the index when the export has one and a region is given.
+
+Usage:
+======
+python3 region_index.py CosmicMutantExport.tsv.gz
+regions = geneRegions('home', ['KIF11'])
+lines = regionLines('CosmicMutantExport.tsv.gz', regions.values())
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import os
+import re
+import sys
+import csv
+import gzip
+import json
+import heapq
+import tempfile
+import zlib
+from bisect import bisect_right
+import db_session
+
+# ******************************************************************************
+
+DATA_SUFFIX     = '.sorted.gz'
+INDEX_SUFFIX    = '.idx'
+POSITION_COLUMN = 'MUTATION_GENOME_POSITION'
+BLOCK_SIZE      = 1 << 16       # characters of rows per compressed block
+RUN_LINES       = 500000        # rows sorted in memory at a time
+WINDOW_SHIFT    = 14            # 16 kb windows of linear index
+LOCATION        = re.compile(r'^\s*(?:chr)?(\w+):([\d,]+)(?:\s*-\s*([\d,]+))?')
+
+# ******************************************************************************
+
+def parseLocation(location):
+    """Chromosome and interval of a position ('10:92606300-92606300') or chrom_location ('10:92,593,286 - 92,655,395').
+    Output              region                  (chrom, start, end), None if not a genome position
+    """
+    match = LOCATION.match(location or '')
+    if not match:
+        return None
+    start = int(match.group(2).replace(',', ''))
+    end = int(match.group(3).replace(',', '')) if match.group(3) else start
+    return match.group(1), start, end
+
+# ******************************************************************************
+
+def geneRegions(database, genes):
+    """Regions of genes from chrom_location of gene table.
+    Input               database                kenobi, home or local
+                        genes                   gene names
+    Output              regions                 dictionary gene_name:(chrom, start, end)
+    """
+    with db_session.session(database) as cnx, cnx.cursor() as cursor:
+        cursor.execute("SELECT gene_name, chrom_location FROM gene WHERE gene_name IN (%s);"
+                       % ','.join(['%s'] * len(genes)), list(genes))
+        rows = cursor.fetchall()
+    return {name: parseLocation(location) for name, location in rows if parseLocation(location)}
+
+# ******************************************************************************
+
+def dataFile(export_file):
+    """Sorted, block-compressed copy of export file."""
+    return export_file + DATA_SUFFIX
+
+# ******************************************************************************
+
+def hasIndex(export_file):
+    """True if export file has an index at least as new as the file."""
+    index_file = dataFile(export_file) + INDEX_SUFFIX
+    return os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(export_file)
+
+# ******************************************************************************
+
+def rowField(line, delimiter, position):
+    """Field of a row (csv parsing only for rows with quoted fields)."""
+    row = line.split(delimiter) if '"' not in line else next(csv.reader([line], delimiter=delimiter))
+    return row[position].strip() if len(row) > position else ''
+
+# ******************************************************************************
+
+def sortKey(region):
+    """Sort key of a row: placed rows by chromosome and start, rows without position last."""
+    if region is None:
+        return (1, '', 0, 0)
+    return (0,) + region
+
+# ******************************************************************************
+
+def sortedRuns(file, delimiter, position, run_lines, tmp_dir):
+    """Writes rows of file in sorted runs to temporary files.
+    Output              runs                    list of temporary file names
+    """
+    runs = []
+    while True:
+        run = []
+        for line in file:
+            if not line.endswith('\n'):
+                line += '\n'
+            region = parseLocation(rowField(line, delimiter, position))
+            run.append((sortKey(region), line))
+            if len(run) >= run_lines:
+                break
+        if not run:
+            return runs
+        run.sort(key=lambda item: item[0])
+        name = os.path.join(tmp_dir, 'run%d.gz' % len(runs))
+        with gzip.open(name, 'wt', compresslevel=1) as out:
+            for key, line in run:
+                out.write('%d\t%s\t%d\t%d\t%s' % (key + (line,)))
+        runs.append(name)
+
+# ******************************************************************************
+
+def readRun(name):
+    """Rows of a sorted run as (key, line)."""
+    with gzip.open(name, 'rt') as run:
+        for record in run:
+            unplaced, chrom, start, end, line = record.split('\t', 4)
+            yield (int(unplaced), chrom, int(start), int(end)), line
+
+# ******************************************************************************
+
+def indexExport(export_file, block_size=BLOCK_SIZE, run_lines=RUN_LINES):
+    """Writes sorted, block-compressed copy of a COSMIC export and its region index.
+    Input               export_file             COSMIC mutant export (csv or tsv, may be .gz)
+                        block_size              characters of rows per compressed block
+                        run_lines               rows sorted in memory at a time
+    Output              index_file              name of index file
+    """
+    opener = gzip.open if export_file.endswith('.gz') else open
+    data_file = dataFile(export_file)
+    blocks = {}             # chrom:list of [start, end, offset, length]
+
+    with opener(export_file, 'rt', newline='') as file, tempfile.TemporaryDirectory() as tmp_dir:
+        header = file.readline()
+        delimiter = '\t' if '\t' in header else ','
+        names = [name.strip() for name in next(csv.reader([header], delimiter=delimiter))]
+        position = names.index(POSITION_COLUMN)
+        runs = sortedRuns(file, delimiter, position, run_lines, tmp_dir)
+
+        with open(data_file, 'wb') as out:
+            out.write(gzip.compress(header.encode()))
+            block, chrom, start, end = [], None, None, None
+
+            def flush():
+                offset = out.tell()
+                out.write(gzip.compress(''.join(block).encode()))
+                if chrom is not None:
+                    blocks.setdefault(chrom, []).append([start, end, offset, out.tell() - offset])
+
+            for key, line in heapq.merge(*[readRun(name) for name in runs]):
+                row_chrom = key[1] if not key[0] else None
+                if block and (row_chrom != chrom or sum(map(len, block)) >= block_size):
+                    flush()
+                    block = []
+                if not block:
+                    chrom, start, end = row_chrom, key[2], key[3]
+                block.append(line)
+                end = max(end, key[3])
+            if block:
+                flush()
+
+    index = {'header': header, 'delimiter': delimiter, 'blocks': blocks,
+             'linear': {c: linearIndex(b) for c, b in blocks.items()}}
+    index_file = data_file + INDEX_SUFFIX
+    with open(index_file, 'w') as out:
+        json.dump(index, out)
+    return index_file
+
+# ******************************************************************************
+
+def linearIndex(blocks):
+    """First block that can hold rows overlapping each window (blocks sorted by start).
+    Input               blocks                  list of [start, end, offset, length] of one chromosome
+    Output              linear                  list window:block number
+    """
+    windows = (max(b[1] for b in blocks) >> WINDOW_SHIFT) + 1
+    linear = [len(blocks)] * windows
+    for n, (start, end, offset, length) in enumerate(blocks):
+        for window in range(start >> WINDOW_SHIFT, (end >> WINDOW_SHIFT) + 1):
+            linear[window] = min(linear[window], n)
+    # rows overlapping a window start in it or in a later window
+    for window in range(windows - 2, -1, -1):
+        linear[window] = min(linear[window], linear[window + 1])
+    return linear
+
+# ******************************************************************************
+
+def readIndex(export_file):
+    """Index of export file written by indexExport."""
+    with open(dataFile(export_file) + INDEX_SUFFIX) as file:
+        return json.load(file)
+
+# ******************************************************************************
+
+def regionLines(export_file, regions, index=None):
+    """Rows of export overlapping regions, read from the sorted copy through the index.
+    Input               export_file             COSMIC mutant export indexed by indexExport
+                        regions                 iterable of (chrom, start, end)
+                        index                   index from readIndex (read if None)
+    Output              lines                   generator of rows (lines of text, without header), in order of
+                                                genome position
+    """
+    index = index or readIndex(export_file)
+    wanted = {}                 # block offset:(length, regions overlapping it)
+    for chrom, start, end in regions:
+        blocks = index['blocks'].get(chrom, [])
+        linear = index['linear'].get(chrom, [])
+        window = start >> WINDOW_SHIFT
+        n = linear[window] if window < len(linear) else len(blocks)
+        starts = [b[0] for b in blocks]
+        for block in blocks[n:bisect_right(starts, end)]:
+            if block[1] >= start:
+                wanted.setdefault(block[2], (block[3], []))[1].append((chrom, start, end))
+
+    delimiter = index['delimiter']
+    names = [name.strip() for name in next(csv.reader([index['header']], delimiter=delimiter))]
+    position = names.index(POSITION_COLUMN)
+    with open(dataFile(export_file), 'rb') as file:
+        for offset in sorted(wanted):
+            length, overlapping = wanted[offset]
+            file.seek(offset)
+            text = zlib.decompress(file.read(length), 31).decode()
+            for line in text.splitlines(True):
+                region = parseLocation(rowField(line, delimiter, position))
+                if region and any(region[0] == c and region[1] <= e and region[2] >= s for c, s, e in overlapping):
+                    yield line
+
+# ******************************************************************************
+
+
+########## main ############
+
+if __name__ == "__main__":
+
+    for export in sys.argv[1:] or ['V89_38_MUTANT.csv']:
+        print(indexExport(export))
@@ -0,0 +1,242 @@
+#!/usr/bin python3
+
+""" SQLite storage backend module """
+
+"""
+Program:    sqlite_backend
+File:       sqlite_backend.py
+Version:    1.0
+Date:       18.10.26
+Function:   Embedded SQLite engine for kinesin database (no MySQL server needed)
+_____________________________________________________________________________
+Description:
+============
+Profiles with 'engine': 'sqlite' in database_config (config_local) are opened by db_session with connect() from
+this module instead of pymysql. The database file is created on first use from kinesin.sql (MySQL-only
+statements and ENGINE options removed, text columns COLLATE NOCASE to compare as the case-insensitive MySQL
+default collation does, e.g. 'Homo sapiens' = 'homo sapiens' in the gene foreign key, AUTO_INCREMENT keys
+declared INTEGER so they are the rowid), and the kinesin_family and gene rows are taken from sample_insert.sql so
+mutations can be loaded straight away.
+
+Connection and Cursor give the loaders the parts of the pymysql interface they use (with cnx.cursor() as cursor,
+%s parameters, execute returning row count, ping). Statements are translated once per statement string:
+INSERT IGNORE becomes INSERT OR IGNORE (for tables with foreign keys an INSERT ... SELECT that skips rows whose
+parent row is missing, as MySQL's INSERT IGNORE does), ON DUPLICATE KEY UPDATE becomes ON CONFLICT DO UPDATE SET with
+VALUES(c) read from excluded.c, IF() becomes IIF(). Bulk loads and staging table updates do not go through the
+MySQL statements: batch_writer and bulk_load check engine(cnx) and use one executemany per load inside a single
+transaction (one prepared statement, no packet limit, no TSV file) and UPDATE ... FROM.
+
+SQLite allows one writer at a time, so config_local uses a pool of one connection and loads run in sequence.
+
+Usage:
+======
+with db_session.session('local') as cnx:
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT protein FROM mutation WHERE consequence = %s;", ('missense',))
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        AUTO_INCREMENT columns as INTEGER rowid
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import os
+import re
+import sqlite3
+from functools import lru_cache
+
+# ******************************************************************************
+
+ENGINE          = 'sqlite'
+SQL_DIR         = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'mysql_database')
+SCHEMA_FILE     = os.path.join(SQL_DIR, 'kinesin.sql')
+SEED_FILE       = os.path.join(SQL_DIR, 'sql_queries', 'sample_insert.sql')
+SEED_TABLES     = ('kinesin_family', 'gene')
+TIMEOUT         = 60        # seconds to wait for another connection's write lock
+
+TEXT_TYPE       = re.compile(r'\b((?:VAR)?CHAR\(\d+\)|TEXT)', re.I)
+MYSQL_ONLY      = re.compile(r'^\s*(SHOW|SET|USE)\b', re.I)
+INSERT_IGNORE   = re.compile(r'\bINSERT\s+IGNORE\s+(?:INTO\s+)?', re.I)
+DUPLICATE_KEY   = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.I)
+AUTO_INCREMENT  = re.compile(r'\b(?:TINY|SMALL|MEDIUM|BIG)?INT(\s+NOT\s+NULL)?\s+AUTO_INCREMENT\b', re.I)
+IGNORE_VALUES   = re.compile(r'\s*INSERT\s+IGNORE\s+(?:INTO\s+)?(\w+)\s*\(([^)]*)\)\s*VALUES\s*\(([^)]*)\)\s*;?\s*$', re.I)
+
+# ******************************************************************************
+
+@lru_cache(maxsize=None)
+def foreignKeys(schema_file=SCHEMA_FILE):
+    """Foreign keys of each table in schema file.
+    Input               schema_file             kinesin.sql
+    Output              keys                    dictionary table:list of (columns, parent table, parent columns)
+    """
+    keys = {}
+    for statement in statements(schema_file):
+        create = re.match(r'CREATE\s+table\s+(\w+)', statement, re.I)
+        if create:
+            found = re.findall(r'FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+(\w+)\s*\(([^)]*)\)', statement, re.I)
+            keys[create.group(1)] = [(tuple(c.strip() for c in cols.split(',')), parent,
+                                      tuple(c.strip() for c in parent_cols.split(',')))
+                                     for cols, parent, parent_cols in found]
+    return keys
+
+# ******************************************************************************
+
+def ignoreMissingParents(table, columns):
+    """INSERT OR IGNORE ... SELECT that only inserts rows whose foreign keys match a parent row (MySQL's
+    INSERT IGNORE skips these rows, SQLite's INSERT OR IGNORE would fail).
+    Input               table                   table name
+                        columns                 column names in parameter order
+    Output              sql                     SQLite statement with numbered parameters, None if no foreign keys
+    """
+    conditions = []
+    for cols, parent, parent_cols in foreignKeys().get(table, ()):
+        if all(c in columns for c in cols):
+            match = ' AND '.join('%s = ?%d' % (p, columns.index(c) + 1) for c, p in zip(cols, parent_cols))
+            conditions.append('EXISTS (SELECT 1 FROM %s WHERE %s)' % (parent, match))
+    if not conditions:
+        return None
+    return "INSERT OR IGNORE INTO %s (%s) SELECT %s WHERE %s" % \
+           (table, ', '.join(columns), ', '.join('?%d' % (n + 1) for n in range(len(columns))),
+            ' AND '.join(conditions))
+
+# ******************************************************************************
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """Rewrites MySQL statement used by the loaders for SQLite (cached per statement string).
+    Input               sql                     MySQL statement with %s parameters
+    Output              sql                     SQLite statement with ? parameters
+    """
+    parts = DUPLICATE_KEY.split(sql, 1)
+    head, tail = parts[0], ''
+    if len(parts) == 2:
+        update = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', parts[1], flags=re.I)
+        update = re.sub(r'\bIF\(', 'IIF(', update, flags=re.I)
+        # target of assignment may not be qualified with table name in SQLite
+        update = re.sub(r'(^|,)\s*\w+\.(\w+)\s*=', r'\1 \2 =', update)
+        tail = ' ON CONFLICT DO UPDATE SET' + update
+
+    insert = IGNORE_VALUES.match(head)
+    if insert:
+        columns = [c.strip() for c in insert.group(2).split(',')]
+        checked = ignoreMissingParents(insert.group(1), columns)
+        if checked:
+            return checked + tail
+    sql = INSERT_IGNORE.sub('INSERT OR IGNORE INTO ', head) + tail
+    return re.sub(r'%([s%])', lambda m: '?' if m.group(1) == 's' else '%', sql)
+
+# ******************************************************************************
+
+def statements(sql_file):
+    """Statements of a MySQL script, comments and MySQL-only statements removed."""
+    with open(sql_file) as file:
+        script = ''.join(line for line in file
+                         if not line.lstrip().startswith(('--', '#')))
+    for statement in script.split(';'):
+        statement = statement.strip()
+        if statement and not MYSQL_ONLY.match(statement):
+            if re.match(r'CREATE\s+table\b', statement, re.I):
+                statement = TEXT_TYPE.sub(r'\1 COLLATE NOCASE', statement)
+                # INTEGER PRIMARY KEY is the rowid, numbered from 1 on insert as AUTO_INCREMENT
+                statement = AUTO_INCREMENT.sub(r'INTEGER\1', statement)
+                statement = re.sub(r'\)\s*ENGINE\s*=\s*\w+', ')', statement, flags=re.I)
+            yield statement
+
+# ******************************************************************************
+
+def createSchema(cnx, schema_file=SCHEMA_FILE, seed_file=SEED_FILE):
+    """Creates tables and view from kinesin.sql, inserts kinesin_family and gene rows from seed file.
+    Input               cnx                     sqlite3 connection
+                        schema_file             kinesin.sql
+                        seed_file               sql file with INSERT statements for SEED_TABLES
+    """
+    seed = re.compile(r'INSERT\s+INTO\s+(%s)\b' % '|'.join(SEED_TABLES), re.I)
+    script = list(statements(schema_file))
+    if seed_file and os.path.exists(seed_file):
+        script += [re.sub(r'^INSERT\s+INTO\s+', 'INSERT OR IGNORE INTO ', s, flags=re.I)
+                   for s in statements(seed_file) if seed.match(s)]
+    with cnx:
+        for statement in script:
+            cnx.execute(statement)
+
+# ******************************************************************************
+
+class Cursor:
+    """sqlite3 cursor with the pymysql cursor interface used by the loaders."""
+
+    def __init__(self, cursor):
+        self._cursor        = cursor
+        self.max_stmt_length = None             # set by batch_writer for pymysql, not used by SQLite
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql, args=None):
+        self._cursor.execute(translate(sql), () if args is None else tuple(args))
+        return self._cursor.rowcount
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(translate(sql), rows)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return tuple(self._cursor.fetchall())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+# ******************************************************************************
+
+class Connection:
+    """sqlite3 connection with the pymysql connection interface used by db_session."""
+
+    engine = ENGINE
+
+    def __init__(self, cnx):
+        self._cnx = cnx
+        self.open = True
+
+    def cursor(self):
+        return Cursor(self._cnx.cursor())
+
+    def commit(self):
+        self._cnx.commit()
+
+    def rollback(self):
+        self._cnx.rollback()
+
+    def ping(self, reconnect=False):
+        self._cnx.execute('SELECT 1;')
+
+    def close(self):
+        self.open = False
+        self._cnx.close()
+
+# ******************************************************************************
+
+def connect(config):
+    """Opens database file, creating the schema if the file is new.
+    Input               config                  database_config with 'dbfile'
+    Output              cnx                     Connection
+    """
+    path = config['dbfile']
+    cnx = sqlite3.connect(path, timeout=config.get('timeout', TIMEOUT), check_same_thread=False)
+    cnx.execute('PRAGMA foreign_keys = ON;')          # ON DELETE CASCADE as in InnoDB
+    cnx.execute('PRAGMA journal_mode = WAL;')         # readers do not block the writer
+    cnx.execute('PRAGMA synchronous = NORMAL;')
+    if not cnx.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mutation';").fetchone():
+        createSchema(cnx)
+    return Connection(cnx)
@@ -0,0 +1,172 @@
+#!/usr/bin python3
+
+""" Summary tables module """
+
+"""
+Program:    summary_tables
+File:       summary_tables.py
+Version:    1.0
+Date:       18.10.26
+Function:   Maintain count summary tables (domain x tissue site x consequence, mutation recurrence) after loads
+_____________________________________________________________________________
+Description:
+============
+The eDriver and dN/dS analyses (eDriver_analysis.R, kinesin_plots.R) count tissue samples by domain for groups of
+tissue sites and consequences, one query per tissue group, each joining tissue and mutation again.
+domain_tissue_count holds these counts (gene_name, domain, site_id, consequence -> sample_count), so the analyses
+read one small table in one round trip and sum the groups they need.
+
+frequency holds the recurrence of each mutation: samples and tissue sites it was found in and source databases
+reporting it. Top-N recurrent mutations are read with ORDER BY sample_count (indexed) instead of GROUP BY ...
+HAVING COUNT(*) > 1 over tissue or source_info.
+
+Both are refreshed by dbinsert_module after the loads of the tables they count (SOURCES). The rows of the loaded
+genes are counted in one query, compared with the stored counts and only rows whose counts changed are written
+(upsert); rows that no longer exist are deleted. An unchanged reload writes nothing and genes not in the load are
+not read.
+
+Usage:
+======
+summary_tables.updateSummaries('home', 'frequency', ['KIF11'])
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        frequency table (mutation recurrence)
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import sys
+import db_session
+import batch_writer as batch
+import delta_ingest as delta
+
+# ******************************************************************************
+
+SUMMARY_TABLE   = 'domain_tissue_count'
+GROUP_COLUMNS   = ('gene_name', 'domain', 'site_id', 'consequence')
+COUNT_COLUMN    = 'sample_count'
+
+FREQUENCY_TABLE = 'frequency'
+FREQUENCY_COLUMNS = ('mutation_id', 'sample_count', 'tissue_count', 'source_count')
+
+# summary table:tables it counts (load_scheduler refreshes it after all loads of these tables)
+SOURCES         = {SUMMARY_TABLE:   {'mutation', 'tissue'},
+                   FREQUENCY_TABLE: {'mutation', 'tissue', 'source_info'}}
+
+# ******************************************************************************
+
+def currentCounts(cnx, genes):
+    """Samples counted from tissue and mutation.
+    Input               cnx                     open connection
+                        genes                   gene names
+    Output              counts                  dictionary (gene_name, domain, site_id, consequence):sample count
+    """
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT m.gene_name, m.domain, t.site_id, m.consequence, COUNT(*) FROM tissue t, mutation m "
+                       "WHERE m.mutation_id = t.mutation_id AND m.gene_name IN (%s) "
+                       "GROUP BY m.gene_name, m.domain, t.site_id, m.consequence;"
+                       % ','.join(['%s'] * len(genes)), list(genes))
+        return {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
+
+# ******************************************************************************
+
+def storedCounts(cnx, genes):
+    """Counts saved in summary table by last refresh (same keys as currentCounts)."""
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT %s, %s FROM %s WHERE gene_name IN (%s);"
+                       % (', '.join(GROUP_COLUMNS), COUNT_COLUMN, SUMMARY_TABLE, ','.join(['%s'] * len(genes))),
+                       list(genes))
+        return {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
+
+# ******************************************************************************
+
+def refreshCounts(cnx, genes):
+    """Brings summary rows of genes up to date, writing only changed groups.
+    Input               cnx                     open connection
+                        genes                   gene names of the load
+    Output              counts                  (groups written, groups deleted)
+    """
+    genes   = list(genes)
+    current = currentCounts(cnx, genes)
+    stored  = storedCounts(cnx, genes)
+
+    changed = [key + (n,) for key, n in current.items() if stored.get(key) != n]
+    removed = [list(key) for key in stored if key not in current]
+    if changed:
+        sql = batch.upsertSql(SUMMARY_TABLE, GROUP_COLUMNS + (COUNT_COLUMN,), GROUP_COLUMNS)
+        batch.writeRows(cnx, sql, changed, label=SUMMARY_TABLE)
+    if removed:
+        delta.deleteKeys(cnx, SUMMARY_TABLE, GROUP_COLUMNS, removed)
+
+    print("%s: %d groups written, %d deleted (%d unchanged)"
+          % (SUMMARY_TABLE, len(changed), len(removed), len(current) - len(changed)), file=sys.stderr)
+    return len(changed), len(removed)
+
+# ******************************************************************************
+
+def currentFrequency(cnx, genes):
+    """Recurrence of each mutation of genes, counted from tissue and source_info.
+    Input               cnx                     open connection
+                        genes                   gene names
+    Output              counts                  dictionary mutation_id:(sample_count, tissue_count, source_count)
+    """
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT m.mutation_id, "
+                       "(SELECT COUNT(*) FROM tissue t WHERE t.mutation_id = m.mutation_id), "
+                       "(SELECT COUNT(DISTINCT t.site_id) FROM tissue t WHERE t.mutation_id = m.mutation_id), "
+                       "(SELECT COUNT(DISTINCT s.source_db) FROM source_info s WHERE s.mutation_id = m.mutation_id) "
+                       "FROM mutation m WHERE m.gene_name IN (%s);" % ','.join(['%s'] * len(genes)), list(genes))
+        return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+# ******************************************************************************
+
+def storedFrequency(cnx, genes):
+    """Counts saved in frequency by last refresh (same keys as currentFrequency)."""
+    with cnx.cursor() as cursor:
+        cursor.execute("SELECT %s FROM %s f, mutation m WHERE f.mutation_id = m.mutation_id AND m.gene_name IN (%s);"
+                       % (', '.join('f.' + c for c in FREQUENCY_COLUMNS), FREQUENCY_TABLE,
+                          ','.join(['%s'] * len(genes))), list(genes))
+        return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+# ******************************************************************************
+
+def refreshFrequency(cnx, genes):
+    """Brings frequency rows of the mutations of genes up to date, writing only changed rows.
+    (Rows of deleted mutations go with them, ON DELETE CASCADE.)
+    Input               cnx                     open connection
+                        genes                   gene names of the load
+    Output              counts                  (rows written, rows deleted)
+    """
+    genes   = list(genes)
+    current = currentFrequency(cnx, genes)
+    stored  = storedFrequency(cnx, genes)
+
+    changed = [(key,) + n for key, n in current.items() if stored.get(key) != n]
+    if changed:
+        sql = batch.upsertSql(FREQUENCY_TABLE, FREQUENCY_COLUMNS, FREQUENCY_COLUMNS[:1])
+        batch.writeRows(cnx, sql, changed, label=FREQUENCY_TABLE)
+
+    print("%s: %d rows written (%d unchanged)" % (FREQUENCY_TABLE, len(changed), len(current) - len(changed)),
+          file=sys.stderr)
+    return len(changed), 0
+
+# ******************************************************************************
+
+REFRESH = {SUMMARY_TABLE:   refreshCounts,
+           FREQUENCY_TABLE: refreshFrequency}
+
+# ******************************************************************************
+
+def updateSummaries(database, table, genes):
+    """Refreshes a summary table for genes on a pooled connection (load task run by dbinsert_module).
+    Input               database                kenobi, home or local
+                        table                   summary table (key of REFRESH)
+                        genes                   gene names of the load
+    Output              i                       number of summary rows written or deleted
+    """
+    with db_session.session(database) as cnx:
+        i = sum(REFRESH[table](cnx, genes))
+    return i
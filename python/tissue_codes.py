@@ -0,0 +1,112 @@
+#!/usr/bin python3
+
+""" Tissue site and histology codes """
+
+"""
+Program:    tissue_codes
+File:       tissue_codes.py
+Version:    1.1
+Date:       18.10.26
+Function:   Cached dictionaries encoding tissue_type and cancer_type as small integer codes for the tissue table
+_____________________________________________________________________________
+Description:
+============
+Tissue sites and histologies take a few dozen distinct values ('large_intestine', 'carcinoma') over all sample
+rows. They are kept once in the lookup tables tissue_site and histology, and tissue stores their SMALLINT codes
+(site_id, histology_id), so GROUP BY and filters on tissue compare 2-byte integers instead of VARCHAR(100).
+
+encode() replaces the names in parsed tissue rows by codes from a dictionary cached per database profile. Names not
+yet in a lookup table are inserted first (one INSERT IGNORE for all new names of a load) and the dictionary is read
+again. A lookup table is only read when the cached dictionary is missing or lacks a name of the load. Names are
+matched ignoring case and trailing spaces, as the UNIQUE key of the lookup table compares them. Each distinct name
+is looked up once per load; rows then take the code of their name from a dictionary of the load's names (parsers
+share one copy of each name, mutation_records.category). Parsed records come back as records of the same type with
+codes in place of the names.
+
+Usage:
+======
+rows = tissue_codes.encode('home', rows, {2: 'tissue_type', 3: 'cancer_type'})
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+V1.1    18.10.26        One code lookup per distinct name of a load
+V1.2    18.10.26        Records keep their type (no copy into lists)
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import threading
+import db_session
+import batch_writer as batch
+
+# ******************************************************************************
+
+# name column:(lookup table, code column), as in kinesin.sql
+LOOKUPS = {'tissue_type':   ('tissue_site', 'site_id'),
+           'cancer_type':   ('histology', 'histology_id')}
+
+_maps = {}                  # (database profile, name column):{nameKey(name):code}
+_lock = threading.Lock()
+
+# ******************************************************************************
+
+def nameKey(name):
+    """Name as the UNIQUE key of a lookup table compares it (case and trailing spaces ignored)."""
+    return name.rstrip().lower()
+
+# ******************************************************************************
+
+def codeMap(database, column, names=()):
+    """Dictionary of codes for a lookup table, adding names not in the table yet.
+    Input               database                kenobi, home or local
+                        column                  name column ('tissue_type' or 'cancer_type')
+                        names                   names that must have a code
+    Output              codes                   dictionary nameKey(name):code
+    """
+    with _lock:
+        codes = _maps.get((database, column))
+    if codes is not None and all(nameKey(n) in codes for n in names):
+        return codes
+
+    table, code = LOOKUPS[column]
+    select = "SELECT %s, %s FROM %s;" % (column, code, table)
+    with db_session.session(database) as cnx, cnx.cursor() as cursor:
+        cursor.execute(select)
+        codes = {nameKey(name): value for name, value in cursor.fetchall()}
+        missing = sorted({n for n in names if nameKey(n) not in codes})
+        if missing:
+            batch.writeRows(cnx, "INSERT IGNORE INTO %s (%s) VALUES(%%s)" % (table, column),
+                            [(n,) for n in missing], label=table)
+            cursor.execute(select)
+            codes = {nameKey(name): value for name, value in cursor.fetchall()}
+    with _lock:
+        _maps[(database, column)] = codes
+    return codes
+
+# ******************************************************************************
+
+def encode(database, rows, columns):
+    """Replaces names in rows by their codes.
+    Input               database                kenobi, home or local
+                        rows                    list of rows (records, lists or tuples)
+                        columns                 dictionary position in row:name column
+    Output              encoded                 list of rows (records of the same type, other rows as lists)
+    """
+    name_codes = {}             # position in row:{name:code}
+    for index, column in columns.items():
+        names = {row[index] for row in rows}
+        codes = codeMap(database, column, names)
+        name_codes[index] = {name: codes[nameKey(name)] for name in names}
+
+    encoded = []
+    for row in rows:
+        if hasattr(row, '_replace'):
+            row = row._replace(**{row._fields[n]: name_codes[n][row[n]] for n in name_codes})
+        else:
+            row = list(row)
+            for n in name_codes:
+                row[n] = name_codes[n][row[n]]
+        encoded.append(row)
+    return encoded
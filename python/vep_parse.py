@@ -33,18 +33,27 @@ V1.2    10.06.19        Expand to parse more complete file using VEP website
                         Will start over to insert data in new impact table versus 
                         updating. 
 v1.3    11.06.19        Finalised VEP parsing/insertion for all substitutions.      JJS
+V1.4    18.10.26        Use pooled connections from db_session module
+V1.5    18.10.26        Rows keyed by integer mutation_id (mutation_ids map)
+V1.6    18.10.26        Write impact_score rows (impact_store)
+V1.7    18.10.26        parseVep2 reads results with vep_reader
+V1.8    18.10.26        Protein change from the cached normaliser (protein_change)
+V1.9    18.10.26        Rows as VepRecord built by field name (SIFT and PolyPhen were swapped)
 """
 
 #
 #*****************************************************************************
 # Import libraries
 
-import csv
 import mutation_parser as m
 import re
-import config_home
-import pymysql
-import config_kinesin
+import db_session
+import mutation_ids as ids
+import impact_store as store
+import impact_table as impact
+import mutation_records as rec
+import vep_reader as vep
+import protein_change as pc
 
 #*****************************************************************************
 
@@ -60,27 +69,11 @@ def vepScores(gene, database):
                                                        (e.g. 'chr10:g.92613438A>T')
     """
 
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                          user=config_kinesin.database_config['dbuser'],
-                          passwd=config_kinesin.database_config['dbpass'],
-                          db=config_kinesin.database_config['dbname'])
-    else:
-    ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                          port=config_home.database_config['port'],
-                          user=config_home.database_config['dbuser'],
-                          passwd=config_home.database_config['dbpass'],
-                          db=config_home.database_config['dbname'])
-
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
     mut_str = ''
     sub = ''
     nucl_sub = ''
     vep_list = []
-    with cnx.cursor() as cursor:
+    with db_session.session(database) as cnx, cnx.cursor() as cursor:
         query = "SELECT genomic, cds FROM mutation WHERE mutation_type = 'substitution';"
         cursor.execute(query)
         temp = cursor.fetchall()
@@ -109,87 +102,44 @@ def parseVep2(my_gene, vep_file):
 
     Input               my_gene                 Gene of interest (KIF11)
                         vep_file                flat file (results) downloaded from VEP website
-    Output              impact_list             list of attributes for impact table update
+    Output              impact_list             list of VepRecord for impact table update
     """
 
-    vep2_entry       = []
-    new_entry       = []
     vep2_impact_list = []
-    # open csv file
-    with open(vep_file, newline='') as file:
-        vep_reader = csv.DictReader(file, delimiter='\t')
-        for row in vep_reader:
-            for k in row:
-                if row[k] == '-':
-                    row[k] = 'NA'
-            try:
-                gene_name       = row['SYMBOL']        #'KIF11'
-                resnum          = row['Protein_position']
-                aa_sub          = row['Amino_acids']
-                if len(aa_sub)==1:
-                    mutation = str(aa_sub + resnum + aa_sub)
-                else:
-                    q = re.compile(r'^(.*)/(.*)')
-                    it = q.finditer(aa_sub)
-                    for match in it:
-                        aa1 = match.group(1)
-                        aa2 = match.group(2)
-                        mutation        = str(aa1+resnum+aa2)
-                genomic         = row['#Uploaded_variation']
-                sift            = row['SIFT']
-                if sift != 'NA':
-                    s = re.compile(r'^(.*)\((.*)\)')
-                    it = s.finditer(sift)
-                    for match in it:
-                        sift_pred = match.group(1)
-                        sift_score = match.group(2)
-                polyphen        = row['PolyPhen']
-                if polyphen != 'NA':
-                    it = s.finditer(polyphen)
-                    for match in it:
-                        polyphen_pred = match.group(1)
-                        polyphen_score = match.group(2)
-                condel          = row['Condel']
-                if condel != 'NA':
-                    it = s.finditer(condel)
-                    for match in it:
-                        condel = match.group(2)    # only interested in score
-                cadd_raw        = row['CADD_raw']
-                cadd_rank       = row['CADD_raw_rankscore']
-                fathmm_rank     = row['FATHMM_converted_rankscore']
-                fathmm_score    = row['FATHMM_score']
-                fathmm_pred     = row['FATHMM_pred']
-                metaSVM_pred    = row['MetaSVM_pred']
-                metaSVM_rank    = row['MetaSVM_rankscore']
-                metaSVM_score   = row['MetaSVM_score']
-                mutpred_rank    = row['MutPred_rankscore']
-                mutpred_score   = row['MutPred_score']
-                mutassess_pred  = row['MutationAssessor_pred']
-                mutassess_score = row['MutationAssessor_score']
-                mutassess_rank  = row['MutationAssessor_score_rankscore']
-                mutaster_rank   = row['MutationTaster_converted_rankscore']
-                mutaster_pred   = row['MutationTaster_pred']
-                mutaster_score  = row['MutationTaster_score']
-                provean_rank    = row['PROVEAN_converted_rankscore']
-                provean_score   = row['PROVEAN_score']
-                provean_pred    = row['PROVEAN_pred']
-                revel_rank      = row['REVEL_rankscore']
-                revel_score     = row['REVEL_score']
-            except NameError as e:
-                print("Error", e)
-
-            if gene_name == my_gene:  ## check that gene is KIF11
-                vep2_entry = [mutation, sift_pred, sift_score, polyphen_pred, polyphen_score, condel,\
-                              cadd_raw, cadd_rank,\
-                              fathmm_score, fathmm_rank, fathmm_pred,\
-                              metaSVM_score, metaSVM_rank, metaSVM_pred,\
-                              mutpred_score, mutpred_rank,\
-                              mutassess_score, mutassess_rank, mutassess_pred,\
-                              mutaster_score, mutaster_rank, mutaster_pred,\
-                              provean_score, provean_rank, provean_pred,\
-                              revel_score, revel_rank]
-
-                vep2_impact_list.append(vep2_entry)
+    mutation = None
+    # only the needed columns are read, '-' given as 'NA' (tab, VCF or JSON output, see vep_reader)
+    for row in vep.readVep(vep_file, impact.VEP_INPUT_COLUMNS, missing='NA'):
+        (gene_name, resnum, aa_sub, genomic, sift, polyphen, condel, cadd_raw, cadd_rank,
+         fathmm_rank, fathmm_score, fathmm_pred, metaSVM_pred, metaSVM_rank, metaSVM_score,
+         mutpred_rank, mutpred_score, mutassess_pred, mutassess_score, mutassess_rank,
+         mutaster_rank, mutaster_pred, mutaster_score, provean_rank, provean_score, provean_pred,
+         revel_rank, revel_score) = row
+        # mutation and predictions keep their last value when a row has none
+        mutation = pc.vepChange(aa_sub, resnum) or mutation
+        if sift != 'NA' and vep.predictionScore(sift):
+            sift_pred, sift_score = vep.predictionScore(sift)
+        if polyphen != 'NA' and vep.predictionScore(polyphen):
+            polyphen_pred, polyphen_score = vep.predictionScore(polyphen)
+        if condel != 'NA' and vep.predictionScore(condel):
+            condel = vep.predictionScore(condel)[1]    # only interested in score
+
+        if gene_name == my_gene:  ## check that gene is KIF11
+            vep2_entry = rec.VepRecord(mutation_id=mutation, sift_pred=sift_pred, sift_score=sift_score,
+                          polyphen_pred=polyphen_pred, polyphen_score=polyphen_score,
+                          condel=condel, cadd_score=cadd_raw, cadd_rank=cadd_rank,
+                          fathmm_score=fathmm_score, fathmm_rank=fathmm_rank, fathmm_pred=fathmm_pred,
+                          metaSVM_score=metaSVM_score, metaSVM_rank=metaSVM_rank,
+                          metaSVM_pred=metaSVM_pred,
+                          mutpred_score=mutpred_score, mutpred_rank=mutpred_rank,
+                          mutassessor_score=mutassess_score, mutassessor_rank=mutassess_rank,
+                          mutassessor_pred=mutassess_pred,
+                          muttaster_score=mutaster_score, muttaster_rank=mutaster_rank,
+                          muttaster_pred=mutaster_pred,
+                          provean_score=provean_score, provean_rank=provean_rank,
+                          provean_pred=provean_pred,
+                          revel_score=revel_score, revel_rank=revel_rank)
+
+            vep2_impact_list.append(vep2_entry)
 
     return vep2_impact_list
 
@@ -203,35 +153,9 @@ def updateImpact2(impact_list, database):
     Output                  i                               number of updated rows
     """
 
-    # Connect to MySQL Database (kinesin on kenobi)
-    if database == 'kenobi':
-        cnx = pymysql.connect(host=config_kinesin.database_config['dbhost'],
-                              user=config_kinesin.database_config['dbuser'],
-                              passwd=config_kinesin.database_config['dbpass'],
-                              db=config_kinesin.database_config['dbname'])
-    else:
-    ## if database is home mysql database
-        cnx = pymysql.connect(host=config_home.database_config['dbhost'],
-                          port=config_home.database_config['port'],
-                          user=config_home.database_config['dbuser'],
-                          passwd=config_home.database_config['dbpass'],
-                          db=config_home.database_config['dbname'])
-    cursor = cnx.cursor(pymysql.cursors.DictCursor)
-
-    sql_impact = "INSERT IGNORE impact (mutation_id, polyphen_pred, polyphen_score, sift_pred, sift_score,"\
-                    "condel, cadd_score, cadd_rank, fathmm_score, fathmm_rank, fathmm_pred,"\
-                    "metaSVM_score, metaSVM_rank, metaSVM_pred, mutpred_score, mutpred_rank,"\
-                    "mutassessor_score, mutassessor_rank, mutassessor_pred, muttaster_score, muttaster_rank, muttaster_pred,"\
-                    "provean_score, provean_rank, provean_pred, revel_score, revel_rank)\
-                     VALUES(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-
-    i = 0
-    for x in impact_list:
-        with cnx.cursor() as cursor:
-            rows = cursor.execute(sql_impact, x)
-            i += 1
-    cnx.commit()
-    cnx.close()
+    # impact is a view of impact_score: one row per tool and metric (columns as impact_table.VEP_COLUMNS)
+    scores = store.scoreRows(ids.resolve(database, impact_list), impact.VEP_COLUMNS)
+    i = store.writeScores(database, 'VEP', scores)
 
     return i
 
@@ -0,0 +1,203 @@
+#!/usr/bin python3
+
+""" VEP results reader """
+
+"""
+Program:    vep_reader
+File:       vep_reader.py
+Version:    1.0
+Date:       18.10.26
+Function:   Stream the columns a parser needs from VEP results (tab, VCF or JSON output)
+_____________________________________________________________________________
+Description:
+============
+VEP results with dbNSFP annotation have a column for every plugin field, of which the impact parsers use 27.
+readVep() resolves the positions of the wanted columns once from the header and yields each row as a tuple of
+those fields only, with VEP's empty value ('-') replaced by the parser's own missing value. Tab output is split
+on tabs (VEP does not quote fields), without building a dictionary per row.
+
+The same columns are read from the other VEP output formats, detected from the first line:
+    vcf         one row per consequence of the CSQ field (column names from the CSQ Format in the header),
+                #Uploaded_variation is the ID column
+    json        one row per transcript_consequences entry (VEP --json, one record per line or an array, streamed
+                with gdc_reader), columns looked up by name, else by lower case name, with SIFT and PolyPhen rebuilt as
+                'prediction(score)' and Protein_position from protein_start(-protein_end)
+Files ending in .gz are read compressed.
+
+predictionScore() splits 'deleterious(0.03)' fields (SIFT, PolyPhen, Condel) with one precompiled pattern; the
+few distinct values are kept in an LRU cache, so most rows are a dictionary lookup.
+
+Usage:
+======
+for gene, sift in readVep('VEP_new_results.txt', ('SYMBOL', 'SIFT'), missing='NA'):
+    pred, score = predictionScore(sift)
+
+Revision History:
+=================
+V1.0    18.10.26        Initial
+"""
+
+# ******************************************************************************
+# Import libraries
+
+import re
+import gzip
+import functools
+from urllib.parse import unquote
+import gdc_reader as gdc
+
+# ******************************************************************************
+
+VEP_MISSING     = '-'
+PREDICTION      = re.compile(r'^(.*)\((.*)\)')
+CSQ_FORMAT      = re.compile(r'^##INFO=<ID=CSQ,.*Format: ([^"]+)"')
+
+# VEP JSON key of tab column names that are not just the lower case name
+JSON_FIELDS     = {'#uploaded_variation':   'id',
+                   'symbol':                'gene_symbol',
+                   'gene':                  'gene_id',
+                   'feature':               'transcript_id',
+                   'consequence':           'consequence_terms'}
+
+# ******************************************************************************
+
+def openVep(vep_file):
+    """Opens VEP results as text, decompressing .gz files."""
+    if vep_file.endswith('.gz'):
+        return gzip.open(vep_file, 'rt', newline='')
+    return open(vep_file, newline='')
+
+# ******************************************************************************
+
+def vepFormat(first):
+    """Output format of VEP results from their first line: 'vcf', 'json' or 'tab'."""
+    if first.startswith('##fileformat=VCF'):
+        return 'vcf'
+    if first.lstrip().startswith(('{', '[')):
+        return 'json'
+    return 'tab'
+
+# ******************************************************************************
+
+@functools.lru_cache(maxsize=4096)
+def predictionScore(field):
+    """Prediction and score of a 'prediction(score)' field.
+    Input               field                   e.g. 'possibly_damaging(0.746)'
+    Output              (prediction, score)     strings, None if field has no '(score)'
+    """
+    match = PREDICTION.match(field)
+    return match.groups() if match else None
+
+# ******************************************************************************
+
+def columnIndex(header, columns):
+    """Positions of columns in header.
+    Input               header                  list of column names
+                        columns                 column names wanted
+    Output              index                   list of positions, in order of columns
+    """
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise KeyError("VEP results have no column %s" % ', '.join(missing))
+    return [header.index(c) for c in columns]
+
+# ******************************************************************************
+
+def readVep(vep_file, columns, missing=VEP_MISSING):
+    """Yields the wanted fields of each row of VEP results.
+    Input               vep_file                VEP results (tab, VCF or JSON output, may be .gz)
+                        columns                 column names as in tab output ('SYMBOL', 'SIFT', 'CADD_raw', ...)
+                        missing                 value given for empty fields ('-' in tab output)
+    Output              rows                    generator of tuples of fields, in order of columns
+    """
+    with openVep(vep_file) as file:
+        first = file.readline()
+        form = vepFormat(first)
+        if form == 'tab':
+            yield from tabRows(first, file, columns, missing)
+        elif form == 'vcf':
+            yield from vcfRows(file, columns, missing)
+    if form == 'json':
+        yield from jsonRows(vep_file, columns, missing)
+
+# ******************************************************************************
+
+def tabRows(first, lines, columns, missing):
+    """Wanted fields of rows of VEP tab output (first is the first line, lines the rest)."""
+    line = first
+    while line.startswith('##'):
+        line = next(lines)
+    header = line.rstrip('\r\n').split('\t')
+    index = columnIndex(header, columns)
+    width = len(header)
+    for line in lines:
+        row = line.rstrip('\r\n').split('\t')
+        if len(row) < width:
+            row += [VEP_MISSING] * (width - len(row))
+        yield tuple(missing if row[i] == VEP_MISSING else row[i] for i in index)
+
+# ******************************************************************************
+
+def vcfRows(lines, columns, missing):
+    """Wanted fields of the CSQ consequences of VEP VCF output (header lines after ##fileformat)."""
+    fields = None
+    for line in lines:
+        if line.startswith('##'):
+            match = CSQ_FORMAT.match(line)
+            if match:
+                fields = ['#Uploaded_variation'] + match.group(1).split('|')
+            continue
+        if line.startswith('#'):
+            if fields is None:
+                raise KeyError("VEP VCF has no CSQ header")
+            index = columnIndex(fields, columns)
+            continue
+
+        chrom, pos, vid, ref, alt, qual, filt, info = line.rstrip('\r\n').split('\t')[:8]
+        if vid == '.':
+            vid = '%s_%s_%s/%s' % (chrom, pos, ref, alt)
+        csq = next((f[4:] for f in info.split(';') if f.startswith('CSQ=')), None)
+        if csq is None:
+            continue
+        for consequence in csq.split(','):
+            row = [vid] + consequence.split('|')
+            yield tuple(vcfValue(row[i] if i < len(row) else '', missing) for i in index)
+
+# ******************************************************************************
+
+def vcfValue(value, missing):
+    """Field of a CSQ consequence (VCF reserved characters are %-encoded)."""
+    if value == '' or value == VEP_MISSING:
+        return missing
+    return unquote(value) if '%' in value else value
+
+# ******************************************************************************
+
+def jsonRows(vep_file, columns, missing):
+    """Wanted fields of the transcript consequences of VEP JSON output."""
+    keys = [JSON_FIELDS.get(c.lower(), c.lower()) for c in columns]
+    for record in gdc.readRecords(vep_file):
+        for consequence in record.get('transcript_consequences', ()):
+            fields = {k.lower(): v for k, v in consequence.items()}
+            fields['id'] = record.get('id', record.get('input'))
+            yield tuple(jsonValue(fields, key, missing) if column not in consequence else
+                        jsonValue(consequence, column, missing) for column, key in zip(columns, keys))
+
+# ******************************************************************************
+
+def jsonValue(fields, key, missing):
+    """Field of a VEP JSON consequence in its tab output form."""
+    if key in ('sift', 'polyphen'):
+        pred, score = fields.get(key + '_prediction'), fields.get(key + '_score')
+        return missing if pred is None else '%s(%s)' % (pred, score)
+    if key == 'protein_position':
+        start, end = fields.get('protein_start'), fields.get('protein_end')
+        if start is None:
+            return missing
+        return str(start) if end in (None, start) else '%s-%s' % (start, end)
+    value = fields.get(key)
+    if value is None or value == '' or value == VEP_MISSING:
+        return missing
+    if isinstance(value, list):
+        return '&'.join(map(str, value))
+    return str(value)